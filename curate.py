@@ -13,27 +13,37 @@ Usage:
 Then open http://localhost:5000 in your browser.
 """
 import argparse
+import hashlib
+import heapq
 import io
 import json
+import logging
+import operator
 import os
 import re
 from datetime import datetime
 import sys
 import subprocess
 import threading
+import time
 import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Optional
 
 # Ensure project root is on path for src imports
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from dotenv import load_dotenv
-from flask import Flask, Response, jsonify, render_template_string, request, send_from_directory
+from flask import Flask, Response, jsonify, render_template, request, send_from_directory
 
 # Load environment variables (optional - credentials are hardcoded as fallback)
 load_dotenv(Path(__file__).parent / ".env")
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
 # Data directory for local files
 DATA_DIR = Path(__file__).parent / "data" / "zara" / "mens"
@@ -47,1527 +57,382 @@ DEFAULT_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpc3MiOiJzdXBhYmF
 
 # Global flag for data source
 USE_SUPABASE = False
-supabase_client = None
+_supabase_client = None
+_supabase_lock = threading.Lock()
 BUCKET_NAME = "product-images"
 
 # ============================================
 # SCRAPER STATUS TRACKING
 # ============================================
-scraper_status = {
-    "running": False,
-    "progress": 0,
-    "total": 0,
-    "current_category": "",
-    "current_product": "",
-    "products_scraped": 0,
-    "products_skipped": 0,
-    "error": None,
-    "completed": False,
-    "start_time": None,
-    "end_time": None,
-    "logs": [],  # Store log lines for display
-    "refresh_handled": False,  # Prevent multiple refreshes
-}
+SCRAPER_LOG_LINES = 100
+
+
+@dataclass(slots=True)
+class ScraperStatus:
+    """Progress of the background scraper, polled by the viewer UI."""
+
+    running: bool = False
+    progress: int = 0
+    total: int = 0
+    current_category: str = ""
+    current_product: str = ""
+    products_scraped: int = 0
+    products_skipped: int = 0
+    error: Optional[str] = None
+    completed: bool = False
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+    # Most recent log lines for display
+    logs: deque = field(default_factory=lambda: deque(maxlen=SCRAPER_LOG_LINES))
+    refresh_handled: bool = False  # Prevent multiple refreshes
+
+    def to_json(self) -> dict:
+        """Snapshot into a JSON-serializable dict for the status endpoint."""
+        with _status_lock:
+            return {
+                "running": self.running,
+                "progress": self.progress,
+                "total": self.total,
+                "current_category": self.current_category,
+                "current_product": self.current_product,
+                "products_scraped": self.products_scraped,
+                "products_skipped": self.products_skipped,
+                "error": self.error,
+                "completed": self.completed,
+                "start_time": self.start_time,
+                "end_time": self.end_time,
+                "logs": list(self.logs),
+                "refresh_handled": self.refresh_handled,
+            }
+
+
+# The scraper thread writes while request handlers read; hold this for both
+_status_lock = threading.Lock()
+scraper_status = ScraperStatus()
 
 
 def init_supabase():
-    """Initialize Supabase client."""
-    global supabase_client
+    """Create the shared Supabase client if needed and return it.
 
-    # Use environment variables if available, otherwise use hardcoded defaults
-    supabase_url = os.getenv("SUPABASE_URL") or DEFAULT_SUPABASE_URL
-    supabase_key = os.getenv("SUPABASE_KEY") or DEFAULT_SUPABASE_KEY
-
-    from supabase import create_client
-
-    supabase_client = create_client(supabase_url, supabase_key)
-    return supabase_client
-
-
-def get_products_from_supabase():
-    """Fetch all products from Supabase database."""
-    if not supabase_client:
-        return []
-
-    try:
-        result = supabase_client.table("products").select("*").execute()
-        products = result.data or []
-
-        # Transform database format to match local file format for frontend compatibility
-        transformed = []
-        for p in products:
-            # Build image URLs from storage paths (the 2 we store)
-            image_paths = p.get("image_paths", [])
-            supabase_url = os.getenv("SUPABASE_URL") or DEFAULT_SUPABASE_URL
-            image_urls_stored = [
-                f"{supabase_url}/storage/v1/object/public/{BUCKET_NAME}/{path}"
-                for path in image_paths
-            ]
-            # Full list of scraped URLs for viewer display; only the 2 above are in DB/storage
-            image_urls_all = p.get("image_urls_all") or []
-            image_urls_stored_indices = p.get("image_urls_stored_indices") or []
-
-            transformed.append(
-                {
-                    "product_id": p.get("product_id"),
-                    "name": p.get("name"),
-                    "brand": p.get("brand_name") or p.get("brandName") or p.get("brand") or "Zara",
-                    "brandName": p.get("brand_name") or p.get("brandName") or p.get("brand") or "Zara",
-                    "category": p.get("category"),
-                    "subcategory": p.get("category"),  # Use category as subcategory
-                    "url": p.get("url"),
-                    "price": {
-                        "current": (
-                            float(p.get("price_current"))
-                            if p.get("price_current")
-                            else None
-                        ),
-                        "original": (
-                            float(p.get("price_original"))
-                            if p.get("price_original")
-                            else None
-                        ),
-                        "currency": p.get("currency", "USD"),
-                        "discount_percentage": None,
-                    },
-                    "description": p.get("description"),
-                    "colors": p.get("colors", []),
-                    "color": p.get("color"),  # Single color for this variant
-                    "parent_product_id": p.get(
-                        "parent_product_id"
-                    ),  # Original product ID if color variant
-                    "sizes": p.get("sizes", []),
-                    "sizes_availability": p.get(
-                        "sizes_availability", []
-                    ),  # New field with availability
-                    "sizes_checked_at": p.get(
-                        "sizes_checked_at"
-                    ),  # When sizes were last checked
-                    "materials": p.get("materials", []),
-                    "composition": p.get(
-                        "composition"
-                    ),  # Fabric composition (e.g., "100% cotton")
-                    "composition_structured": p.get(
-                        "composition_structured"
-                    ),  # Hierarchical composition data
-                    "images": image_paths,  # Store full paths for Supabase
-                    "image_urls": image_urls_stored,  # The 2 stored (Supabase public URLs)
-                    "image_urls_all": image_urls_all,  # Full list of scraped URLs (viewer display)
-                    "image_urls_stored_indices": image_urls_stored_indices,  # Which of image_urls_all are stored (for badge)
-                    "scraped_at": p.get("scraped_at"),
-                    "_source": "supabase",  # Mark source for frontend
-                    # ReFitd Canonical Tagging System fields
-                    "tags_ai_raw": p.get(
-                        "tags_ai_raw"
-                    ),  # AI sensor output with confidence
-                    "tags_final": p.get("tags_final"),  # Canonical tags for generator
-                    "curation_status_refitd": p.get(
-                        "curation_status_refitd", "pending"
-                    ),
-                    "tag_policy_version": p.get("tag_policy_version"),
-                }
-            )
-
-        # Sort by product_id
-        transformed.sort(key=lambda x: x.get("product_id", ""))
-        return transformed
-
-    except Exception as e:
-        print(f"Error fetching from Supabase: {e}")
-        return []
-
-
-def get_products_from_local():
-    """Scan data directory and load all product metadata from local files."""
-    products = []
-
-    if not DATA_DIR.exists():
-        return products
-
-    # Scan category directories
-    for category_dir in DATA_DIR.iterdir():
-        if category_dir.is_dir() and category_dir.name != "__pycache__":
-            # Scan product directories within category
-            for product_dir in category_dir.iterdir():
-                if product_dir.is_dir():
-                    metadata_file = product_dir / "metadata.json"
-                    if metadata_file.exists():
-                        try:
-                            with open(metadata_file, "r") as f:
-                                metadata = json.load(f)
-                                # Add category folder name for image paths
-                                metadata["category"] = category_dir.name
-                                metadata["_source"] = "local"
-                                metadata.setdefault("brand", "Zara")
-                                metadata.setdefault("brandName", metadata.get("brand", "Zara"))
-                                products.append(metadata)
-                        except json.JSONDecodeError:
-                            print(f"Error reading {metadata_file}")
-
-    # Sort by product_id for consistent ordering
-    products.sort(key=lambda x: x.get("product_id", ""))
-    return products
-
-
-def get_all_products():
-    """Get products from configured source (Supabase or local)."""
-    if USE_SUPABASE:
-        return get_products_from_supabase()
-    else:
-        return get_products_from_local()
-
-
-# HTML Template with embedded CSS and JavaScript
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Zara Scraper - Product Viewer</title>
-    <script src="https://cdn.plot.ly/plotly-2.27.0.min.js" async></script>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        /* Pulse animation for low stock indicator */
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.4; }
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
-            background: #f5f5f5;
-            min-height: 100vh;
-        }
-
-        header {
-            background: #000;
-            color: #fff;
-            padding: 20px;
-            text-align: center;
-        }
-
-        header h1 {
-            font-size: 24px;
-            font-weight: 300;
-            letter-spacing: 2px;
-        }
-
-        .data-source {
-            font-size: 12px;
-            margin-top: 5px;
-            padding: 4px 12px;
-            background: {{ '#4CAF50' if use_supabase else '#2196F3' }};
-            display: inline-block;
-            border-radius: 12px;
-        }
-
-        /* Curate Mode Styles */
-        .curate-btn {
-            background: #ff9800;
-            color: #fff;
-            border: none;
-            padding: 8px 20px;
-            font-size: 14px;
-            cursor: pointer;
-            border-radius: 4px;
-            margin-left: 15px;
-            transition: background 0.2s;
-        }
-
-        .curate-btn:hover {
-            background: #f57c00;
-        }
-
-        .curate-btn.active {
-            background: #4CAF50;
-        }
-
-        .curator-selector {
-            display: none;
-            margin-left: 10px;
-        }
-
-        .curator-selector.visible {
-            display: inline-block;
-        }
-
-        .curator-selector select {
-            padding: 8px 15px;
-            font-size: 14px;
-            border-radius: 4px;
-            border: none;
-            cursor: pointer;
-        }
-
-        .curator-badge {
-            display: inline-block;
-            padding: 4px 12px;
-            border-radius: 12px;
-            font-size: 12px;
-            margin-left: 10px;
-        }
-
-        .curator-reed { background: #4CAF50; color: white; }
-        .curator-gigi { background: #9C27B0; color: white; }
-        .curator-kiki { background: #E91E63; color: white; }
-
-        /* Curate Input Styles */
-        .curate-input-wrapper {
-            display: flex;
-            align-items: center;
-            gap: 8px;
-            margin-top: 10px;
-        }
-
-        .curate-input {
-            flex: 1;
-            padding: 8px 12px;
-            font-size: 14px;
-            border: 2px solid #ddd;
-            border-radius: 4px;
-            outline: none;
-            transition: border-color 0.2s;
-        }
-
-        .curate-input:focus {
-            border-color: #ff9800;
-        }
-
-        .curate-input::placeholder {
-            color: #999;
-        }
-
-        .curated-tag {
-            padding: 6px 12px;
-            border-radius: 4px;
-            font-size: 13px;
-            color: white;
-            display: inline-flex;
-            align-items: center;
-            gap: 5px;
-        }
-
-        .curated-tag .curator-name {
-            font-size: 10px;
-            opacity: 0.8;
-        }
-
-        .tag-delete-btn {
-            display: none;
-            margin-left: 5px;
-            background: rgba(255,0,0,0.2);
-            border: none;
-            color: #c00;
-            font-size: 12px;
-            cursor: pointer;
-            padding: 2px 6px;
-            border-radius: 3px;
-            line-height: 1;
-        }
-
-        .tag-delete-btn:hover {
-            background: rgba(255,0,0,0.4);
-        }
-
-        .curate-mode .tag-delete-btn {
-            display: inline-block;
-        }
-
-        .tag-container {
-            display: inline-flex;
-            align-items: center;
-            gap: 2px;
-        }
-
-        /* Rejected inferred tag styling */
-        .rejected-tag {
-            background: #ffebee !important;
-            color: #c62828 !important;
-            text-decoration: line-through;
-            opacity: 0.7;
-        }
-
-        .rejected-tag .tag-delete-btn {
-            background: rgba(76, 175, 80, 0.2);
-            color: #2e7d32;
-        }
-
-        .rejected-tag .tag-delete-btn:hover {
-            background: rgba(76, 175, 80, 0.4);
-        }
-
-        .container {
-            max-width: 1600px;
-            margin: 0 auto;
-            padding: 20px;
-            display: flex;
-            gap: 20px;
-        }
-
-        /* Category Sidebar */
-        .category-sidebar {
-            width: 260px;
-            flex-shrink: 0;
-            background: #fff;
-            border-radius: 12px;
-            box-shadow: 0 2px 12px rgba(0,0,0,0.08);
-            padding: 20px;
-            height: fit-content;
-            position: sticky;
-            top: 20px;
-        }
-
-        .sidebar-header {
-            display: flex;
-            align-items: center;
-            gap: 10px;
-            margin-bottom: 20px;
-            padding-bottom: 15px;
-            border-bottom: 2px solid #f0f0f0;
-        }
-
-        .sidebar-header h3 {
-            margin: 0;
-            font-size: 16px;
-            font-weight: 600;
-            color: #333;
-        }
-
-        .sidebar-header .category-icon {
-            font-size: 20px;
-        }
-
-        .category-list {
-            list-style: none;
-            padding: 0;
-            margin: 0;
-        }
-
-        .category-item {
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            padding: 12px 14px;
-            margin-bottom: 6px;
-            border-radius: 8px;
-            cursor: pointer;
-            transition: all 0.2s ease;
-            background: #f8f9fa;
-            border: 2px solid transparent;
-        }
-
-        .category-item:hover {
-            background: #e8f4fd;
-            border-color: #e0e0e0;
-        }
-
-        .category-item.active {
-            background: linear-gradient(135deg, #e3f2fd, #bbdefb);
-            border-color: #2196F3;
-            box-shadow: 0 2px 8px rgba(33, 150, 243, 0.2);
-        }
-
-        .category-item.all-categories {
-            background: linear-gradient(135deg, #f5f5f5, #eeeeee);
-            font-weight: 600;
-            margin-bottom: 12px;
-        }
-
-        .category-item.all-categories.active {
-            background: linear-gradient(135deg, #333, #555);
-            color: #fff;
-            border-color: #333;
-        }
-
-        .category-item.all-categories.active .category-count {
-            background: rgba(255,255,255,0.2);
-            color: #fff;
-        }
-
-        .category-name {
-            font-size: 14px;
-            font-weight: 500;
-            color: #333;
-            text-transform: capitalize;
-        }
-
-        .category-item.active .category-name {
-            color: #1565c0;
-        }
-
-        .category-item.all-categories.active .category-name {
-            color: #fff;
-        }
-
-        .category-count {
-            background: #e0e0e0;
-            color: #666;
-            font-size: 12px;
-            font-weight: 600;
-            padding: 4px 10px;
-            border-radius: 12px;
-            min-width: 28px;
-            text-align: center;
-        }
-
-        .category-item.active .category-count {
-            background: #2196F3;
-            color: #fff;
-        }
-
-        /* Subcategory styling */
-        .category-item.category-header {
-            background: linear-gradient(135deg, #f5f5f5, #eeeeee);
-            font-weight: 600;
-            margin-top: 12px;
-        }
-
-        .category-item.category-header:first-of-type {
-            margin-top: 0;
-        }
-
-        .category-item.subcategory-item {
-            padding-left: 28px;
-            background: #fff;
-            border-left: 3px solid #e0e0e0;
-            margin-left: 8px;
-            margin-bottom: 4px;
-            font-size: 13px;
-        }
-
-        .category-item.subcategory-item:hover {
-            border-left-color: #2196F3;
-        }
-
-        .category-item.subcategory-item.active {
-            background: linear-gradient(135deg, #e3f2fd, #bbdefb);
-            border-left-color: #2196F3;
-        }
-
-        .category-item.subcategory-item .category-name {
-            font-size: 13px;
-            font-weight: 400;
-        }
-
-        .category-item.subcategory-item .category-count {
-            font-size: 11px;
-            padding: 2px 8px;
-        }
-
-        /* Main content area adjustment */
-        .main-content {
-            flex: 1;
-            min-width: 0;
-        }
-
-        .navigation {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            gap: 20px;
-            margin-bottom: 30px;
-            background: #fff;
-            padding: 15px;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }
-
-        .nav-btn {
-            background: #000;
-            color: #fff;
-            border: none;
-            padding: 12px 30px;
-            font-size: 14px;
-            cursor: pointer;
-            border-radius: 4px;
-            transition: background 0.2s;
-        }
-
-        .nav-btn:hover {
-            background: #333;
-        }
-
-        .nav-btn:disabled {
-            background: #ccc;
-            cursor: not-allowed;
-        }
-
-        .counter {
-            font-size: 16px;
-            color: #666;
-        }
-
-        .product-card {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 40px;
-            background: #fff;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }
-
-        .image-section {
-            padding: 30px;
-            background: #fafafa;
-        }
-
-        .main-image {
-            width: 100%;
-            max-height: 500px;
-            object-fit: contain;
-            border-radius: 4px;
-        }
-
-        .thumbnail-row {
-            display: flex;
-            gap: 10px;
-            margin-top: 15px;
-            flex-wrap: wrap;
-        }
-
-        .thumbnail {
-            width: 80px;
-            height: 100px;
-            object-fit: cover;
-            border: 2px solid transparent;
-            border-radius: 4px;
-            cursor: pointer;
-            transition: border-color 0.2s;
-        }
-
-        .thumbnail:hover,
-        .thumbnail.active {
-            border-color: #000;
-        }
-
-        .thumbnail.selected-for-storage {
-            box-shadow: 0 0 0 3px #4CAF50;
-        }
-
-        .thumbnail-wrap {
-            position: relative;
-        }
-
-        .stored-badge {
-            position: absolute;
-            bottom: 4px;
-            left: 4px;
-            background: rgba(76, 175, 80, 0.95);
-            color: white;
-            font-size: 9px;
-            font-weight: 600;
-            padding: 2px 5px;
-            border-radius: 3px;
-            text-transform: uppercase;
-            letter-spacing: 0.3px;
-        }
-
-        .stored-badge-main {
-            position: absolute;
-            bottom: 12px;
-            left: 12px;
-            background: rgba(76, 175, 80, 0.95);
-            color: white;
-            font-size: 12px;
-            font-weight: 600;
-            padding: 6px 12px;
-            border-radius: 6px;
-            box-shadow: 0 2px 6px rgba(0,0,0,0.2);
-        }
-
-        .metadata-section {
-            padding: 30px;
-        }
-
-        .category-badge {
-            display: inline-block;
-            background: #e0e0e0;
-            color: #666;
-            padding: 4px 12px;
-            border-radius: 20px;
-            font-size: 12px;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            margin-bottom: 10px;
-        }
-
-        .category-dropdown-wrapper {
-            display: inline-block;
-            margin-bottom: 10px;
-        }
-
-        .category-dropdown {
-            padding: 6px 32px 6px 12px;
-            border-radius: 20px;
-            font-size: 11px;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            border: 2px solid #4CAF50;
-            background: white;
-            color: #333;
-            cursor: pointer;
-            font-weight: 600;
-            appearance: none;
-            -webkit-appearance: none;
-            background-image: url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='12' height='12' viewBox='0 0 12 12'%3E%3Cpath fill='%23666' d='M3 4l3 4 3-4'/%3E%3C/svg%3E");
-            background-repeat: no-repeat;
-            background-position: right 10px center;
-        }
-
-        .category-dropdown:hover {
-            border-color: #45a049;
-            background-color: #f9fff9;
-        }
-
-        .category-dropdown:focus {
-            outline: none;
-            border-color: #2e7d32;
-            box-shadow: 0 0 0 3px rgba(76, 175, 80, 0.2);
-        }
-
-        .category-dropdown optgroup {
-            font-weight: 700;
-            color: #333;
-            background: #f5f5f5;
-            padding: 8px 0;
-        }
-
-        .category-dropdown option {
-            font-weight: 400;
-            color: #666;
-            padding: 8px 12px;
-        }
-
-        .product-name {
-            font-size: 28px;
-            font-weight: 400;
-            margin-bottom: 10px;
-            color: #000;
-        }
-
-        .product-id {
-            color: #999;
-            font-size: 12px;
-            margin-bottom: 20px;
-        }
-
-        .price-section {
-            margin-bottom: 25px;
-        }
-
-        .current-price {
-            font-size: 24px;
-            font-weight: 600;
-            color: #000;
-        }
-
-        .original-price {
-            font-size: 18px;
-            color: #999;
-            text-decoration: line-through;
-            margin-left: 10px;
-        }
-
-        .discount-badge {
-            display: inline-block;
-            background: #c00;
-            color: #fff;
-            padding: 4px 8px;
-            border-radius: 4px;
-            font-size: 12px;
-            font-weight: 600;
-            margin-left: 10px;
-        }
-
-        .section-title {
-            font-size: 14px;
-            font-weight: 600;
-            color: #666;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            margin-bottom: 8px;
-            margin-top: 20px;
-        }
-
-        .description {
-            color: #444;
-            line-height: 1.6;
-        }
-
-        .tag-list {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 8px;
-        }
-
-        .tag {
-            background: #f0f0f0;
-            padding: 6px 12px;
-            border-radius: 4px;
-            font-size: 13px;
-            color: #444;
-        }
-
-        .color-variant-link {
-            transition: all 0.2s ease;
-        }
-
-        .color-variant-link:hover {
-            background: #1565c0 !important;
-            color: white !important;
-            transform: translateY(-1px);
-            box-shadow: 0 2px 4px rgba(0,0,0,0.2);
-        }
-
-        .url-link {
-            color: #0066cc;
-            text-decoration: none;
-            word-break: break-all;
-            font-size: 13px;
-        }
-
-        .url-link:hover {
-            text-decoration: underline;
-        }
-
-        .scraped-time {
-            color: #999;
-            font-size: 12px;
-            margin-top: 30px;
-        }
-
-        .no-data {
-            text-align: center;
-            padding: 100px 20px;
-            color: #666;
-        }
-
-        .no-data h2 {
-            margin-bottom: 10px;
-        }
-
-        /* Tab Navigation Styles */
-        .tab-nav {
-            display: flex;
-            justify-content: center;
-            gap: 10px;
-            margin-bottom: 20px;
-        }
-
-        .tab-btn {
-            padding: 12px 30px;
-            font-size: 14px;
-            font-weight: 500;
-            border: 2px solid #000;
-            background: #fff;
-            color: #000;
-            cursor: pointer;
-            border-radius: 4px;
-            transition: all 0.2s;
-        }
-
-        .tab-btn:hover {
-            background: #f5f5f5;
-        }
-
-        .tab-btn.active {
-            background: #000;
-            color: #fff;
-        }
-
-        .tab-content {
-            display: none;
-        }
-
-        .tab-content.active {
-            display: block;
-        }
-
-        /* Dashboard Styles */
-        .dashboard-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-
-        .stat-card {
-            background: #fff;
-            border-radius: 8px;
-            padding: 25px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            text-align: center;
-        }
-
-        .stat-card .stat-value {
-            font-size: 42px;
-            font-weight: 700;
-            color: #000;
-        }
-
-        .stat-card .stat-label {
-            font-size: 14px;
-            color: #666;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            margin-top: 5px;
-        }
-
-        .stat-card.success .stat-value { color: #4CAF50; }
-        .stat-card.warning .stat-value { color: #ff9800; }
-        .stat-card.info .stat-value { color: #2196F3; }
-
-        .chart-container {
-            background: #fff;
-            border-radius: 8px;
-            padding: 25px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            margin-bottom: 20px;
-        }
-
-        .chart-title {
-            font-size: 18px;
-            font-weight: 600;
-            margin-bottom: 15px;
-            color: #333;
-        }
-
-        .activity-list {
-            background: #fff;
-            border-radius: 8px;
-            padding: 20px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }
-
-        .activity-item {
-            padding: 12px 0;
-            border-bottom: 1px solid #eee;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-
-        .activity-item:last-child {
-            border-bottom: none;
-        }
-
-        .activity-product {
-            font-weight: 500;
-        }
-
-        .activity-curator {
-            font-size: 12px;
-            padding: 4px 8px;
-            border-radius: 12px;
-            color: #fff;
-        }
-
-        .activity-time {
-            font-size: 12px;
-            color: #999;
-        }
-
-        /* Mark Complete Button */
-        .complete-btn {
-            background: #4CAF50;
-            color: #fff;
-            border: none;
-            padding: 12px 25px;
-            font-size: 14px;
-            font-weight: 500;
-            cursor: pointer;
-            border-radius: 4px;
-            transition: background 0.2s;
-            margin-right: 10px;
-        }
-
-        .complete-btn:hover {
-            background: #388E3C;
-        }
-
-        .complete-btn.completed {
-            background: #81C784;
-        }
-
-        .complete-btn.undo {
-            background: #ff9800;
-        }
-
-        .complete-btn.undo:hover {
-            background: #f57c00;
-        }
-
-        .curation-status-badge {
-            display: inline-block;
-            padding: 6px 12px;
-            border-radius: 4px;
-            font-size: 12px;
-            font-weight: 500;
-            margin-left: 10px;
-        }
-
-        .curation-status-badge.complete {
-            background: #e8f5e9;
-            color: #2e7d32;
-        }
-
-        .curation-status-badge.pending {
-            background: #fff3e0;
-            color: #e65100;
-        }
-
-        /* Scraper Section Styles */
-        .scraper-section {
-            background: #fff;
-            border-radius: 8px;
-            padding: 25px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            margin-bottom: 30px;
-            text-align: center;
-        }
-
-        .scraper-section h3 {
-            font-size: 20px;
-            margin-bottom: 15px;
-            color: #333;
-        }
-
-        .scraper-controls {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            gap: 15px;
-            margin-bottom: 20px;
-            flex-wrap: wrap;
-        }
-
-        .scraper-controls label {
-            font-size: 14px;
-            color: #666;
-        }
-
-        .scraper-controls select,
-        .scraper-controls input {
-            padding: 8px 12px;
-            font-size: 14px;
-            border: 1px solid #ddd;
-            border-radius: 4px;
-        }
-
-        .go-btn {
-            background: linear-gradient(135deg, #4CAF50, #45a049);
-            color: #fff;
-            border: none;
-            padding: 15px 50px;
-            font-size: 18px;
-            font-weight: 600;
-            cursor: pointer;
-            border-radius: 8px;
-            transition: all 0.3s;
-            box-shadow: 0 4px 15px rgba(76, 175, 80, 0.3);
-        }
-
-        .go-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 6px 20px rgba(76, 175, 80, 0.4);
-        }
-
-        .go-btn:disabled {
-            background: #ccc;
-            cursor: not-allowed;
-            transform: none;
-            box-shadow: none;
-        }
-
-        .progress-container {
-            margin-top: 20px;
-            display: none;
-        }
-
-        .progress-container.visible {
-            display: block;
-        }
-
-        .progress-bar-wrapper {
-            background: #e0e0e0;
-            border-radius: 10px;
-            height: 20px;
-            overflow: hidden;
-            margin-bottom: 10px;
-        }
-
-        .progress-bar {
-            height: 100%;
-            background: linear-gradient(90deg, #4CAF50, #8BC34A);
-            border-radius: 10px;
-            transition: width 0.5s ease;
-            width: 0%;
-        }
-
-        .progress-text {
-            font-size: 14px;
-            color: #666;
-        }
-
-        .progress-status {
-            font-size: 16px;
-            font-weight: 500;
-            color: #333;
-            margin-bottom: 10px;
-        }
-
-        .progress-details {
-            font-size: 13px;
-            color: #888;
-        }
-
-        /* Log Viewer Styles */
-        .log-viewer {
-            background: #1e1e1e;
-            border-radius: 8px;
-            padding: 15px;
-            margin-top: 15px;
-            max-height: 300px;
-            overflow-y: auto;
-            font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace;
-            font-size: 12px;
-            line-height: 1.5;
-            text-align: left;
-            display: none;
-        }
-
-        .log-viewer.visible {
-            display: block;
-        }
-
-        .log-viewer .log-line {
-            color: #d4d4d4;
-            margin: 0;
-            padding: 2px 0;
-            white-space: pre-wrap;
-            word-break: break-all;
-        }
-
-        .log-viewer .log-line.error {
-            color: #f44336;
-        }
-
-        .log-viewer .log-line.success {
-            color: #4CAF50;
-        }
-
-        .log-viewer .log-line.warning {
-            color: #ff9800;
-        }
-
-        .log-viewer .log-line.info {
-            color: #2196F3;
-        }
-
-        .log-viewer .log-line.command {
-            color: #9cdcfe;
-        }
-
-        .log-toggle {
-            background: #333;
-            color: #fff;
-            border: none;
-            padding: 8px 16px;
-            font-size: 12px;
-            cursor: pointer;
-            border-radius: 4px;
-            margin-top: 10px;
-        }
-
-        .log-toggle:hover {
-            background: #444;
-        }
-
-        .validation-section {
-            margin-top: 30px;
-            padding-top: 20px;
-            border-top: 1px solid #eee;
-        }
-
-        .validation-btn {
-            padding: 10px 20px;
-            margin-right: 10px;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 14px;
-        }
-
-        .btn-valid {
-            background: #4CAF50;
-            color: white;
-        }
-
-        .btn-invalid {
-            background: #f44336;
-            color: white;
-        }
-
-        .validation-status {
-            margin-top: 10px;
-            font-size: 14px;
-        }
-
-        @media (max-width: 900px) {
-            .product-card {
-                grid-template-columns: 1fr;
-            }
-        }
-
-            /* AI Section Styles */
-            .ai-section {
-                background: #fff;
-                border-radius: 8px;
-                padding: 25px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                margin-bottom: 30px;
-            }
-
-            .ai-section h3 {
-                font-size: 20px;
-                margin-bottom: 15px;
-                color: #333;
-                display: flex;
-                align-items: center;
-                gap: 10px;
-            }
-
-            .ai-status {
-                display: inline-flex;
-                align-items: center;
-                gap: 6px;
-                padding: 4px 12px;
-                border-radius: 20px;
-                font-size: 12px;
-                font-weight: 500;
-            }
-
-            .ai-status.online {
-                background: #e8f5e9;
-                color: #2e7d32;
-            }
-
-            .ai-status.offline {
-                background: #ffebee;
-                color: #c62828;
-            }
-
-            .ai-status .dot {
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-            }
-
-            .ai-status.online .dot {
-                background: #4CAF50;
-                animation: pulse 2s infinite;
-            }
-
-            .ai-status.offline .dot {
-                background: #f44336;
-            }
-
-            @keyframes pulse {
-                0%, 100% { opacity: 1; }
-                50% { opacity: 0.5; }
-            }
-
-            /* AI Search */
-            .ai-search-container {
-                display: flex;
-                gap: 10px;
-                margin-bottom: 20px;
-            }
+    Raises if the client cannot be created, so startup can report the failure.
+    """
+    global _supabase_client
 
-            .ai-search-input {
-                flex: 1;
-                padding: 15px 20px;
-                font-size: 16px;
-                border: 2px solid #e0e0e0;
-                border-radius: 8px;
-                outline: none;
-                transition: border-color 0.2s, box-shadow 0.2s;
-            }
+    with _supabase_lock:
+        if _supabase_client is not None:
+            return _supabase_client
 
-            .ai-search-input:focus {
-                border-color: #9c27b0;
-                box-shadow: 0 0 0 3px rgba(156, 39, 176, 0.1);
-            }
+        # Use environment variables if available, otherwise use hardcoded defaults
+        supabase_url = os.getenv("SUPABASE_URL") or DEFAULT_SUPABASE_URL
+        supabase_key = os.getenv("SUPABASE_KEY") or DEFAULT_SUPABASE_KEY
 
-            .ai-search-input::placeholder {
-                color: #999;
-            }
+        from supabase import create_client
 
-            .ai-search-btn {
-                padding: 15px 30px;
-                background: linear-gradient(135deg, #9c27b0, #7b1fa2);
-                color: #fff;
-                border: none;
-                border-radius: 8px;
-                font-size: 16px;
-                font-weight: 500;
-                cursor: pointer;
-                transition: all 0.2s;
-            }
+        _supabase_client = create_client(supabase_url, supabase_key)
+        return _supabase_client
 
-            .ai-search-btn:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 4px 15px rgba(156, 39, 176, 0.3);
-            }
 
-            .ai-search-btn:disabled {
-                background: #ccc;
-                cursor: not-allowed;
-                transform: none;
-                box-shadow: none;
-            }
+def _get_supabase():
+    """Return the Supabase client, creating it on first use.
 
-            /* AI Results */
-            .ai-results {
-                display: grid;
-                grid-template-columns: repeat(auto-fill, minmax(250px, 1fr));
-                gap: 20px;
-                margin-top: 20px;
-            }
+    Returns None when the viewer is reading local files or the client
+    cannot be created.
+    """
+    if not USE_SUPABASE:
+        return None
+    # Fast path: no lock once the client exists
+    if _supabase_client is not None:
+        return _supabase_client
+    try:
+        return init_supabase()
+    except Exception as e:
+        logger.warning("Could not create Supabase client: %s", e)
+        return None
 
-            .ai-result-card {
-                background: #fafafa;
-                border-radius: 8px;
-                overflow: hidden;
-                transition: transform 0.2s, box-shadow 0.2s;
-                cursor: pointer;
-            }
 
-            .ai-result-card:hover {
-                transform: translateY(-4px);
-                box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-            }
+def get_storage_public_prefix():
+    """Return the public object URL prefix for BUCKET_NAME; append a storage path to it.
 
-            .ai-result-card img {
-                width: 100%;
-                height: 200px;
-                object-fit: cover;
-            }
+    The bucket is public, so plain concatenation is the cheapest way to build
+    image URLs. If signed URLs are ever needed, compile a template such as
+    "{base}/storage/v1/object/sign/{bucket}/{path}?token={token}" once and
+    fill it per image with str.format_map instead.
+    """
+    supabase_url = os.getenv("SUPABASE_URL") or DEFAULT_SUPABASE_URL
+    return f"{supabase_url}/storage/v1/object/public/{BUCKET_NAME}/"
 
-            .ai-result-card .card-content {
-                padding: 15px;
-            }
 
-            .ai-result-card .card-title {
-                font-size: 14px;
-                font-weight: 500;
-                margin-bottom: 5px;
-                color: #333;
-            }
+def get_products_from_supabase():
+    """Fetch all products from Supabase database.
 
-            .ai-result-card .card-price {
-                font-size: 16px;
-                font-weight: 600;
-                color: #000;
-            }
+    Raises if the client is unavailable or the query fails, so a transient
+    error is never cached as an empty catalog.
+    """
+    supabase_client = _get_supabase()
+    if supabase_client is None:
+        raise RuntimeError("Supabase client unavailable")
 
-            .ai-result-card .card-similarity {
-                font-size: 11px;
-                color: #9c27b0;
-                margin-top: 5px;
-            }
+    try:
+        result = (
+            supabase_client.table("products")
+            .select("*")
+            .order("product_id")
+            .execute()
+        )
+        products = result.data or []
 
-            /* Reset to Original Button */
-            .reset-metadata-btn {
-                background: linear-gradient(135deg, #ef5350, #c62828);
-                color: #fff;
-                border: none;
-                padding: 8px 14px;
-                border-radius: 6px;
-                font-size: 12px;
-                font-weight: 500;
-                cursor: pointer;
-                transition: all 0.2s;
-                margin-left: 10px;
-            }
+        # Transform database format to match local file format for frontend compatibility
+        transformed = []
+        # Bind hot-loop lookups to locals (LOAD_FAST instead of global/attribute lookups)
+        append = transformed.append
+        to_float = float
+        for p in products:
+            # Stored image URLs are built in the browser from storage_prefix + path,
+            # and only for the product being viewed
+            image_paths = p.get("image_paths") or []
+            # Full list of scraped URLs for viewer display; only the 2 above are in DB/storage
+            image_urls_all = p.get("image_urls_all") or []
+            image_urls_stored_indices = p.get("image_urls_stored_indices") or []
 
-            .reset-metadata-btn:hover {
-                background: linear-gradient(135deg, #f44336, #b71c1c);
-                transform: translateY(-1px);
-                box-shadow: 0 2px 8px rgba(198, 40, 40, 0.3);
-            }
+            # Read each repeated field once; explicit None checks keep 0.0 prices
+            price_current = p.get("price_current")
+            price_original = p.get("price_original")
+            brand = p.get("brand_name") or p.get("brandName") or p.get("brand") or "Zara"
+            category = p.get("category")
 
-            .reset-metadata-btn:disabled {
-                opacity: 0.6;
-                cursor: not-allowed;
-                transform: none;
-            }
+            append(
+                {
+                    "product_id": p.get("product_id"),
+                    "name": p.get("name"),
+                    "brand": brand,
+                    "brandName": brand,
+                    "category": category,
+                    "subcategory": category,  # Use category as subcategory
+                    "url": p.get("url"),
+                    "price": {
+                        "current": (
+                            to_float(price_current) if price_current is not None else None
+                        ),
+                        "original": (
+                            to_float(price_original) if price_original is not None else None
+                        ),
+                        "currency": p.get("currency", "USD"),
+                        "discount_percentage": None,
+                    },
+                    "description": p.get("description"),
+                    "colors": p.get("colors", []),
+                    "color": p.get("color"),  # Single color for this variant
+                    "parent_product_id": p.get(
+                        "parent_product_id"
+                    ),  # Original product ID if color variant
+                    "sizes": p.get("sizes", []),
+                    "sizes_availability": p.get(
+                        "sizes_availability", []
+                    ),  # New field with availability
+                    "sizes_checked_at": p.get(
+                        "sizes_checked_at"
+                    ),  # When sizes were last checked
+                    "materials": p.get("materials", []),
+                    "composition": p.get(
+                        "composition"
+                    ),  # Fabric composition (e.g., "100% cotton")
+                    "composition_structured": p.get(
+                        "composition_structured"
+                    ),  # Hierarchical composition data
+                    "images": image_paths,  # Storage paths of the 2 stored images
+                    "image_urls_all": image_urls_all,  # Full list of scraped URLs (viewer display)
+                    "image_urls_stored_indices": image_urls_stored_indices,  # Which of image_urls_all are stored (for badge)
+                    "scraped_at": p.get("scraped_at"),
+                    "_source": "supabase",  # Mark source for frontend
+                    # ReFitd Canonical Tagging System fields
+                    "tags_ai_raw": p.get(
+                        "tags_ai_raw"
+                    ),  # AI sensor output with confidence
+                    "tags_final": p.get("tags_final"),  # Canonical tags for generator
+                    "curation_status_refitd": p.get(
+                        "curation_status_refitd", "pending"
+                    ),
+                    "tag_policy_version": p.get("tag_policy_version"),
+                }
+            )
 
-            /* AI Generated Tag Styling - Teal/Cyan color */
-            .ai-generated-tag {
-                background: linear-gradient(135deg, #00bcd4, #0097a7) !important;
-                color: #fff !important;
-                padding: 6px 12px;
-                border-radius: 4px;
-                font-size: 13px;
-                display: inline-flex;
-                align-items: center;
-                gap: 5px;
-            }
+        # Rows arrive ordered by product_id from the query above
+        return transformed
 
-            .ai-generated-tag .ai-badge {
-                font-size: 10px;
-                opacity: 0.9;
-                background: rgba(255,255,255,0.2);
-                padding: 1px 4px;
-                border-radius: 3px;
-            }
+    except Exception as e:
+        print(f"Error fetching from Supabase: {e}")
+        raise
 
-            .ai-generated-tag .tag-delete-btn {
-                display: none;
-                margin-left: 5px;
-                background: rgba(255,255,255,0.2);
-                border: none;
-                color: #fff;
-                font-size: 12px;
-                cursor: pointer;
-                padding: 2px 6px;
-                border-radius: 3px;
-                line-height: 1;
-            }
 
-            .ai-generated-tag .tag-delete-btn:hover {
-                background: rgba(255,0,0,0.3);
-            }
+_PRODUCT_ID_KEY = operator.itemgetter("product_id")
 
-            .curate-mode .ai-generated-tag .tag-delete-btn {
-                display: inline-block;
-            }
 
-            .curate-mode .ai-tag-delete {
-                display: inline-block;
-            }
+def _load_category(category_entry):
+    """Load every product's metadata.json within a single category directory."""
+    products = []
+    # Bind hot-loop lookups to locals (LOAD_FAST instead of global/attribute lookups)
+    append = products.append
+    join = os.path.join
+    json_load = json.load
+    category_name = category_entry.name
+    with os.scandir(category_entry.path) as product_entries:
+        for product_entry in product_entries:
+            if not product_entry.is_dir(follow_symlinks=False):
+                continue
+            metadata_file = join(product_entry.path, "metadata.json")
+            try:
+                with open(metadata_file, "r") as f:
+                    metadata = json_load(f)
+            except FileNotFoundError:
+                continue
+            except json.JSONDecodeError:
+                logger.warning("Error reading %s", metadata_file)
+                continue
+            # Add category folder name for image paths
+            metadata["category"] = category_name
+            metadata.setdefault("product_id", product_entry.name)
+            metadata["_source"] = "local"
+            metadata.setdefault("brand", "Zara")
+            metadata.setdefault("brandName", metadata.get("brand", "Zara"))
+            append(metadata)
+    # Sort within the worker so the main thread only has to merge shards
+    products.sort(key=_PRODUCT_ID_KEY)
+    return products
 
-            .ai-progress {
-                display: none;
-                align-items: center;
-                gap: 10px;
-                color: #666;
-            }
 
-            .ai-progress.visible {
-                display: flex;
-            }
+def get_products_from_local():
+    """Scan data directory and load all product metadata from local files."""
+    if not DATA_DIR.exists():
+        return []
 
-            .ai-spinner {
-                width: 20px;
-                height: 20px;
-                border: 3px solid #e0e0e0;
-                border-top-color: #9c27b0;
-                border-radius: 50%;
-                animation: spin 1s linear infinite;
-            }
+    # Scan category directories; DirEntry.is_dir reuses the cached d_type
+    with os.scandir(DATA_DIR) as category_entries:
+        categories = [
+            entry
+            for entry in category_entries
+            if entry.is_dir(follow_symlinks=False) and entry.name != "__pycache__"
+        ]
 
-            @keyframes spin {
-                to { transform: rotate(360deg); }
-            }
+    if not categories:
+        return []
 
-            /* AI Chat Widget */
-            .ai-chat-container {
-                background: #f8f9fa;
-                border-radius: 8px;
-                padding: 20px;
-                margin-top: 20px;
-            }
+    # Metadata parsing is IO-bound, so fan out one worker per category
+    max_workers = min(32, (os.cpu_count() or 1) * 4, len(categories))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        shards = list(executor.map(_load_category, categories))
 
-            .ai-chat-messages {
-                max-height: 400px;
-                overflow-y: auto;
-                margin-bottom: 15px;
-                padding: 10px;
-                background: #fff;
-                border-radius: 8px;
-                min-height: 200px;
-            }
+    # Each shard is already sorted by product_id; merge for consistent ordering
+    return list(heapq.merge(*shards, key=_PRODUCT_ID_KEY))
 
-            .ai-chat-message {
-                margin-bottom: 15px;
-                padding: 12px 15px;
-                border-radius: 12px;
-                max-width: 85%;
-            }
 
-            .ai-chat-message.user {
-                background: #e3f2fd;
-                margin-left: auto;
-                border-bottom-right-radius: 4px;
-            }
+# ============================================
+# PRODUCT LIST CACHE
+# ============================================
+# Product data only changes when the scraper runs or a product is edited here,
+# so keep the last fetch and refetch when the version is bumped or the TTL lapses.
+PRODUCTS_CACHE_TTL = 60  # seconds
+_products_cache = None
+_products_cache_version = 0
+_products_fetched_version = -1
+_products_fetched_at = 0.0
+# Future for the fetch currently in flight, shared by concurrent callers, and
+# the cache version it was started at
+_products_fetch = None
+_products_fetch_version = -1
+_products_fetch_lock = threading.Lock()
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+
+def invalidate_products_cache():
+    """Mark the cached product list stale so the next read refetches it."""
+    global _products_cache_version
+    _products_cache_version += 1
+
+
+def _products_cache_is_fresh():
+    """Return True if the cached product list can be served as-is."""
+    return (
+        _products_cache is not None
+        and _products_fetched_version == _products_cache_version
+        and time.monotonic() - _products_fetched_at < PRODUCTS_CACHE_TTL
+    )
 
-            .ai-chat-message.assistant {
-                background: #f3e5f5;
-                margin-right: auto;
-                border-bottom-left-radius: 4px;
-            }
 
-            .ai-chat-message .role {
-                font-size: 11px;
-                font-weight: 600;
-                text-transform: uppercase;
-                margin-bottom: 5px;
-                color: #666;
-            }
+def get_all_products():
+    """Get products from configured source (Supabase or local)."""
+    global _products_cache, _products_fetched_version, _products_fetched_at
+    global _products_fetch, _products_fetch_version
+
+    if _products_cache_is_fresh():
+        return _products_cache
+
+    # Callers share one in-flight fetch, but only while it was started at the
+    # current cache version; after an invalidation a new fetch is started so
+    # the caller sees its own write
+    with _products_fetch_lock:
+        if _products_cache_is_fresh():
+            return _products_cache
+        version = _products_cache_version
+        fetch = _products_fetch
+        if fetch is not None and _products_fetch_version == version:
+            owner = False
+        else:
+            fetch = _products_fetch = Future()
+            _products_fetch_version = version
+            owner = True
+    if not owner:
+        return fetch.result()
 
-            .ai-chat-input-container {
-                display: flex;
-                gap: 10px;
-            }
+    try:
+        if USE_SUPABASE:
+            products = get_products_from_supabase()
+        else:
+            products = get_products_from_local()
+
+        with _products_fetch_lock:
+            # An older fetch finishing late must not replace newer data
+            if version >= _products_fetched_version:
+                _products_cache = products
+                _products_fetched_version = version
+                _products_fetched_at = time.monotonic()
+        fetch.set_result(products)
+        return products
+    except BaseException as e:
+        fetch.set_exception(e)
+        raise
+    finally:
+        with _products_fetch_lock:
+            if _products_fetch is fetch:
+                _products_fetch = None
 
-            .ai-chat-input {
-                flex: 1;
-                padding: 12px 15px;
-                border: 2px solid #e0e0e0;
-                border-radius: 8px;
-                font-size: 14px;
-                outline: none;
-            }
 
-            .ai-chat-input:focus {
-                border-color: #9c27b0;
-            }
+def prefetch_products():
+    """Start loading products in the background if the cache is stale.
 
-            .ai-chat-send {
-                padding: 12px 25px;
-                background: #9c27b0;
-                color: #fff;
-                border: none;
-                border-radius: 8px;
-                cursor: pointer;
-                font-weight: 500;
-            }
+    Called when the page shell is served, so the fetch overlaps with the
+    browser parsing the page before it requests /api/products.
+    """
+    if not _products_cache_is_fresh():
+        _prefetch_executor.submit(get_all_products)
 
-            .ai-chat-send:hover {
-                background: #7b1fa2;
-            }
 
-            .no-results {
-                text-align: center;
-                padding: 40px;
-                color: #666;
-            }
-    </style>
+# HTML Template with embedded CSS and JavaScript
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Zara Scraper - Product Viewer</title>
+    <script src="https://cdn.plot.ly/plotly-2.27.0.min.js" async></script>
+    <link rel="stylesheet" href="/static/viewer.{{ viewer_css_digest }}.css">
+    <script src="/static/classifier.{{ classifier_js_digest }}.js"></script>
 </head>
 <body>
     <header>
         <h1>ZARA PRODUCT VIEWER</h1>
         <div style="margin-top: 10px;">
-            <span class="data-source">{{ '🗄️ Supabase Database' if use_supabase else '📁 Local Files' }}</span>
+            <span class="data-source{{ ' supabase' if use_supabase }}">{{ '🗄️ Supabase Database' if use_supabase else '📁 Local Files' }}</span>
             <button class="curate-btn" id="curateBtn" onclick="toggleCurateMode()">✏️ Curate</button>
             <span class="curator-selector" id="curatorSelector">
                 <select id="curatorSelect" onchange="selectCurator(this.value)">
@@ -1589,7 +454,7 @@ HTML_TEMPLATE = """
                 <h3>Categories</h3>
             </div>
             <ul class="category-list" id="categoryList">
-                <li class="category-item all-categories active" data-category="all" onclick="filterByCategory('all')">
+                <li class="category-item all-categories active" data-category="all">
                     <span class="category-name">All Products</span>
                     <span class="category-count" id="allCount">0</span>
                 </li>
@@ -1619,6 +484,9 @@ HTML_TEMPLATE = """
                     <h2>Loading products...</h2>
                 </div>
             </div>
+
+            <!-- Cloned once per product image by buildThumbnails() -->
+            <template id="thumbTemplate"><div class="thumbnail-wrap" style="position:relative;display:inline-block;"><img class="thumbnail" loading="lazy" decoding="async" width="80" height="100" alt=""><span class="stored-badge" title="Stored for outfit generator">Stored</span></div></template>
         </div>
 
         <!-- AI Tab Content -->
@@ -1656,6 +524,7 @@ HTML_TEMPLATE = """
 
                 <div class="ai-chat-container">
                     <div class="ai-chat-messages" id="chatMessages">
+                        <div id="chatHistorySentinel" style="height: 1px;"></div>
                         <div class="ai-chat-message assistant">
                             <div class="role">Assistant</div>
                             <div>Hello! I'm your fashion assistant. Ask me about styling advice, outfit combinations, or help finding the perfect items from our catalog.</div>
@@ -1687,11 +556,19 @@ HTML_TEMPLATE = """
     <script>
         let products = [];
         let allProducts = [];  // Store all products for filtering
-        let filteredProducts = [];  // Currently filtered products
+        // Currently filtered products. May be the allProducts array itself, so
+        // product lists are never mutated in place - deletion builds new arrays.
+        let filteredProducts = [];
+        let categoryIndex = {};  // 'main' / 'main-sub' -> Uint32Array of allProducts indices
+        let productIds = new Set();  // product_id of every loaded product
+        let categoryItems = new Map();  // data-category -> sidebar <li>
+        let activeCategoryItem = null;
         let currentIndex = 0;
         let currentImageIndex = 0;
         let currentCategory = 'all';  // Track selected category
         const useSupabase = {{ 'true' if use_supabase else 'false' }};
+        // Public URL prefix for stored images; prepend to a product's storage path
+        const STORAGE_PUBLIC_PREFIX = {{ storage_prefix|tojson }};
 
         // Category organization structure - matches Zara's website navigation
         const CATEGORY_STRUCTURE = {
@@ -1739,246 +616,193 @@ HTML_TEMPLATE = """
                     vests: { label: 'Vests', icon: '🦺', keywords: ['vest', 'gilet', 'waistcoat', 'bodywarmer'] }
                 }
             },
-            shoes: {
-                label: 'Footwear',
-                icon: '👟',
-                subcategories: {
-                    shoes: { label: 'Shoes', icon: '👟', keywords: ['shoe', 'sneaker', 'loafer', 'derby', 'oxford', 'sandal', 'slipper', 'moccasin', 'espadrille'] },
-                    boots: { label: 'Boots', icon: '🥾', keywords: ['boot', 'chelsea', 'ankle boot', 'combat boot'] }
-                }
-            }
-        };
-
-        /**
-         * GARMENT TYPE DETECTION
-         *
-         * This function classifies products based on the PRODUCT NAME only.
-         * The category field in the database is UNRELIABLE and should not be trusted.
-         *
-         * Classification priority (checked in order - first match wins):
-         * 1. Bottoms (pants, shorts, jeans, trousers) - very distinctive names
-         * 2. Shoes/Boots (footwear, sneakers, boots) - very distinctive names
-         * 3. Outerwear (jackets, coats, blazers, leather) - check before tops
-         * 4. Mid layer (sweaters, hoodies, sweatshirts, quarter-zip) - check before base
-         * 5. Base layer (t-shirts, shirts, polos) - most generic, check last
-         */
-
-        // Helper function to check if a word exists as a complete word (not part of another word)
-        function hasWord(text, word) {
-            // Create a regex that matches the word with word boundaries
-            // This prevents "pants" from matching in "participants"
-            // Note: Escaping special regex characters in the word
-            const escaped = word.replace(/[.*+?^${}()|[\\]\\\\]/g, '\\\\$&');
-            const regex = new RegExp('\\\\b' + escaped + '(s|es)?\\\\b', 'i');
-            return regex.test(text);
-        }
-
-        // Helper function to check if any of the keywords match
-        function hasAnyWord(text, keywords) {
-            return keywords.some(kw => hasWord(text, kw));
-        }
-
-        function classifyProduct(product) {
-            // ONLY use the product name for classification - it's the most reliable
-            const name = (product.name || '').toLowerCase();
-
-            // ============================================================
-            // STEP 1: Check for BOTTOMS first (pants, shorts, jeans, trousers, swimwear)
-            // These have very distinctive names that won't conflict with other categories
-            // ============================================================
-
-            // Use DB category if it's swimwear (scraped from Zara beachwear)
-            if ((product.category || '').toLowerCase() === 'swimwear') {
-                return { main: 'bottoms', sub: 'swimwear', displayCategory: 'Swimwear' };
-            }
-            // DB stores "footwear" for shoe products (generator query); display as Footwear
-            if ((product.category || '').toLowerCase() === 'footwear') {
-                return { main: 'shoes', sub: 'shoes', displayCategory: 'Footwear' };
-            }
-
-            // Check for swimwear by name (swim trunks, beach shorts, etc.) BEFORE shorts
-            if (hasAnyWord(name, ['swim trunk', 'swim short', 'swimwear', 'bathing short', 'beach short', 'board short'])) {
-                return { main: 'bottoms', sub: 'swimwear', displayCategory: 'Swimwear' };
-            }
-
-            // Check for shorts FIRST (before pants, since "shorts" is more specific)
-            if (hasAnyWord(name, ['short', 'bermuda'])) {
-                // Make sure it's not "short sleeve" which is a top
-                if (!hasAnyWord(name, ['sleeve', 'shirt', 'top', 'tee', 't-shirt'])) {
-                    return { main: 'bottoms', sub: 'shorts', displayCategory: 'Shorts' };
-                }
-            }
-
-            // Check for jeans (before generic pants)
-            if (hasAnyWord(name, ['jean', 'denim pant', 'denim trouser'])) {
-                return { main: 'bottoms', sub: 'jeans', displayCategory: 'Jeans' };
-            }
-
-            // Check for sweatsuits/tracksuits
-            if (hasAnyWord(name, ['sweatsuit', 'tracksuit', 'track pant', 'jogger set', 'matching set'])) {
-                return { main: 'bottoms', sub: 'sweatsuits', displayCategory: 'Sweatsuits' };
-            }
-
-            // Check for pants/trousers
-            if (hasAnyWord(name, ['pant', 'trouser', 'chino', 'jogger', 'cargo pant', 'dress pant', 'suit pant', 'slack'])) {
-                return { main: 'bottoms', sub: 'pants', displayCategory: 'Pants' };
-            }
-
-            // ============================================================
-            // STEP 2: Check for FOOTWEAR (Shoes & Boots)
-            // ============================================================
-
-            // Check boots first (more specific than shoes)
-            if (hasAnyWord(name, ['boot', 'chelsea', 'combat boot', 'ankle boot', 'hiking boot'])) {
-                return { main: 'shoes', sub: 'boots', displayCategory: 'Boots' };
-            }
-
-            // Check for shoes
-            if (hasAnyWord(name, ['shoe', 'sneaker', 'loafer', 'derby', 'sandal', 'slipper', 'moccasin', 'espadrille', 'trainer'])) {
-                return { main: 'shoes', sub: 'shoes', displayCategory: 'Shoes' };
-            }
-
-            // ============================================================
-            // STEP 3: Check for OUTERWEAR (jackets, coats, blazers, vests)
-            // Check these BEFORE tops because "jacket" might contain other words
-            // ============================================================
-
-            // Blazers (specific outerwear)
-            if (hasAnyWord(name, ['blazer', 'sport coat', 'sportcoat'])) {
-                return { main: 'outerwear', sub: 'blazers', displayCategory: 'Blazers' };
-            }
-
-            // Suits (check before generic jacket - "suit jacket" should be suits)
-            if (hasWord(name, 'suit') && !hasAnyWord(name, ['sweatsuit', 'tracksuit'])) {
-                return { main: 'outerwear', sub: 'suits', displayCategory: 'Suits' };
-            }
-
-            // Coats (includes puffers, parkas, trenches)
-            if (hasAnyWord(name, ['coat', 'parka', 'puffer', 'trench', 'overcoat', 'topcoat'])) {
-                return { main: 'outerwear', sub: 'coats', displayCategory: 'Coats' };
-            }
-
-            // Vests/Gilets
-            if (hasAnyWord(name, ['vest', 'gilet', 'waistcoat', 'bodywarmer'])) {
-                return { main: 'outerwear', sub: 'vests', displayCategory: 'Vests' };
-            }
-
-            // Overshirts / Shackets (between shirt and jacket)
-            if (hasAnyWord(name, ['overshirt', 'shacket', 'shirt jacket'])) {
-                return { main: 'outerwear', sub: 'overshirts', displayCategory: 'Overshirts' };
-            }
-
-            // Jackets (general - check after more specific outerwear)
-            if (hasAnyWord(name, ['jacket', 'bomber', 'windbreaker', 'anorak', 'trucker', 'down jacket', 'quilted', 'padded'])) {
-                return { main: 'outerwear', sub: 'jackets', displayCategory: 'Jackets' };
-            }
-
-            // ============================================================
-            // STEP 4: Check for MID LAYER tops (sweaters, hoodies, sweatshirts, quarter-zip)
-            // Check these BEFORE base layer because "sweatshirt" contains "shirt"
-            // ============================================================
-
-            // Quarter-zip (check before sweaters)
-            if (hasAnyWord(name, ['quarter zip', 'quarter-zip', 'half zip', 'half-zip', '1/4 zip'])) {
-                return { main: 'tops_mid', sub: 'quarterzip', displayCategory: 'Quarter Zip' };
-            }
-
-            // Sweatshirts (check BEFORE checking for "shirt")
-            if (hasAnyWord(name, ['sweatshirt', 'crewneck sweat', 'crew neck sweat', 'fleece'])) {
-                return { main: 'tops_mid', sub: 'sweatshirts', displayCategory: 'Sweatshirts' };
-            }
-
-            // Hoodies
-            if (hasAnyWord(name, ['hoodie', 'hooded'])) {
-                return { main: 'tops_mid', sub: 'hoodies', displayCategory: 'Hoodies' };
+            shoes: {
+                label: 'Footwear',
+                icon: '👟',
+                subcategories: {
+                    shoes: { label: 'Shoes', icon: '👟', keywords: ['shoe', 'sneaker', 'loafer', 'derby', 'oxford', 'sandal', 'slipper', 'moccasin', 'espadrille'] },
+                    boots: { label: 'Boots', icon: '🥾', keywords: ['boot', 'chelsea', 'ankle boot', 'combat boot'] }
+                }
             }
+        };
 
-            // Cardigans (check before generic sweaters)
-            if (hasWord(name, 'cardigan')) {
-                return { main: 'tops_mid', sub: 'cardigans', displayCategory: 'Cardigans' };
+        function deepFreeze(value) {
+            if (value && typeof value === 'object' && !Object.isFrozen(value)) {
+                Object.values(value).forEach(deepFreeze);
+                Object.freeze(value);
+            }
+            return value;
+        }
+        deepFreeze(CATEGORY_STRUCTURE);
+
+        // Flat, frozen view of CATEGORY_STRUCTURE in display order: one row per
+        // subcategory, so renderers walk a single array.
+        const SUBCATEGORIES = Object.freeze(
+            Object.entries(CATEGORY_STRUCTURE).flatMap(([main, group]) =>
+                Object.entries(group.subcategories).map(([sub, config]) => Object.freeze({
+                    main,
+                    mainLabel: group.label,
+                    mainIcon: group.icon,
+                    sub,
+                    label: config.label,
+                    icon: config.icon,
+                    keywords: config.keywords
+                }))
+            )
+        );
+
+        // Subcategory key -> label (first main category wins, as in the nested lookup)
+        const SUBCATEGORY_LABELS = new Map();
+        for (const row of SUBCATEGORIES) {
+            if (!SUBCATEGORY_LABELS.has(row.sub)) SUBCATEGORY_LABELS.set(row.sub, row.label);
+        }
+
+        // Garment classification (CLASSIFIER_RULES, classifyProductUncached,
+        // indexProductText) lives in static/classifier.js, loaded before this
+        // script and also run as a worker for large catalogs.
+        const CLASSIFIER_SCRIPT_URL = '/static/classifier.{{ classifier_js_digest }}.js';
+        const CLASSIFY_WORKER_THRESHOLD = 2000;
+
+        // Classifications are memoized per product and stored on it as `_cat` when
+        // the list loads; call reclassifyProduct() after editing a product's name,
+        // category or tags_final.
+        // Keyed by the product object itself, so entries for products dropped by a
+        // reload are garbage-collected and same-named products never collide.
+        let _classifyCache = new WeakMap();
+
+        function forgetClassification(product) {
+            if (product) {
+                _classifyCache.delete(product);
+            } else {
+                _classifyCache = new WeakMap();
             }
+        }
 
-            // Sweaters/Knits
-            if (hasAnyWord(name, ['sweater', 'knit', 'pullover', 'jumper', 'knitwear'])) {
-                return { main: 'tops_mid', sub: 'sweaters', displayCategory: 'Sweaters' };
+        function reclassifyProduct(product) {
+            const previous = product._cat;
+            indexProductText(product);
+            forgetClassification(product);
+            product._cat = classifyProduct(product);
+            if (!previous || previous.main !== product._cat.main || previous.sub !== product._cat.sub) {
+                buildCategoryIndex();
+                updateCategoryCounts([
+                    ...(previous ? categoryKeys(previous) : []),
+                    ...categoryKeys(product._cat)
+                ]);
             }
+        }
 
-            // ============================================================
-            // STEP 5: Check for BASE LAYER tops (t-shirts, shirts, polos, tanks)
-            // These are the most generic categories - check last
-            // ============================================================
-
-            // T-shirts (check before generic "shirt")
-            if (hasAnyWord(name, ['t-shirt', 'tshirt', 'tee'])) {
-                return { main: 'tops_base', sub: 'tshirts', displayCategory: 'T-Shirts' };
-            }
+        // The sidebar / categoryIndex keys a classification is counted under
+        function categoryKeys({ main, sub }) {
+            return sub ? [main, `${main}-${sub}`] : [main];
+        }
 
-            // Tank tops
-            if (hasAnyWord(name, ['tank', 'sleeveless top', 'muscle tee'])) {
-                return { main: 'tops_base', sub: 'tanks', displayCategory: 'Tank Tops' };
+        // Group allProducts indices by main category and by 'main-sub' (the same
+        // keys as the sidebar's data-category), so filters and counts are lookups.
+        function buildCategoryIndex() {
+            const groups = {};
+            for (let i = 0; i < allProducts.length; i++) {
+                const { main, sub } = allProducts[i]._cat;
+                (groups[main] || (groups[main] = [])).push(i);
+                if (sub) {
+                    const key = `${main}-${sub}`;
+                    (groups[key] || (groups[key] = [])).push(i);
+                }
             }
+            const index = {};
+            for (const key in groups) {
+                index[key] = Uint32Array.from(groups[key]);
+            }
+            categoryIndex = index;
+        }
+
+        function classifyInWorker(list) {
+            return new Promise((resolve, reject) => {
+                const worker = new Worker(CLASSIFIER_SCRIPT_URL);
+                worker.onmessage = event => {
+                    worker.terminate();
+                    resolve(event.data);
+                };
+                worker.onerror = event => {
+                    worker.terminate();
+                    reject(event);
+                };
+                // Only the fields the classifier reads are cloned across
+                worker.postMessage(list.map(p => ({
+                    name: p.name,
+                    category: p.category,
+                    tags_final: p.tags_final
+                        ? { category: p.tags_final.category, top_layer_role: p.tags_final.top_layer_role }
+                        : null
+                })));
+            });
+        }
 
-            // Polos
-            if (hasWord(name, 'polo')) {
-                return { main: 'tops_base', sub: 'polos', displayCategory: 'Polo Shirts' };
+        // Set `_cat` on every product. Large catalogs are classified in a worker so
+        // the first paint and user input aren't blocked by the pass.
+        async function classifyAllProducts(list) {
+            forgetClassification();
+            list.forEach(indexProductText);
+            if (list.length >= CLASSIFY_WORKER_THRESHOLD && window.Worker) {
+                try {
+                    const results = await classifyInWorker(list);
+                    list.forEach((p, i) => { p._cat = results[i]; });
+                    return;
+                } catch (err) {
+                    console.warn('Classifier worker failed; classifying on the main thread', err);
+                }
             }
+            list.forEach(p => { p._cat = classifyProduct(p); });
+        }
 
-            // Shirts (most generic - only if nothing else matched)
-            if (hasWord(name, 'shirt')) {
-                return { main: 'tops_base', sub: 'shirts', displayCategory: 'Shirts' };
-            }
+        function categoryCount(key) {
+            const indices = categoryIndex[key];
+            return indices ? indices.length : 0;
+        }
 
-            // ============================================================
-            // STEP 6: Fallback - use tags_final if available
-            // ============================================================
-            const tagsFinal = product.tags_final;
-            if (tagsFinal && tagsFinal.category) {
-                const cat = tagsFinal.category.toLowerCase();
-                if (cat === 'bottom') {
-                    return { main: 'bottoms', sub: 'pants', displayCategory: 'Pants' };
-                }
-                if (cat === 'outerwear') {
-                    return { main: 'outerwear', sub: 'jackets', displayCategory: 'Jackets' };
-                }
-                if (cat === 'shoes') {
-                    return { main: 'shoes', sub: 'shoes', displayCategory: 'Shoes' };
-                }
-                if (cat === 'top_mid' || (tagsFinal.top_layer_role === 'mid')) {
-                    return { main: 'tops_mid', sub: 'sweaters', displayCategory: 'Sweaters' };
-                }
-                if (cat === 'top_base' || cat === 'top' || (tagsFinal.top_layer_role === 'base')) {
-                    return { main: 'tops_base', sub: 'tshirts', displayCategory: 'T-Shirts' };
-                }
-            }
+        function classifyProduct(product) {
+            const hit = _classifyCache.get(product);
+            if (hit) return hit;
 
-            // ============================================================
-            // STEP 7: Last resort - uncategorized
-            // ============================================================
-            return { main: 'other', sub: null, displayCategory: 'Other' };
+            const result = classifyProductUncached(product);
+            _classifyCache.set(product, result);
+            return result;
         }
 
+
         // Get the display category name for a product (used for the badge)
         function getDisplayCategory(product) {
-            const classification = classifyProduct(product);
-            return classification.displayCategory || 'Other';
+            return product._cat.displayCategory || 'Other';
         }
 
         // Build category dropdown options HTML for reclassification
+        // CATEGORY_STRUCTURE is frozen, so the options HTML only varies with the
+        // selected subcategory; build each variant once.
+        const _dropdownOptionsCache = new Map();
+
         function buildCategoryDropdownOptions(currentSubcategory) {
-            let html = '';
-            const orderedCategories = ['tops_base', 'tops_mid', 'bottoms', 'outerwear', 'shoes'];
+            let html = _dropdownOptionsCache.get(currentSubcategory);
+            if (html === undefined) {
+                html = renderCategoryDropdownOptions(currentSubcategory);
+                _dropdownOptionsCache.set(currentSubcategory, html);
+            }
+            return html;
+        }
 
-            for (const mainKey of orderedCategories) {
-                const mainConfig = CATEGORY_STRUCTURE[mainKey];
-                if (!mainConfig) continue;
+        function renderCategoryDropdownOptions(currentSubcategory) {
+            let html = '';
+            let openMain = null;
 
-                html += `<optgroup label="${mainConfig.icon} ${mainConfig.label}">`;
-                for (const [subKey, subConfig] of Object.entries(mainConfig.subcategories)) {
-                    const selected = (subKey === currentSubcategory) ? 'selected' : '';
-                    html += `<option value="${subKey}" ${selected}>${subConfig.label}</option>`;
+            for (const row of SUBCATEGORIES) {
+                if (row.main !== openMain) {
+                    if (openMain) html += '</optgroup>';
+                    html += `<optgroup label="${row.mainIcon} ${row.mainLabel}">`;
+                    openMain = row.main;
                 }
-                html += '</optgroup>';
+                const selected = (row.sub === currentSubcategory) ? 'selected' : '';
+                html += `<option value="${row.sub}" ${selected}>${row.label}</option>`;
             }
+            if (openMain) html += '</optgroup>';
 
             // Add "Other" option
             html += `<optgroup label="📦 Other">`;
@@ -1998,13 +822,7 @@ HTML_TEMPLATE = """
             if (!product) return;
 
             // Get the display name for the new category
-            let displayName = newCategory;
-            for (const [mainKey, mainConfig] of Object.entries(CATEGORY_STRUCTURE)) {
-                if (mainConfig.subcategories[newCategory]) {
-                    displayName = mainConfig.subcategories[newCategory].label;
-                    break;
-                }
-            }
+            const displayName = SUBCATEGORY_LABELS.get(newCategory) || newCategory;
 
             console.log(`Reclassifying product ${product.product_id} to: ${newCategory} (${displayName})`);
 
@@ -2022,12 +840,11 @@ HTML_TEMPLATE = """
                 if (response.ok) {
                     // Update local data
                     product.category = newCategory;
+                    reclassifyProduct(product);
 
-                    // Show success notification
+                    // Show success notification (reclassifyProduct has already
+                    // updated the sidebar counts)
                     showNotification(`Category changed to ${displayName}`, 'success');
-
-                    // Rebuild the sidebar to update counts
-                    buildCategorySidebar();
                 } else {
                     const error = await response.json();
                     showNotification(`Failed to update category: ${error.message}`, 'error');
@@ -2046,114 +863,105 @@ HTML_TEMPLATE = """
             return filteredProducts[currentIndex];
         }
 
-        // Build category sidebar from products data
+        // Build category sidebar from products data. Labels and icons come from
+        // CATEGORY_STRUCTURE constants (via SUBCATEGORIES), so the markup is assembled as one string and
+        // written once; clicks are handled by the delegated listener below.
+        // Sidebar rebuilds are deferred to the next frame (and coalesced), so
+        // loadProducts can start rendering the first product before the
+        // sidebar's layout work lands.
+        let _sidebarFrame = 0;
+
         function buildCategorySidebar() {
+            if (!_sidebarFrame) _sidebarFrame = requestAnimationFrame(commitCategorySidebar);
+        }
+
+        function commitCategorySidebar() {
+            _sidebarFrame = 0;
             const categoryList = document.getElementById('categoryList');
             if (!categoryList || !allProducts.length) return;
 
-            // Initialize counts structure dynamically from CATEGORY_STRUCTURE
-            const counts = { other: { total: 0 } };
-            for (const [mainCat, config] of Object.entries(CATEGORY_STRUCTURE)) {
-                counts[mainCat] = { total: 0 };
-                for (const subKey of Object.keys(config.subcategories)) {
-                    counts[mainCat][subKey] = 0;
-                }
+            categoryList.innerHTML = renderCategorySidebar();
+
+            categoryItems = new Map();
+            for (const li of categoryList.children) {
+                categoryItems.set(li.getAttribute('data-category'), li);
             }
+            activeCategoryItem = categoryItems.get(currentCategory) || null;
+        }
 
-            // Classify each product
-            allProducts.forEach(product => {
-                const { main, sub } = classifyProduct(product);
-                if (counts[main]) {
-                    counts[main].total++;
-                    if (sub && counts[main][sub] !== undefined) {
-                        counts[main][sub]++;
-                    }
-                } else {
-                    counts.other.total++;
-                }
-            });
+        function renderCategorySidebar() {
+            const item = (key, className, label, count) => `
+                <li class="category-item${className}${currentCategory === key ? ' active' : ''}" data-category="${key}">
+                    <span class="category-name">${label}</span>
+                    <span class="category-count"${key === 'all' ? ' id="allCount"' : ''}>${count}</span>
+                </li>`;
 
-            // Update "All Products" count
-            document.getElementById('allCount').textContent = allProducts.length;
-
-            // Clear existing category items (except "All Products")
-            const allCategoryItem = categoryList.querySelector('.all-categories');
-            categoryList.innerHTML = '';
-            categoryList.appendChild(allCategoryItem);
-
-            // Build organized category structure
-            const orderedCategories = ['tops_base', 'tops_mid', 'bottoms', 'outerwear', 'shoes'];
-
-            orderedCategories.forEach(mainCat => {
-                const config = CATEGORY_STRUCTURE[mainCat];
-                const mainCount = counts[mainCat]?.total || 0;
-
-                // Main category header
-                const mainLi = document.createElement('li');
-                mainLi.className = 'category-item category-header';
-                mainLi.setAttribute('data-category', mainCat);
-                mainLi.onclick = () => filterByOrganizedCategory(mainCat, null);
-                mainLi.innerHTML = `
-                    <span class="category-name">${config.icon} ${config.label}</span>
-                    <span class="category-count">${mainCount}</span>
-                `;
-                categoryList.appendChild(mainLi);
-
-                // Subcategories
-                const subEntries = Object.entries(config.subcategories);
-                if (subEntries.length > 0) {
-                    subEntries.forEach(([subKey, subConfig]) => {
-                        const subCount = counts[mainCat]?.[subKey] || 0;
-                        const subLi = document.createElement('li');
-                        subLi.className = 'category-item subcategory-item';
-                        subLi.setAttribute('data-category', `${mainCat}-${subKey}`);
-                        subLi.onclick = () => filterByOrganizedCategory(mainCat, subKey);
-                        subLi.innerHTML = `
-                            <span class="category-name">${subConfig.icon} ${subConfig.label}</span>
-                            <span class="category-count">${subCount}</span>
-                        `;
-                        categoryList.appendChild(subLi);
-                    });
+            const rows = [item('all', ' all-categories', 'All Products', allProducts.length)];
+
+            // Build organized category structure: a header row whenever the main
+            // category changes, then its subcategories
+            let openMain = null;
+            for (const row of SUBCATEGORIES) {
+                if (row.main !== openMain) {
+                    rows.push(item(row.main, ' category-header', `${row.mainIcon} ${row.mainLabel}`, categoryCount(row.main)));
+                    openMain = row.main;
                 }
-            });
+                const key = `${row.main}-${row.sub}`;
+                rows.push(item(key, ' subcategory-item', `${row.icon} ${row.label}`, categoryCount(key)));
+            }
 
             // Add "Other" if there are uncategorized items
-            if (counts.other.total > 0) {
-                const otherLi = document.createElement('li');
-                otherLi.className = 'category-item';
-                otherLi.setAttribute('data-category', 'other');
-                otherLi.onclick = () => filterByOrganizedCategory('other', null);
-                otherLi.innerHTML = `
-                    <span class="category-name">📦 Other</span>
-                    <span class="category-count">${counts.other.total}</span>
-                `;
-                categoryList.appendChild(otherLi);
+            const otherCount = categoryCount('other');
+            if (otherCount > 0) {
+                rows.push(item('other', '', '📦 Other', otherCount));
+            }
+
+            return rows.join('');
+        }
+
+        // Refresh the sidebar counts for the given keys in place. Falls back to a
+        // full rebuild when a row would have to appear or disappear.
+        function updateCategoryCounts(keys) {
+            if (_sidebarFrame) return;  // the pending rebuild reads fresh counts
+            for (const key of keys) {
+                const li = categoryItems.get(key);
+                const count = categoryCount(key);
+                if (!li || (key === 'other' && count === 0)) {
+                    buildCategorySidebar();
+                    return;
+                }
+                li.querySelector('.category-count').textContent = count;
             }
         }
 
+        // One click handler for every sidebar item; data-category is 'main' or 'main-sub'
+        document.getElementById('categoryList').addEventListener('click', (e) => {
+            const li = e.target.closest('.category-item');
+            if (!li) return;
+            const key = li.getAttribute('data-category');
+            const dash = key.indexOf('-');
+            if (dash === -1) {
+                filterByOrganizedCategory(key, null);
+            } else {
+                filterByOrganizedCategory(key.slice(0, dash), key.slice(dash + 1));
+            }
+        });
+
         // Filter by organized category
         function filterByOrganizedCategory(mainCat, subCat) {
             currentCategory = subCat ? `${mainCat}-${subCat}` : mainCat;
 
             // Update active state in sidebar
-            document.querySelectorAll('.category-item').forEach(item => {
-                item.classList.remove('active');
-                if (item.getAttribute('data-category') === currentCategory) {
-                    item.classList.add('active');
-                }
-            });
+            if (activeCategoryItem) activeCategoryItem.classList.remove('active');
+            activeCategoryItem = categoryItems.get(currentCategory) || null;
+            if (activeCategoryItem) activeCategoryItem.classList.add('active');
 
             // Filter products
             if (mainCat === 'all') {
-                filteredProducts = [...allProducts];
+                filteredProducts = allProducts;
             } else {
-                filteredProducts = allProducts.filter(p => {
-                    const { main, sub } = classifyProduct(p);
-                    if (subCat) {
-                        return main === mainCat && sub === subCat;
-                    }
-                    return main === mainCat;
-                });
+                const indices = categoryIndex[currentCategory] || [];
+                filteredProducts = Array.from(indices, i => allProducts[i]);
             }
 
             // Update products array and reset to first product
@@ -2173,97 +981,83 @@ HTML_TEMPLATE = """
             }
         }
 
-        // Get icon for category (legacy support)
-        function getCategoryIcon(category) {
-            const icons = {
-                'shirts': '👔',
-                't-shirts': '👕',
-                'pants': '👖',
-                'jeans': '👖',
-                'shorts': '🩳',
-                'jackets': '🧥',
-                'coats': '🧥',
-                'suits': '🤵',
-                'blazers': '🤵',
-                'shoes': '👟',
-                'sneakers': '👟',
-                'boots': '🥾',
-                'hats': '🧢',
-                'sweaters': '🧶',
-                'hoodies': '🧥',
-                'swimwear': '🩱',
-                'activewear': '🏃',
-                'default': '📦'
-            };
-            const lowerCategory = category.toLowerCase();
-            for (const [key, icon] of Object.entries(icons)) {
-                if (lowerCategory.includes(key)) return icon;
-            }
-            return icons.default;
-        }
+        // Map internal category keys to human-readable names
+        const CATEGORY_DISPLAY_NAMES = new Map([
+            ['all', 'All Products'],
+            // Base Layer
+            ['tops_base', 'Base Layer'],
+            ['tops_base-tshirts', 'T-Shirts'],
+            ['tops_base-shirts', 'Shirts'],
+            ['tops_base-polos', 'Polo Shirts'],
+            ['tops_base-tanks', 'Tank Tops'],
+            // Mid Layer
+            ['tops_mid', 'Mid Layer'],
+            ['tops_mid-sweaters', 'Sweaters'],
+            ['tops_mid-cardigans', 'Cardigans'],
+            ['tops_mid-quarterzip', 'Quarter Zip'],
+            ['tops_mid-hoodies', 'Hoodies'],
+            ['tops_mid-sweatshirts', 'Sweatshirts'],
+            // Bottoms
+            ['bottoms', 'Bottoms'],
+            ['bottoms-pants', 'Pants'],
+            ['bottoms-jeans', 'Jeans'],
+            ['bottoms-shorts', 'Shorts'],
+            ['bottoms-swimwear', 'Swimwear'],
+            ['bottoms-sweatsuits', 'Sweatsuits'],
+            // Outerwear
+            ['outerwear', 'Outerwear'],
+            ['outerwear-jackets', 'Jackets'],
+            ['outerwear-coats', 'Coats'],
+            ['outerwear-leather', 'Leather'],
+            ['outerwear-blazers', 'Blazers'],
+            ['outerwear-suits', 'Suits'],
+            ['outerwear-overshirts', 'Overshirts'],
+            ['outerwear-vests', 'Vests'],
+            // Footwear (DB stores "footwear" for generator queries)
+            ['shoes', 'Footwear'],
+            ['footwear', 'Footwear'],
+            ['shoes-shoes', 'Shoes'],
+            ['shoes-boots', 'Boots'],
+            // Other
+            ['other', 'Other']
+        ]);
+
+        // Title-Cased fallbacks for keys missing from CATEGORY_DISPLAY_NAMES
+        const _categoryNameCache = new Map();
 
         // Format category name for display
         function formatCategoryName(category) {
-            // Map internal category keys to human-readable names
-            const categoryDisplayNames = {
-                'all': 'All Products',
-                // Base Layer
-                'tops_base': 'Base Layer',
-                'tops_base-tshirts': 'T-Shirts',
-                'tops_base-shirts': 'Shirts',
-                'tops_base-polos': 'Polo Shirts',
-                'tops_base-tanks': 'Tank Tops',
-                // Mid Layer
-                'tops_mid': 'Mid Layer',
-                'tops_mid-sweaters': 'Sweaters',
-                'tops_mid-cardigans': 'Cardigans',
-                'tops_mid-quarterzip': 'Quarter Zip',
-                'tops_mid-hoodies': 'Hoodies',
-                'tops_mid-sweatshirts': 'Sweatshirts',
-                // Bottoms
-                'bottoms': 'Bottoms',
-                'bottoms-pants': 'Pants',
-                'bottoms-jeans': 'Jeans',
-                'bottoms-shorts': 'Shorts',
-                'bottoms-swimwear': 'Swimwear',
-                'bottoms-sweatsuits': 'Sweatsuits',
-                // Outerwear
-                'outerwear': 'Outerwear',
-                'outerwear-jackets': 'Jackets',
-                'outerwear-coats': 'Coats',
-                'outerwear-leather': 'Leather',
-                'outerwear-blazers': 'Blazers',
-                'outerwear-suits': 'Suits',
-                'outerwear-overshirts': 'Overshirts',
-                'outerwear-vests': 'Vests',
-                // Footwear (DB stores "footwear" for generator queries)
-                'shoes': 'Footwear',
-                'footwear': 'Footwear',
-                'shoes-shoes': 'Shoes',
-                'shoes-boots': 'Boots',
-                // Other
-                'other': 'Other'
-            };
+            const known = CATEGORY_DISPLAY_NAMES.get(category);
+            if (known) return known;
 
-            if (categoryDisplayNames[category]) {
-                return categoryDisplayNames[category];
+            let name = _categoryNameCache.get(category);
+            if (name === undefined) {
+                // Fallback: convert snake_case-subcategory to Title Case
+                name = category
+                    .split(/[-_]/)
+                    .map(word => word.charAt(0).toUpperCase() + word.slice(1).toLowerCase())
+                    .join(' ');
+                _categoryNameCache.set(category, name);
             }
-
-            // Fallback: convert snake_case-subcategory to Title Case
-            return category
-                .split(/[-_]/)
-                .map(word => word.charAt(0).toUpperCase() + word.slice(1).toLowerCase())
-                .join(' ');
+            return name;
         }
 
-        // Filter products by category (legacy support)
-        function filterByCategory(category) {
-            if (category === 'all') {
-                filterByOrganizedCategory('all', null);
-                return;
+        // /api/products is read as NDJSON; once this many products have arrived
+        // the first one is shown while the rest of the catalog downloads.
+        const PRODUCTS_FIRST_PAINT = 50;
+
+        // Make list the catalog: per-product lookups, then categoryIndex. Every
+        // product must already carry its `_cat` classification.
+        function adoptProducts(list) {
+            allProducts = list;
+            productIds = new Set();
+            for (const p of list) {
+                productIds.add(p.product_id);
+                // Color variants share this prefix; see displayProduct's color tags.
+                // A row with a missing or non-string id must not break the catalog.
+                p._parentId = p.parent_product_id || String(p.product_id ?? '').split('_', 1)[0];
             }
-            // For legacy category names, try to map to organized structure
-            filterByOrganizedCategory(category, null);
+            buildCategoryIndex();
         }
 
         async function loadProducts() {
@@ -2282,7 +1076,7 @@ HTML_TEMPLATE = """
 
             try {
                 console.log('[DEBUG] Fetching products from /api/products...');
-                const response = await fetch('/api/products');
+                const response = await fetch('/api/products?format=ndjson');
                 console.log('[DEBUG] Response status:', response.status);
                 if (!response.ok) {
                     const errText = await response.text();
@@ -2290,28 +1084,51 @@ HTML_TEMPLATE = """
                     return;
                 }
 
-                const data = await response.json();
-                console.log('[DEBUG] Products received:', data.length, 'items');
-
-                // Ensure we got an array (API may return {error: "..."} on failure)
-                const list = Array.isArray(data) ? data : ((data && data.products) || []);
-                if (!Array.isArray(list)) {
-                    showError('Invalid response: expected product list');
-                    return;
-                }
+                // One product per line; show the first batch while the rest downloads
+                const list = [];
+                let preview = null;
+                await readNdjson(response, product => {
+                    list.push(product);
+                    if (list.length === PRODUCTS_FIRST_PAINT) {
+                        preview = list.slice();
+                        preview.forEach(p => { p._cat = classifyProduct(p); });
+                        adoptProducts(preview);
+                        filteredProducts = allProducts;
+                        products = filteredProducts;
+                        displayProduct(0);
+                    }
+                });
 
                 console.log('[DEBUG] Product list length:', list.length);
 
-                // Store all products for filtering
-                allProducts = list;
-                filteredProducts = [...allProducts];
+                // Classify, then store all products for filtering. If the preview
+                // is on screen, keep the viewer on the product being looked at.
+                await classifyAllProducts(list);
+                const viewing = preview && products[currentIndex];
+                const viewingAll = products === allProducts;
+                adoptProducts(list);
+                if (!preview || viewingAll) {
+                    filteredProducts = allProducts;
+                } else {
+                    filteredProducts = Array.from(categoryIndex[currentCategory] || [], i => allProducts[i]);
+                }
                 products = filteredProducts;
                 console.log('[DEBUG] Calling buildCategorySidebar and displayProduct...');
 
                 // Build the category sidebar
                 buildCategorySidebar();
 
-                if (products.length > 0) {
+                const viewingIndex = viewing ? products.indexOf(viewing) : -1;
+                if (viewingIndex !== -1) {
+                    // Re-render: the preview card checked its color variants against
+                    // only the first PRODUCTS_FIRST_PAINT product ids
+                    const imageIndex = currentImageIndex;
+                    await displayProduct(viewingIndex);
+                    if (imageIndex) changeImage(imageIndex);
+                    if (curateMode && currentCurator) {
+                        showCurateInputs();
+                    }
+                } else if (products.length > 0) {
                     await displayProduct(0);
                 } else {
                     if (cardEl) cardEl.innerHTML = `
@@ -2328,23 +1145,149 @@ HTML_TEMPLATE = """
             }
         }
 
+        // Color name -> variant id slug, matching the scraper's color-variant ids
+        const COLOR_SLUG_SEPARATOR_RE = /[^a-z0-9]+/g;
+        const EDGE_UNDERSCORES_RE = /^_+|_+$/g;
+
+        // Part names recognized in free-text compositions, as one case-insensitive
+        // alternation. Longer names come first so they win where they overlap a
+        // shorter one (OUTSOLE over SOLE, OUTER SHELL over OUTER).
+        const COMPOSITION_PART_RE = new RegExp(
+            ['OUTSOLE', 'MIDSOLE', 'INSOLE', 'FOOTBED', 'COUNTER', 'TONGUE', 'LINING', 'UPPER', 'OUTER', 'INNER', 'SOLE', 'HEEL', 'TOE', 'MAIN FABRIC', 'SECONDARY FABRIC', 'OUTER SHELL']
+                .sort((a, b) => b.length - a.length)
+                .join('|'),
+            'gi'
+        );
+        const COMPOSITION_COMMA_RE = /,\\s*/;
+        // A material runs from "NN%" to the next digit or '%'; one linear scan, no
+        // lookahead backtracking. Trailing separators are cut by MATERIAL_TAIL_RE.
+        const MATERIAL_SPLIT_RE = /\\d+%\\s*[A-Za-z][^%\\d]*/g;
+        const MATERIAL_TAIL_RE = /[\\s,;.]+$/;
+
+        // Free-text product.composition -> HTML. Pure in `comp`, so rendered HTML is
+        // kept in a small LRU and re-renders of the same product skip the parse.
+        const COMPOSITION_CACHE_MAX = 512;
+        const _compositionHtmlCache = new Map();
+
+        // Trimmed, non-empty entries of strings, in one pass
+        function trimNonEmpty(strings) {
+            const out = [];
+            for (const str of strings) {
+                const trimmed = str.trim();
+                if (trimmed) out.push(trimmed);
+            }
+            return out;
+        }
+
+        function renderCompositionText(comp) {
+            const cached = lruGet(_compositionHtmlCache, comp);
+            if (cached !== undefined) return cached;
+
+            let html = '';
+
+            // Check if this is a complex shoe-style composition with part names:
+            // one left-to-right scan yields non-overlapping matches in position order
+            const partMatches = Array.from(comp.matchAll(COMPOSITION_PART_RE), match => ({
+                name: match[0].toUpperCase(),
+                start: match.index,
+                end: match.index + match[0].length
+            }));
+
+            const hasParts = partMatches.length > 0;
+
+            if (hasParts) {
+                // Parse each section
+                let sections = [];
+                for (let i = 0; i < partMatches.length; i++) {
+                    const partName = partMatches[i].name;
+                    const startPos = partMatches[i].end;
+                    const endPos = (i + 1 < partMatches.length) ? partMatches[i + 1].start : comp.length;
+
+                    // Parse materials: "37% polyurethane32% polyester" -> ["37% polyurethane", "32% polyester"].
+                    // Matches start at a digit, so the section's leading ": " is never
+                    // captured and every match is non-empty once its tail is cut.
+                    const materialList = comp.substring(startPos, endPos).match(MATERIAL_SPLIT_RE) || EMPTY_ARRAY;
+                    const cleanedMaterials = materialList.map(m => m.replace(MATERIAL_TAIL_RE, ''));
+
+                    if (cleanedMaterials.length > 0) {
+                        sections.push({
+                            part: partName,
+                            materials: cleanedMaterials
+                        });
+                    }
+                }
+
+                if (sections.length > 0) {
+                    html = sections.map(section => `
+                        <div style="margin-bottom: 12px;">
+                            <div style="font-size: 10px; font-weight: 600; color: #666; margin-bottom: 6px;">${section.part}</div>
+                            <div style="display: flex; flex-wrap: wrap; gap: 6px;">
+                                ${section.materials.map(m => `<span class="tag" style="background: #f5f5f5; color: #333; font-size: 12px;">${m}</span>`).join('')}
+                            </div>
+                        </div>
+                    `).join('');
+                } else {
+                    // Fallback to simple display
+                    html = `<p style="color: #333; font-size: 14px; font-weight: 500; margin: 0; font-family: 'SF Mono', 'Monaco', 'Inconsolata', 'Fira Code', monospace;">${comp}</p>`;
+                }
+            } else {
+                // Simple composition like "100% cotton" or "49% polyamide, 29% polyester"
+                // Parse into individual materials for pill display
+                const materials = comp.indexOf(',') === -1
+                    ? EMPTY_ARRAY
+                    : trimNonEmpty(comp.split(COMPOSITION_COMMA_RE));
+                if (materials.length > 1) {
+                    html = `
+                        <div style="display: flex; flex-wrap: wrap; gap: 6px;">
+                            ${materials.map(m => `<span class="tag" style="background: #f5f5f5; color: #333; font-size: 12px;">${m}</span>`).join('')}
+                        </div>
+                    `;
+                } else {
+                    html = `<p style="color: #333; font-size: 14px; font-weight: 500; margin: 0; font-family: 'SF Mono', 'Monaco', 'Inconsolata', 'Fira Code', monospace;">${comp}</p>`;
+                }
+            }
+
+            lruSet(_compositionHtmlCache, comp, html, COMPOSITION_CACHE_MAX);
+            return html;
+        }
+
+        // Badge colors for tags_final curation statuses (anything else is grey)
+        const CURATION_STATUS_COLORS = new Map([
+            ['approved', '#4CAF50'],
+            ['needs_review', '#FF9800'],
+            ['needs_fix', '#f44336']
+        ]);
+
+        // Tooltips for the size tag stock levels (.size-in / .size-low / .size-oos)
+        const SIZE_TOOLTIPS = Object.freeze({
+            in: 'In stock',
+            low: 'Low stock – only a few left',
+            oos: 'Out of stock'
+        });
+
+        // Placeholder for products without an image at the requested index
+        const NO_IMAGE_SRC = 'data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" width="400" height="500" fill="%23ccc"><rect width="100%" height="100%"/><text x="50%" y="50%" text-anchor="middle" fill="%23999">No Image</text></svg>';
+        // Shared stand-in for missing image lists; frozen so it is never written to
+        const EMPTY_ARRAY = Object.freeze([]);
+
         function getImageUrl(product, index) {
             // For Supabase: show all photos when image_urls_all exists; otherwise just the 2 stored
             if (product._source === 'supabase') {
-                const all = product.image_urls_all || [];
+                const all = product.image_urls_all || EMPTY_ARRAY;
                 if (all.length > 0 && all[index]) {
                     return all[index];
                 }
-                if (product.image_urls && product.image_urls[index]) {
-                    return product.image_urls[index];
+                const paths = product.images || EMPTY_ARRAY;
+                if (paths[index]) {
+                    return STORAGE_PUBLIC_PREFIX + paths[index];
                 }
             }
             // For local files, construct the path
-            const images = product.images || [];
+            const images = product.images || EMPTY_ARRAY;
             if (images[index]) {
                 return `/images/${product.category}/${product.product_id}/${images[index]}`;
             }
-            return 'data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" width="400" height="500" fill="%23ccc"><rect width="100%" height="100%"/><text x="50%" y="50%" text-anchor="middle" fill="%23999">No Image</text></svg>';
+            return NO_IMAGE_SRC;
         }
 
         function isImageStored(product, index) {
@@ -2352,14 +1295,530 @@ HTML_TEMPLATE = """
             return product.image_urls_stored_indices.indexOf(index) !== -1;
         }
 
-        async function displayProduct(index) {
-            if (index < 0 || index >= products.length) return;
+        // Canonical tag chips for the card's tags_final section. The panel template
+        // has an empty slot per field; fillTagFieldSlots() then fills each slot with a
+        // DocumentFragment of chip nodes. Chips are clones of fixed skeletons below,
+        // with tag values, reasons and curators set as text or attributes, so they
+        // never go through the HTML parser.
 
-            currentIndex = index;
-            currentImageIndex = 0;
-            const product = products[index];
+        // A chip depends only on (kind, field, value[, reason, curator]), so each one
+        // is built once and kept as a node that renders clone; keys join those
+        // parts with \\x1f, which never occurs in tags.
+        const TAG_CHIP_CACHE_MAX = 512;
+        const _tagChipCache = new Map();
 
-            // Update counter
+        function parseSkeleton(html) {
+            const template = document.createElement('template');
+            template.innerHTML = html;
+            return template.content.firstChild;
+        }
+
+        const TAG_PLACEHOLDER_SKELETON = parseSkeleton('<span class="canonical-tag-placeholder"></span>');
+        const TAG_CHIP_SKELETON = parseSkeleton('<span class="canonical-tag-chip"><button class="canonical-tag-delete-btn">×</button></span>');
+        const DELETED_TAG_CHIP_SKELETON = parseSkeleton('<span class="deleted-tag-display"><button class="canonical-tag-restore-btn">↩</button></span>');
+        const REJECTION_REASON_SKELETON = parseSkeleton('<span class="deleted-tag-reason">(<span class="deleted-tag-reason-text"></span>)</span>');
+
+        function cacheTagChip(key, node) {
+            lruSet(_tagChipCache, key, node, TAG_CHIP_CACHE_MAX);
+            return node.cloneNode(true);
+        }
+
+        // Grey placeholder shown when a field has no value ('None', 'Not set', 'N/A')
+        function tagPlaceholder(label) {
+            const key = 'placeholder\\x1f' + label;
+            const node = lruGet(_tagChipCache, key);
+            if (node !== undefined) return node.cloneNode(true);
+            const placeholder = TAG_PLACEHOLDER_SKELETON.cloneNode(true);
+            placeholder.textContent = label;
+            return cacheTagChip(key, placeholder);
+        }
+
+        // kind: 'single' (formality, fit, ...), 'array' (context, ...) or 'style'
+        function tagChip(kind, field, value) {
+            const key = kind + '\\x1f' + field + '\\x1f' + value;
+            const node = lruGet(_tagChipCache, key);
+            if (node !== undefined) return node.cloneNode(true);
+
+            const chip = TAG_CHIP_SKELETON.cloneNode(true);
+            const button = chip.lastChild;
+            chip.prepend(value);
+            button.dataset.tagField = field;
+
+            if (kind === 'single') {
+                chip.classList.add('canonical-tag-chip-value');
+                button.dataset.tagAction = 'set';
+                button.title = `Remove ${field}`;
+            } else {
+                if (kind === 'style') chip.classList.add('canonical-tag-chip-style');
+                button.dataset.tagAction = 'remove';
+                button.dataset.tagValue = value;
+                button.title = `Remove ${value}`;
+            }
+            return cacheTagChip(key, chip);
+        }
+
+        // Rejected tags are stored as a plain string (old format) or {value, reason,
+        // curator}. The renderers read a normalized view of tags.deleted_tags in
+        // which every entry has the object shape, built once per tags_final object
+        // (edits replace tags_final wholesale, so entries never go stale).
+        const EMPTY_DELETED_TAGS = Object.freeze({});
+        const _deletedTagsViews = new WeakMap();
+
+        function deletedTagEntry(entry) {
+            return typeof entry === 'string'
+                ? { value: entry, reason: '', curator: '' }
+                : { value: entry?.value || '', reason: entry?.reason || '', curator: entry?.curator || '' };
+        }
+
+        function deletedTagsView(tags) {
+            const deletedTags = tags.deleted_tags;
+            if (!deletedTags) return EMPTY_DELETED_TAGS;
+            let view = _deletedTagsViews.get(tags);
+            if (view === undefined) {
+                view = {};
+                for (const field in deletedTags) {
+                    const entries = deletedTags[field];
+                    view[field] = Array.isArray(entries)
+                        ? entries.map(deletedTagEntry)
+                        : (entries ? deletedTagEntry(entries) : null);
+                }
+                _deletedTagsViews.set(tags, view);
+            }
+            return view;
+        }
+
+        // "(reason)" after a rejected tag; viewer.css cuts long reasons to about 30
+        // characters with an ellipsis, and the chip's title carries the full text
+        function rejectionReasonNode(reason) {
+            const snippet = REJECTION_REASON_SKELETON.cloneNode(true);
+            snippet.querySelector('.deleted-tag-reason-text').textContent = reason;
+            return snippet;
+        }
+
+        // entry comes from deletedTagsView()
+        function deletedTagChip(kind, field, entry) {
+            const { value: tagValue, reason, curator } = entry;
+            const key = 'deleted-' + kind + '\\x1f' + field + '\\x1f' + tagValue + '\\x1f' + reason + '\\x1f' + curator;
+            const node = lruGet(_tagChipCache, key);
+            if (node !== undefined) return node.cloneNode(true);
+
+            const chip = DELETED_TAG_CHIP_SKELETON.cloneNode(true);
+            const button = chip.lastChild;
+            chip.prepend(tagValue);
+            if (reason) button.before(rejectionReasonNode(reason));
+            button.dataset.tagField = field;
+            button.dataset.tagValue = tagValue;
+
+            if (kind === 'style') {
+                chip.classList.add('deleted-tag-display-style');
+                chip.title = reason ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : 'Rejected');
+                button.dataset.tagAction = 'add';
+                button.title = `Restore ${tagValue}`;
+            } else {
+                // 'single' fields are restored with a set, 'array' fields with an add
+                chip.title = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
+                button.dataset.tagAction = kind === 'single' ? 'set' : 'add';
+                button.title = `Restore ${kind === 'single' ? field : tagValue}`;
+            }
+            return cacheTagChip(key, chip);
+        }
+
+        // Single-value field (formality, fit, ...): the value or a placeholder, plus
+        // its rejected value if any
+        function renderSingleTagField(tags, field) {
+            const emptyLabel = tags.shoe_type && TAG_FIELDS_NA_FOR_SHOES.has(field) ? 'N/A' : 'Not set';
+            const value = tags[field];
+            const deleted = deletedTagsView(tags)[field];
+            const frag = document.createDocumentFragment();
+            frag.append(value ? tagChip('single', field, value) : tagPlaceholder(emptyLabel));
+            if (deleted && !Array.isArray(deleted)) frag.append(deletedTagChip('single', field, deleted));
+            return frag;
+        }
+
+        // Array field (context, pairing_tags, ...; kind 'style' for style_identity's
+        // larger dark chips): one chip per value, then the rejected values
+        function renderArrayTagField(tags, field, kind = 'array') {
+            const frag = document.createDocumentFragment();
+            const values = tags[field] || EMPTY_ARRAY;
+            const deleted = deletedTagsView(tags)[field];
+            const rejected = Array.isArray(deleted) ? deleted : EMPTY_ARRAY;
+            for (const value of values) frag.appendChild(tagChip(kind, field, value));
+            for (const entry of rejected) frag.appendChild(deletedTagChip(kind, field, entry));
+            if (!values.length && !rejected.length) frag.appendChild(tagPlaceholder('None'));
+            return frag;
+        }
+
+        // <option> lists for the canonical tag add/set <select>s, keyed by field.
+        // Constant markup, so the card template interpolates it by reference.
+        const CANONICAL_TAG_OPTIONS_HTML = Object.freeze({
+            style_identity: `
+                <option value="">Add style...</option>
+                <option value="minimal">Minimal</option>
+                <option value="classic">Classic</option>
+                <option value="preppy">Preppy</option>
+                <option value="workwear">Workwear</option>
+                <option value="streetwear">Streetwear</option>
+                <option value="rugged">Rugged</option>
+                <option value="tailoring">Tailoring</option>
+                <option value="elevated-basics">Elevated Basics</option>
+                <option value="normcore">Normcore</option>
+                <option value="sporty">Sporty</option>
+                <option value="outdoorsy">Outdoorsy</option>
+                <option value="western">Western</option>
+                <option value="vintage">Vintage</option>
+                <option value="grunge">Grunge</option>
+                <option value="punk">Punk</option>
+                <option value="utilitarian">Utilitarian</option>`,
+            formality: `
+                <option value="">Set formality...</option>
+                <option value="athletic">Athletic</option>
+                <option value="casual">Casual</option>
+                <option value="smart-casual">Smart Casual</option>
+                <option value="business-casual">Business Casual</option>
+                <option value="formal">Formal</option>`,
+            fit: `
+                <option value="">Set fit...</option>
+                <option value="skinny">Skinny</option>
+                <option value="slim">Slim</option>
+                <option value="regular">Regular</option>
+                <option value="relaxed">Relaxed</option>
+                <option value="baggy">Baggy</option>
+                <option value="oversized">Oversized</option>`,
+            silhouette: `
+                <option value="">Set silhouette...</option>
+                <optgroup label="Bottoms">
+                    <option value="straight">Straight</option>
+                    <option value="tapered">Tapered</option>
+                    <option value="wide">Wide</option>
+                </optgroup>
+                <optgroup label="Tops & Outerwear">
+                    <option value="neutral">Neutral</option>
+                    <option value="relaxed">Relaxed</option>
+                    <option value="boxy">Boxy</option>
+                    <option value="structured">Structured</option>
+                    <option value="tailored">Tailored</option>
+                    <option value="longline">Longline</option>
+                </optgroup>`,
+            length: `
+                <option value="">Set length...</option>
+                <option value="cropped">Cropped</option>
+                <option value="regular">Regular</option>
+                <option value="long">Long</option>`,
+            pattern: `
+                <option value="">Set pattern...</option>
+                <option value="solid">Solid</option>
+                <option value="stripe">Stripe</option>
+                <option value="check">Check</option>
+                <option value="textured">Textured</option>`,
+            context: `
+                <option value="">Add context...</option>
+                <option value="everyday">Everyday</option>
+                <option value="work-appropriate">Work Appropriate</option>
+                <option value="travel">Travel</option>
+                <option value="evening">Evening</option>
+                <option value="weekend">Weekend</option>`,
+            construction_details: `
+                <option value="">Add detail...</option>
+                <optgroup label="Bottoms">
+                    <option value="pleated">Pleated</option>
+                    <option value="flat-front">Flat Front</option>
+                    <option value="cargo">Cargo</option>
+                    <option value="drawstring">Drawstring</option>
+                    <option value="elastic-waist">Elastic Waist</option>
+                </optgroup>
+                <optgroup label="Tops & Outerwear">
+                    <option value="structured-shoulder">Structured Shoulder</option>
+                    <option value="dropped-shoulder">Dropped Shoulder</option>
+                </optgroup>`,
+            pairing_tags: `
+                <option value="">Add pairing...</option>
+                <option value="neutral-base">Neutral Base</option>
+                <option value="statement-piece">Statement Piece</option>
+                <option value="easy-dress-up">Easy Dress Up</option>
+                <option value="easy-dress-down">Easy Dress Down</option>
+                <option value="high-versatility">High Versatility</option>`,
+            top_layer_role: `
+                <option value="">Set layer...</option>
+                <option value="base">Base Layer</option>
+                <option value="mid">Mid Layer</option>`
+        });
+
+        // Chip renderer kind for each canonical tag field shown on the card
+        const TAG_FIELD_KINDS = Object.freeze({
+            style_identity: 'style',
+            formality: 'single',
+            fit: 'single',
+            silhouette: 'single',
+            length: 'single',
+            pattern: 'single',
+            context: 'array',
+            construction_details: 'array',
+            pairing_tags: 'array'
+        });
+        const TAG_FIELDS_NA_FOR_SHOES = new Set(['fit', 'silhouette', 'length']);
+
+        function renderTagField(tags, field) {
+            return TAG_FIELD_KINDS[field] === 'single'
+                ? renderSingleTagField(tags, field)
+                : renderArrayTagField(tags, field, TAG_FIELD_KINDS[field]);
+        }
+
+        // The chips sit in a display: contents slot so a tag edit can re-render
+        // just that field (see refreshTagField) without touching the card
+        function renderTagFieldSlot(field) {
+            return `<span class="tag-chips" data-tag-chips="${field}"></span>`;
+        }
+
+        function fillTagFieldSlots(root, tags) {
+            for (const slot of root.querySelectorAll('[data-tag-chips]')) {
+                slot.replaceChildren(renderTagField(tags, slot.dataset.tagChips));
+            }
+        }
+
+        // The canonical tags panel is static apart from the status badge, the chip
+        // slots and a few optional rows, so it is parsed once here and each card
+        // clones it and patches only those parts (see buildCanonicalPanel).
+        const CANONICAL_PANEL_TEMPLATE = document.createElement('template');
+        CANONICAL_PANEL_TEMPLATE.innerHTML = `
+            <div class="ai-section" style="margin-top: 20px; padding: 20px; background: linear-gradient(135deg, #fafafa 0%, #f5f5f5 100%); border-radius: 12px; border: 1px solid #e0e0e0;">
+                <div style="display: flex; align-items: center; justify-content: space-between; margin-bottom: 20px;">
+                    <span style="font-size: 11px; font-weight: 600; color: #666; text-transform: uppercase; letter-spacing: 1px;">ReFitd Canonical Tags</span>
+                    <span data-panel="status" style="font-size: 10px; font-weight: 600; padding: 4px 10px; border-radius: 10px; background: #bdbdbd; color: white; text-transform: uppercase; letter-spacing: 0.5px;"></span>
+                </div>
+
+                <!-- Style Identity (array field) -->
+                <div style="margin-bottom: 20px;">
+                    <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.8px; margin-bottom: 10px;">Style Identity</div>
+                    <div class="canonical-field-values">
+                        ${renderTagFieldSlot('style_identity')}
+                        <div class="canonical-tag-add-input" style="display: none;">
+                            <select style="padding: 8px 12px; border: 1px dashed #ccc; border-radius: 6px; font-size: 13px; background: white;" data-tag-select="add" data-tag-field="style_identity">${CANONICAL_TAG_OPTIONS_HTML.style_identity}</select>
+                        </div>
+                    </div>
+                </div>
+
+                <!-- Formality (single-value field) -->
+                <div class="canonical-field-card" style="margin-bottom: 16px;">
+                    <div class="canonical-field-label">Formality</div>
+                    <div class="canonical-field-values">
+                        ${renderTagFieldSlot('formality')}
+                        <div class="canonical-tag-add-input" style="display: none;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white;" data-tag-select="set" data-tag-field="formality">${CANONICAL_TAG_OPTIONS_HTML.formality}</select>
+                        </div>
+                    </div>
+                </div>
+
+                <div style="display: grid; grid-template-columns: repeat(2, 1fr); gap: 12px;">
+                    <!-- Fit (single-value field) - NOT for shoes -->
+                    <div class="canonical-field-card">
+                        <div class="canonical-field-label">Fit</div>
+                        <div class="canonical-field-values">
+                            ${renderTagFieldSlot('fit')}
+                        </div>
+                        <div class="canonical-tag-add-input" style="display: none; margin-top: 8px;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white; width: 100%;" data-tag-select="set" data-tag-field="fit">${CANONICAL_TAG_OPTIONS_HTML.fit}</select>
+                        </div>
+                    </div>
+                    <!-- Silhouette (single-value field) -->
+                    <div class="canonical-field-card">
+                        <div class="canonical-field-label">Silhouette</div>
+                        <div class="canonical-field-values">
+                            ${renderTagFieldSlot('silhouette')}
+                        </div>
+                        <div class="canonical-tag-add-input" style="display: none; margin-top: 8px;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white; width: 100%;" data-tag-select="set" data-tag-field="silhouette">${CANONICAL_TAG_OPTIONS_HTML.silhouette}</select>
+                        </div>
+                    </div>
+                    <!-- Length (single-value field) - NOT for shoes -->
+                    <div class="canonical-field-card">
+                        <div class="canonical-field-label">Length</div>
+                        <div class="canonical-field-values">
+                            ${renderTagFieldSlot('length')}
+                        </div>
+                        <div class="canonical-tag-add-input" style="display: none; margin-top: 8px;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white; width: 100%;" data-tag-select="set" data-tag-field="length">${CANONICAL_TAG_OPTIONS_HTML.length}</select>
+                        </div>
+                    </div>
+                    <!-- Pattern (single-value field) -->
+                    <div class="canonical-field-card">
+                        <div class="canonical-field-label">Pattern</div>
+                        <div class="canonical-field-values">
+                            ${renderTagFieldSlot('pattern')}
+                        </div>
+                        <div class="canonical-tag-add-input" style="display: none; margin-top: 8px;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white; width: 100%;" data-tag-select="set" data-tag-field="pattern">${CANONICAL_TAG_OPTIONS_HTML.pattern}</select>
+                        </div>
+                    </div>
+                </div>
+
+                <!-- Context (array field) -->
+                <div class="canonical-field-card" style="margin-top: 16px;">
+                    <div class="canonical-field-label" style="margin-bottom: 10px;">Context</div>
+                    <div class="canonical-field-values">
+                        ${renderTagFieldSlot('context')}
+                        <div class="canonical-tag-add-input" style="display: none;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white;" data-tag-select="add" data-tag-field="context">${CANONICAL_TAG_OPTIONS_HTML.context}</select>
+                        </div>
+                    </div>
+                </div>
+
+                <!-- Construction Details (array field) -->
+                <div class="canonical-field-card" style="margin-top: 12px;">
+                    <div class="canonical-field-label" style="margin-bottom: 10px;">Construction</div>
+                    <div class="canonical-field-values">
+                        ${renderTagFieldSlot('construction_details')}
+                        <div class="canonical-tag-add-input" style="display: none;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white;" data-tag-select="add" data-tag-field="construction_details">${CANONICAL_TAG_OPTIONS_HTML.construction_details}</select>
+                        </div>
+                    </div>
+                </div>
+
+                <!-- Pairing Tags (array field) -->
+                <div class="canonical-field-card" style="margin-top: 12px;">
+                    <div class="canonical-field-label" style="margin-bottom: 10px;">Pairing</div>
+                    <div class="canonical-field-values">
+                        ${renderTagFieldSlot('pairing_tags')}
+                        <div class="canonical-tag-add-input" style="display: none;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white;" data-tag-select="add" data-tag-field="pairing_tags">${CANONICAL_TAG_OPTIONS_HTML.pairing_tags}</select>
+                        </div>
+                    </div>
+                </div>
+
+                <!-- Shoe-specific fields -->
+                <div data-panel="shoe" hidden style="margin-top: 16px; padding-top: 16px; border-top: 1px solid #eee;">
+                    <div class="canonical-field-label" style="margin-bottom: 12px;">Shoe Details</div>
+                    <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 12px;">
+                        <div data-panel="shoe_type" hidden class="canonical-field-card">
+                            <div class="canonical-field-label">Type</div>
+                            <span class="canonical-tag-chip canonical-tag-chip-dark"><button class="canonical-tag-delete-btn" data-tag-action="set" data-tag-field="shoe_type" title="Remove shoe type">×</button></span>
+                        </div>
+                        <div data-panel="profile" hidden class="canonical-field-card">
+                            <div class="canonical-field-label">Profile</div>
+                            <span class="canonical-tag-chip canonical-tag-chip-dark"><button class="canonical-tag-delete-btn" data-tag-action="set" data-tag-field="profile" title="Remove profile">×</button></span>
+                        </div>
+                        <div data-panel="closure" hidden class="canonical-field-card">
+                            <div class="canonical-field-label">Closure</div>
+                            <span class="canonical-tag-chip canonical-tag-chip-dark"><button class="canonical-tag-delete-btn" data-tag-action="set" data-tag-field="closure" title="Remove closure">×</button></span>
+                        </div>
+                    </div>
+                </div>
+
+                <!-- Top Layer Role (only for tops) -->
+                <div data-panel="top_layer_role" hidden class="canonical-field-card" style="margin-top: 12px;">
+                    <div class="canonical-field-label">Top Layer Role</div>
+                    <div class="canonical-field-values">
+                        <span class="canonical-tag-chip canonical-tag-chip-value"><button class="canonical-tag-delete-btn" data-tag-action="set" data-tag-field="top_layer_role" title="Remove layer role">×</button></span>
+                        <div class="canonical-tag-add-input" style="display: none;">
+                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px;" data-tag-select="set" data-tag-field="top_layer_role">${CANONICAL_TAG_OPTIONS_HTML.top_layer_role}</select>
+                        </div>
+                    </div>
+                </div>
+
+                <div data-panel="policy" hidden style="margin-top: 16px; padding-top: 12px; border-top: 1px solid #eee; font-size: 11px; color: #bbb;"></div>
+            </div>`;
+
+        const SHOE_DETAIL_FIELDS = ['shoe_type', 'profile', 'closure'];
+
+        // Finished panels of recently shown products. A panel is a pure function of
+        // tags_final (replaced wholesale on every edit), the curation status and the
+        // policy version, so an entry is reused while all three are unchanged.
+        // Entries hold a pristine copy; the card gets a clone that refreshTagField
+        // and the curate-mode toggles are free to patch.
+        const CANONICAL_PANEL_CACHE_MAX = 64;
+        const _canonicalPanelCache = new Map();
+
+        function renderCanonicalPanel(product) {
+            const cached = lruGet(_canonicalPanelCache, product.product_id);
+            if (cached !== undefined
+                && cached.tags === product.tags_final
+                && cached.status === product.curation_status_refitd
+                && cached.policy === product.tag_policy_version) {
+                return cached.panel.cloneNode(true);
+            }
+            const panel = buildCanonicalPanel(product);
+            lruSet(_canonicalPanelCache, product.product_id, {
+                tags: product.tags_final,
+                status: product.curation_status_refitd,
+                policy: product.tag_policy_version,
+                panel: panel.cloneNode(true)
+            }, CANONICAL_PANEL_CACHE_MAX);
+            return panel;
+        }
+
+        function buildCanonicalPanel(product) {
+            const tags = product.tags_final;
+            const panel = CANONICAL_PANEL_TEMPLATE.content.firstElementChild.cloneNode(true);
+            const part = name => panel.querySelector(`[data-panel="${name}"]`);
+
+            const status = part('status');
+            status.textContent = product.curation_status_refitd || 'pending';
+            status.style.background = CURATION_STATUS_COLORS.get(product.curation_status_refitd) || '#bdbdbd';
+
+            fillTagFieldSlots(panel, tags);
+
+            // Optional rows: the value goes in as a text node ahead of the row's button
+            let hasShoeDetails = false;
+            for (const field of SHOE_DETAIL_FIELDS) {
+                if (!tags[field]) continue;
+                const cell = part(field);
+                cell.querySelector('button').before(tags[field]);
+                cell.hidden = false;
+                hasShoeDetails = true;
+            }
+            part('shoe').hidden = !hasShoeDetails;
+
+            if (tags.top_layer_role) {
+                const row = part('top_layer_role');
+                row.querySelector('button').before(tags.top_layer_role === 'base' ? 'Base Layer' : 'Mid Layer');
+                row.hidden = false;
+            }
+            if (product.tag_policy_version) {
+                const policy = part('policy');
+                policy.textContent = `Policy: ${product.tag_policy_version}`;
+                policy.hidden = false;
+            }
+            return panel;
+        }
+
+        // Re-render one field's chips in place. Returns false when the card has no
+        // slot for it (e.g. shoe fields), so the caller re-renders the whole card.
+        function refreshTagField(product, field) {
+            if (products[currentIndex] !== product || !product.tags_final) return false;
+            const slot = document.querySelector(`#productCard [data-tag-chips="${field}"]`);
+            if (!slot) return false;
+            slot.replaceChildren(renderTagField(product.tags_final, field));
+            if (curateMode) {
+                slot.querySelectorAll('.canonical-tag-delete-btn, .canonical-tag-restore-btn').forEach(btn => {
+                    btn.style.display = 'inline';
+                });
+            }
+            return true;
+        }
+
+        // Shared tail of the canonical tag handlers: store the server's tags_final,
+        // then patch only the edited field unless the product's classification
+        // (and so its category badge/dropdown) changed.
+        async function applyCanonicalTagEdit(product, fieldName, tagsFinal) {
+            if (product.tags_final) product.tags_final = tagsFinal;
+            const before = product._cat;
+            reclassifyProduct(product);
+            preserveCurationNotesUserContent();
+            const sameCategory = before && before.main === product._cat.main && before.sub === product._cat.sub;
+            if (sameCategory && refreshTagField(product, fieldName)) {
+                // The curation notes summarize tag changes; keep them current
+                const curationFormArea = document.getElementById('curationFormArea');
+                const curationStatus = window.currentCurationStatus;
+                if (curationFormArea && curateMode && !(curationStatus && curationStatus.status === 'complete')) {
+                    populateCurationForm(curationFormArea);
+                }
+                return;
+            }
+            await displayProduct(currentIndex);
+            showCurateInputs();
+        }
+
+        // Counter and prev/next buttons for products[index]
+        function updateNavigation(index) {
             // Update counter - show category filter if active
             const categoryLabel = currentCategory === 'all' ? '' : ` in ${formatCategoryName(currentCategory)}`;
             document.getElementById('counter').textContent = `Product ${index + 1} of ${products.length}${categoryLabel}`;
@@ -2367,6 +1826,20 @@ HTML_TEMPLATE = """
             // Update navigation buttons
             document.getElementById('prevBtn').disabled = index === 0;
             document.getElementById('nextBtn').disabled = index === products.length - 1;
+        }
+
+        // The card is parsed and completed (thumbnails, tags panel) off-document,
+        // then attached to #productCard in a single replaceChildren.
+        const _productCardParser = document.createElement('template');
+
+        async function displayProduct(index) {
+            if (index < 0 || index >= products.length) return;
+
+            currentIndex = index;
+            currentImageIndex = 0;
+            const product = products[index];
+
+            updateNavigation(index);
 
             // Fetch curated metadata for this product (if using Supabase)
             let curatedTags = [];
@@ -2376,47 +1849,54 @@ HTML_TEMPLATE = """
             let aiGeneratedTags = [];
             let curationStatus = null;
             if (useSupabase) {
-                // Fetch curated data
-                try {
-                    const curatedResponse = await fetch(`/api/curated/${product.product_id}`);
-                    const curatedData = await curatedResponse.json();
+                // The four lookups are independent; fetch them concurrently
+                const pid = product.product_id;
+                const getJson = url => fetch(url).then(r => r.json());
+                const [curatedRes, rejectedRes, aiTagsRes, statusRes] = await Promise.allSettled([
+                    getJson(`/api/curated/${pid}`),
+                    getJson(`/api/rejected_tags/${pid}`),
+                    getJson(`/api/ai_tags/${pid}`),
+                    getJson(`/api/curation_status/${pid}`)
+                ]);
+
+                // A newer navigation has taken over while these were in flight
+                if (products[currentIndex] !== product) return;
+
+                // Curated data
+                if (curatedRes.status === 'fulfilled') {
+                    const curatedData = curatedRes.value;
                     if (Array.isArray(curatedData)) {
                         curatedTags = curatedData.filter(c => c.field_name === 'style_tag');
                         curatedFit = curatedData.filter(c => c.field_name === 'fit');
                         curatedWeight = curatedData.filter(c => c.field_name === 'weight');
                     }
-                } catch (error) {
-                    console.error('Error fetching curated data:', error);
+                } else {
+                    console.error('Error fetching curated data:', curatedRes.reason);
                 }
 
-                // Fetch rejected tags (may fail if table doesn't exist yet)
-                try {
-                    const rejectedResponse = await fetch(`/api/rejected_tags/${product.product_id}`);
-                    const rejectedData = await rejectedResponse.json();
-                    if (Array.isArray(rejectedData)) {
-                        rejectedTags = rejectedData;
+                // Rejected tags (may fail if table doesn't exist yet)
+                if (rejectedRes.status === 'fulfilled') {
+                    if (Array.isArray(rejectedRes.value)) {
+                        rejectedTags = rejectedRes.value;
                     }
-                } catch (error) {
-                    console.warn('Could not fetch rejected tags (table may not exist yet):', error);
+                } else {
+                    console.warn('Could not fetch rejected tags (table may not exist yet):', rejectedRes.reason);
                 }
 
-                // Fetch AI-generated tags (may fail if table doesn't exist yet)
-                try {
-                    const aiTagsResponse = await fetch(`/api/ai_tags/${product.product_id}`);
-                    const aiTagsData = await aiTagsResponse.json();
-                    if (Array.isArray(aiTagsData)) {
-                        aiGeneratedTags = aiTagsData.filter(t => t.field_name === 'style_tag');
+                // AI-generated tags (may fail if table doesn't exist yet)
+                if (aiTagsRes.status === 'fulfilled') {
+                    if (Array.isArray(aiTagsRes.value)) {
+                        aiGeneratedTags = aiTagsRes.value.filter(t => t.field_name === 'style_tag');
                     }
-                } catch (error) {
-                    console.warn('Could not fetch AI-generated tags (table may not exist yet):', error);
+                } else {
+                    console.warn('Could not fetch AI-generated tags (table may not exist yet):', aiTagsRes.reason);
                 }
 
-                // Fetch curation status
-                try {
-                    const statusResponse = await fetch(`/api/curation_status/${product.product_id}`);
-                    curationStatus = await statusResponse.json();
-                } catch (error) {
-                    console.warn('Could not fetch curation status:', error);
+                // Curation status
+                if (statusRes.status === 'fulfilled') {
+                    curationStatus = statusRes.value;
+                } else {
+                    console.warn('Could not fetch curation status:', statusRes.reason);
                 }
             }
 
@@ -2445,27 +1925,14 @@ HTML_TEMPLATE = """
             }
 
             // Build image gallery (use image_urls_all when present so curator sees all photos)
-            const images = product.images || [];
-            const imageCount = product._source === 'supabase' && (product.image_urls_all || []).length > 0
-                ? (product.image_urls_all || []).length
-                : (product._source === 'supabase' ? (product.image_urls || []).length : images.length);
+            const images = product.images || EMPTY_ARRAY;
+            const imageCount = product._source === 'supabase' && (product.image_urls_all || EMPTY_ARRAY).length > 0
+                ? product.image_urls_all.length
+                : images.length;
             const mainImageSrc = getImageUrl(product, 0);
 
-            const canReselectStored = product._source === 'supabase' && (product.image_urls_all || []).length >= 2;
-            let thumbnails = '';
-            for (let i = 0; i < imageCount; i++) {
-                const imgSrc = getImageUrl(product, i);
-                const stored = isImageStored(product, i);
-                thumbnails += `
-                    <div class="thumbnail-wrap" style="position:relative;display:inline-block;" data-thumb-index="${i}">
-                        <img src="${imgSrc}"
-                             class="thumbnail ${i === 0 ? 'active' : ''}"
-                             onclick="thumbnailClick(${i})"
-                             alt="Thumbnail ${i + 1}">
-                        ${stored ? '<span class="stored-badge" title="Stored for outfit generator">Stored</span>' : ''}
-                    </div>
-                `;
-            }
+            const canReselectStored = product._source === 'supabase' && (product.image_urls_all || EMPTY_ARRAY).length >= 2;
+            const thumbnails = buildThumbnails(product, imageCount);
 
             // Build price display
             let priceHtml = '';
@@ -2486,25 +1953,25 @@ HTML_TEMPLATE = """
             // Build clickable color tags that link to color variants
             // First, build a map of color variants for this product
             const currentColor = product.color || '';
-            const parentId = product.parent_product_id || product.product_id.split('_')[0];
+            const parentId = product._parentId;
 
             const colorTags = (product.colors || []).map(c => {
                 // Generate the color slug to find the matching product
-                const colorSlug = c.toLowerCase().replace(/[^a-z0-9]+/g, '_').replace(/^_+|_+$/g, '') || 'unknown';
+                const colorSlug = c.toLowerCase().replace(COLOR_SLUG_SEPARATOR_RE, '_').replace(EDGE_UNDERSCORES_RE, '') || 'unknown';
                 const variantId = parentId + '_' + colorSlug;
 
                 // Check if this is the current color
                 const isCurrentColor = c.toLowerCase() === currentColor.toLowerCase();
 
                 // Find if the color variant exists in our products
-                const variantExists = allProducts.some(p => p.product_id === variantId);
+                const variantExists = productIds.has(variantId);
 
                 if (isCurrentColor) {
                     // Current color - highlight it
                     return `<span class="tag" style="background:#4CAF50;color:white;font-weight:bold;" title="Current color">${c}</span>`;
                 } else if (variantExists) {
                     // Clickable link to the variant
-                    return `<span class="tag color-variant-link" style="cursor:pointer;background:#e3f2fd;color:#1565c0;" data-variant-id="${variantId}" onclick="navigateToColorVariant('${variantId}')" title="Click to view ${c} variant">${c}</span>`;
+                    return `<span class="tag color-variant-link" style="cursor:pointer;background:#e3f2fd;color:#1565c0;" data-variant-id="${escapeAttr(variantId)}" title="Click to view ${c} variant">${c}</span>`;
                 } else {
                     // Variant not in database yet
                     return `<span class="tag" style="opacity:0.6;" title="Color variant not scraped yet">${c}</span>`;
@@ -2524,24 +1991,10 @@ HTML_TEMPLATE = """
                     const isAvailable = typeof s === 'object' ? s.available : true;
                     const availability = typeof s === 'object' ? (s.availability || 'unknown') : 'unknown';
 
-                    // Determine styling and tooltip based on availability
-                    let style = '';
-                    let tooltip = '';
-                    let indicator = '';
-
-                    if (availability === 'out_of_stock' || !isAvailable) {
-                        style = 'background: #f5f5f5; color: #999; text-decoration: line-through;';
-                        tooltip = 'Out of stock';
-                    } else if (availability === 'low_on_stock') {
-                        style = 'background: #fff3e0; color: #e65100; border: 1px solid #ffcc80;';
-                        tooltip = 'Low stock – only a few left';
-                        indicator = '<span style="display: inline-block; width: 6px; height: 6px; background: #ff9800; border-radius: 50%; margin-left: 6px; animation: pulse 1.5s infinite;"></span>';
-                    } else {
-                        style = 'background: #e8f5e9; color: #2e7d32; border: 1px solid #c8e6c9;';
-                        tooltip = 'In stock';
-                    }
-
-                    return `<span class="tag" style="${style} cursor: default; transition: all 0.2s;" title="${tooltip}">${sizeLabel}${indicator}</span>`;
+                    const level = (availability === 'out_of_stock' || !isAvailable) ? 'oos'
+                        : availability === 'low_on_stock' ? 'low'
+                        : 'in';
+                    return `<span class="tag size-${level}" title="${SIZE_TOOLTIPS[level]}">${sizeLabel}</span>`;
                 }).join('');
             } else if (sizesOld.length > 0) {
                 // Old format: ["S", "M", "L"]
@@ -2587,115 +2040,26 @@ HTML_TEMPLATE = """
                                 <div style="font-size: 10px; font-weight: 600; color: #666; margin-bottom: 6px; text-transform: uppercase;">${partName}</div>
                                 ${areasHtml}
                             </div>
-                        `;
-                } else {
-                        return areasHtml;
-                    }
-                }).join('');
-            } else if (product.composition) {
-                const comp = product.composition;
-
-                // Check if this is a complex shoe-style composition with part names
-                // Sort by length descending to match longer parts first (OUTSOLE before SOLE, etc.)
-                const partNames = ['OUTSOLE', 'MIDSOLE', 'INSOLE', 'FOOTBED', 'COUNTER', 'TONGUE', 'LINING', 'UPPER', 'OUTER', 'INNER', 'SOLE', 'HEEL', 'TOE', 'MAIN FABRIC', 'SECONDARY FABRIC', 'OUTER SHELL'];
-
-                // Find all part matches with their positions
-                let partMatches = [];
-                for (const partName of partNames) {
-                    // Match part name case-insensitively
-                    const regex = new RegExp(partName, 'gi');
-                    let match;
-                    while ((match = regex.exec(comp)) !== null) {
-                        // Check if this position overlaps with an already found (longer) part
-                        let overlaps = false;
-                        for (const existing of partMatches) {
-                            if ((match.index >= existing.start && match.index < existing.end) ||
-                                (match.index + partName.length > existing.start && match.index + partName.length <= existing.end)) {
-                                overlaps = true;
-                                break;
-                            }
-                        }
-                        if (!overlaps) {
-                            partMatches.push({
-                                name: partName.toUpperCase(),
-                                start: match.index,
-                                end: match.index + partName.length
-                            });
-                        }
-                    }
-                }
-
-                // Sort by position
-                partMatches.sort((a, b) => a.start - b.start);
-
-                const hasParts = partMatches.length > 0;
-
-                if (hasParts) {
-                    // Parse each section
-                    let sections = [];
-                    for (let i = 0; i < partMatches.length; i++) {
-                        const partName = partMatches[i].name;
-                        const startPos = partMatches[i].end;
-                        const endPos = (i + 1 < partMatches.length) ? partMatches[i + 1].start : comp.length;
-
-                        let materialsStr = comp.substring(startPos, endPos).trim();
-                        // Remove leading colon or space if present
-                        materialsStr = materialsStr.replace(/^[:\\s]+/, '');
-
-                        // Parse materials: "37% polyurethane32% polyester" -> ["37% polyurethane", "32% polyester"]
-                        const materialList = materialsStr.match(/\d+%\\s*[a-zA-Z][a-zA-Z\\s]*?(?=\d+%|$)/g) || [];
-                        const cleanedMaterials = materialList.map(m => m.trim()).filter(m => m);
-
-                        if (cleanedMaterials.length > 0) {
-                            sections.push({
-                                part: partName,
-                                materials: cleanedMaterials
-                            });
-                        }
-                    }
-
-                    if (sections.length > 0) {
-                        compositionHtml = sections.map(section => `
-                            <div style="margin-bottom: 12px;">
-                                <div style="font-size: 10px; font-weight: 600; color: #666; margin-bottom: 6px;">${section.part}</div>
-                                <div style="display: flex; flex-wrap: wrap; gap: 6px;">
-                                    ${section.materials.map(m => `<span class="tag" style="background: #f5f5f5; color: #333; font-size: 12px;">${m}</span>`).join('')}
-                                </div>
-                            </div>
-                        `).join('');
-                    } else {
-                        // Fallback to simple display
-                        compositionHtml = `<p style="color: #333; font-size: 14px; font-weight: 500; margin: 0; font-family: 'SF Mono', 'Monaco', 'Inconsolata', 'Fira Code', monospace;">${comp}</p>`;
-                    }
+                        `;
                 } else {
-                    // Simple composition like "100% cotton" or "49% polyamide, 29% polyester"
-                    // Parse into individual materials for pill display
-                    const materials = comp.split(/,\\s*/).map(m => m.trim()).filter(m => m);
-                    if (materials.length > 1) {
-                        compositionHtml = `
-                            <div style="display: flex; flex-wrap: wrap; gap: 6px;">
-                                ${materials.map(m => `<span class="tag" style="background: #f5f5f5; color: #333; font-size: 12px;">${m}</span>`).join('')}
-                    </div>
-                `;
-                    } else {
-                        compositionHtml = `<p style="color: #333; font-size: 14px; font-weight: 500; margin: 0; font-family: 'SF Mono', 'Monaco', 'Inconsolata', 'Fira Code', monospace;">${comp}</p>`;
+                        return areasHtml;
                     }
-                }
+                }).join('');
+            } else if (product.composition) {
+                compositionHtml = renderCompositionText(product.composition);
             }
 
             // Badge for main image: show when current image is one of the 2 stored in DB
             const mainImageStored = isImageStored(product, 0);
 
             // Render card (tags_final = ReFitd canonical tags only; no inferred style_tags/fit/formality/weight)
-            document.getElementById('productCard').innerHTML = `
+            _productCardParser.innerHTML = `
                 <div class="image-section">
                     <div class="main-image-wrap" style="position:relative;">
                         <img id="mainImage" src="${mainImageSrc}" alt="${product.name}" class="main-image">
                         <span id="mainImageStoredBadge" class="stored-badge-main" style="display:${mainImageStored ? 'block' : 'none'};">Stored for outfit generator</span>
                     </div>
-                    <div class="thumbnail-row">
-                        ${thumbnails}
-                    </div>
+                    <div class="thumbnail-row" id="thumbnailRow"></div>
                     ${canReselectStored ? `
                     <div class="reselect-stored-section" style="margin-top:12px;">
                         <button type="button" class="reselect-stored-btn" onclick="enterReselectStoredMode()" style="padding:6px 12px;font-size:12px;background:#f5f5f5;border:1px solid #ddd;border-radius:6px;cursor:pointer;">Reselect stored images</button>
@@ -2715,7 +2079,7 @@ HTML_TEMPLATE = """
                     ${curateMode ? `
                         <div class="category-dropdown-wrapper">
                             <select class="category-dropdown" onchange="handleCategoryChange(this)">
-                                ${buildCategoryDropdownOptions(classifyProduct(product).sub || product.category)}
+                                ${buildCategoryDropdownOptions(product._cat.sub || product.category)}
                             </select>
                         </div>
                     ` : `
@@ -2729,439 +2093,7 @@ HTML_TEMPLATE = """
                         ${priceHtml}
                     </div>
 
-                    ${product.tags_final ? `
-                        <div class="ai-section" style="margin-top: 20px; padding: 20px; background: linear-gradient(135deg, #fafafa 0%, #f5f5f5 100%); border-radius: 12px; border: 1px solid #e0e0e0;">
-                            <div style="display: flex; align-items: center; justify-content: space-between; margin-bottom: 20px;">
-                                <span style="font-size: 11px; font-weight: 600; color: #666; text-transform: uppercase; letter-spacing: 1px;">ReFitd Canonical Tags</span>
-                                <span style="font-size: 10px; font-weight: 600; padding: 4px 10px; border-radius: 10px; background: ${
-                                    product.curation_status_refitd === 'approved' ? '#4CAF50' :
-                                    product.curation_status_refitd === 'needs_review' ? '#FF9800' :
-                                    product.curation_status_refitd === 'needs_fix' ? '#f44336' : '#bdbdbd'
-                                }; color: white; text-transform: uppercase; letter-spacing: 0.5px;">${product.curation_status_refitd || 'pending'}</span>
-                            </div>
-
-                            <!-- Style Identity (array field) -->
-                            <div style="margin-bottom: 20px;">
-                                <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.8px; margin-bottom: 10px;">Style Identity</div>
-                                <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                    ${(product.tags_final.style_identity || []).map(s => `
-                                        <span style="display: inline-flex; align-items: center; background: #1a1a1a; color: white; font-weight: 500; padding: 8px 16px; border-radius: 6px; font-size: 13px; gap: 8px;">
-                                            ${s}
-                                            <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagRemove('style_identity', '${s.replace(/'/g, "\\'")}')" title="Remove ${s}" style="display: none; background: none; border: none; color: rgba(255,255,255,0.7); cursor: pointer; padding: 0; font-size: 16px; line-height: 1; margin-left: 4px;">×</button>
-                                        </span>
-                                    `).join('')}
-                                    ${(product.tags_final.deleted_tags?.style_identity || []).map(s => {
-                                        // Handle both old format (string) and new format (object)
-                                        const tagValue = typeof s === 'string' ? s : s.value;
-                                        const reason = typeof s === 'string' ? '' : (s.reason || '');
-                                        const curator = typeof s === 'string' ? '' : (s.curator || '');
-                                        const tooltip = reason ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : 'Rejected');
-                                        return `
-                                            <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #3d1a1a; color: #999; font-weight: 500; padding: 8px 16px; border-radius: 6px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #6d3a3a; cursor: help;" title="${tooltip}">
-                                                ${tagValue}
-                                                ${reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none;">(${reason.substring(0, 30)}${reason.length > 30 ? '...' : ''})</span>` : ''}
-                                                <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagAdd('style_identity', '${tagValue.replace(/'/g, "\\'")}')" title="Restore ${tagValue}" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                            </span>
-                                        `;
-                                    }).join('')}
-                                    ${(product.tags_final.style_identity || []).length === 0 && !(product.tags_final.deleted_tags?.style_identity || []).length ? `<span style="color: #ccc; font-size: 12px;">None</span>` : ''}
-                                    <div class="canonical-tag-add-input" style="display: none;">
-                                        <select style="padding: 8px 12px; border: 1px dashed #ccc; border-radius: 6px; font-size: 13px; background: white;" onchange="if(this.value){handleCanonicalTagAdd('style_identity', this.value); this.value='';}">
-                                            <option value="">Add style...</option>
-                                            <option value="minimal">Minimal</option>
-                                            <option value="classic">Classic</option>
-                                            <option value="preppy">Preppy</option>
-                                            <option value="workwear">Workwear</option>
-                                            <option value="streetwear">Streetwear</option>
-                                            <option value="rugged">Rugged</option>
-                                            <option value="tailoring">Tailoring</option>
-                                            <option value="elevated-basics">Elevated Basics</option>
-                                            <option value="normcore">Normcore</option>
-                                            <option value="sporty">Sporty</option>
-                                            <option value="outdoorsy">Outdoorsy</option>
-                                            <option value="western">Western</option>
-                                            <option value="vintage">Vintage</option>
-                                            <option value="grunge">Grunge</option>
-                                            <option value="punk">Punk</option>
-                                            <option value="utilitarian">Utilitarian</option>
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <!-- Formality (single-value field) -->
-                            <div style="margin-bottom: 16px; background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Formality</div>
-                                <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                    ${product.tags_final.formality ? `
-                                        <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                            ${product.tags_final.formality}
-                                            <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('formality', null)" title="Remove formality" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                        </span>
-                                    ` : `<span style="color: #ccc; font-size: 12px;">Not set</span>`}
-                                    ${product.tags_final.deleted_tags?.formality ? (() => {
-                                        const dt = product.tags_final.deleted_tags.formality;
-                                        const tagValue = typeof dt === 'string' ? dt : (dt?.value || '');
-                                        const reason = typeof dt === 'string' ? '' : (dt?.reason || '');
-                                        const curator = typeof dt === 'string' ? '' : (dt?.curator || '');
-                                        const tooltip = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
-                                        const reasonSnippet = reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${reason.length > 30 ? reason.substring(0, 30) + '...' : reason})</span>` : '';
-                                        return `
-                                            <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #fee; color: #999; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #fcc; cursor: help;" title="${tooltip}">
-                                                ${tagValue}${reasonSnippet}
-                                                <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagSet('formality', '${tagValue}')" title="Restore formality" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                            </span>
-                                        `;
-                                    })() : ''}
-                                    <div class="canonical-tag-add-input" style="display: none;">
-                                        <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white;" onchange="if(this.value){handleCanonicalTagSet('formality', this.value); this.value='';}">
-                                            <option value="">Set formality...</option>
-                                            <option value="athletic">Athletic</option>
-                                            <option value="casual">Casual</option>
-                                            <option value="smart-casual">Smart Casual</option>
-                                            <option value="business-casual">Business Casual</option>
-                                            <option value="formal">Formal</option>
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <div style="display: grid; grid-template-columns: repeat(2, 1fr); gap: 12px;">
-                                <!-- Fit (single-value field) - NOT for shoes -->
-                                <div style="background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                    <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Fit</div>
-                                    <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                        ${product.tags_final.fit ? `
-                                            <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                                ${product.tags_final.fit}
-                                                <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('fit', null)" title="Remove fit" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                            </span>
-                                        ` : `<span style="color: #ccc; font-size: 12px;">${product.tags_final.shoe_type ? 'N/A' : 'Not set'}</span>`}
-                                        ${product.tags_final.deleted_tags?.fit ? (() => {
-                                            const dt = product.tags_final.deleted_tags.fit;
-                                            const tagValue = typeof dt === 'string' ? dt : (dt?.value || '');
-                                            const reason = typeof dt === 'string' ? '' : (dt?.reason || '');
-                                            const curator = typeof dt === 'string' ? '' : (dt?.curator || '');
-                                            const tooltip = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
-                                            const reasonSnippet = reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${reason.length > 30 ? reason.substring(0, 30) + '...' : reason})</span>` : '';
-                                            return `
-                                                <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #fee; color: #999; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #fcc; cursor: help;" title="${tooltip}">
-                                                    ${tagValue}${reasonSnippet}
-                                                    <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagSet('fit', '${tagValue}')" title="Restore fit" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                                </span>
-                                            `;
-                                        })() : ''}
-                                    </div>
-                                    <div class="canonical-tag-add-input" style="display: none; margin-top: 8px;">
-                                        <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white; width: 100%;" onchange="if(this.value){handleCanonicalTagSet('fit', this.value); this.value='';}">
-                                            <option value="">Set fit...</option>
-                                            <option value="skinny">Skinny</option>
-                                            <option value="slim">Slim</option>
-                                            <option value="regular">Regular</option>
-                                            <option value="relaxed">Relaxed</option>
-                                            <option value="baggy">Baggy</option>
-                                            <option value="oversized">Oversized</option>
-                                        </select>
-                                    </div>
-                                </div>
-                                <!-- Silhouette (single-value field) -->
-                                <div style="background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                    <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Silhouette</div>
-                                    <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                        ${product.tags_final.silhouette ? `
-                                            <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                                ${product.tags_final.silhouette}
-                                                <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('silhouette', null)" title="Remove silhouette" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                            </span>
-                                        ` : `<span style="color: #ccc; font-size: 12px;">${product.tags_final.shoe_type ? 'N/A' : 'Not set'}</span>`}
-                                        ${product.tags_final.deleted_tags?.silhouette ? (() => {
-                                            const dt = product.tags_final.deleted_tags.silhouette;
-                                            const tagValue = typeof dt === 'string' ? dt : (dt?.value || '');
-                                            const reason = typeof dt === 'string' ? '' : (dt?.reason || '');
-                                            const curator = typeof dt === 'string' ? '' : (dt?.curator || '');
-                                            const tooltip = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
-                                            const reasonSnippet = reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${reason.length > 30 ? reason.substring(0, 30) + '...' : reason})</span>` : '';
-                                            return `
-                                                <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #fee; color: #999; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #fcc; cursor: help;" title="${tooltip}">
-                                                    ${tagValue}${reasonSnippet}
-                                                    <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagSet('silhouette', '${tagValue}')" title="Restore silhouette" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                                </span>
-                                            `;
-                                        })() : ''}
-                                    </div>
-                                    <div class="canonical-tag-add-input" style="display: none; margin-top: 8px;">
-                                        <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white; width: 100%;" onchange="if(this.value){handleCanonicalTagSet('silhouette', this.value); this.value='';}">
-                                            <option value="">Set silhouette...</option>
-                                            <optgroup label="Bottoms">
-                                                <option value="straight">Straight</option>
-                                                <option value="tapered">Tapered</option>
-                                                <option value="wide">Wide</option>
-                                            </optgroup>
-                                            <optgroup label="Tops & Outerwear">
-                                                <option value="neutral">Neutral</option>
-                                                <option value="relaxed">Relaxed</option>
-                                                <option value="boxy">Boxy</option>
-                                                <option value="structured">Structured</option>
-                                                <option value="tailored">Tailored</option>
-                                                <option value="longline">Longline</option>
-                                            </optgroup>
-                                        </select>
-                                    </div>
-                                </div>
-                                <!-- Length (single-value field) - NOT for shoes -->
-                                <div style="background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                    <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Length</div>
-                                    <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                        ${product.tags_final.length ? `
-                                            <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                                ${product.tags_final.length}
-                                                <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('length', null)" title="Remove length" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                            </span>
-                                        ` : `<span style="color: #ccc; font-size: 12px;">${product.tags_final.shoe_type ? 'N/A' : 'Not set'}</span>`}
-                                        ${product.tags_final.deleted_tags?.length ? (() => {
-                                            const dt = product.tags_final.deleted_tags.length;
-                                            const tagValue = typeof dt === 'string' ? dt : (dt?.value || '');
-                                            const reason = typeof dt === 'string' ? '' : (dt?.reason || '');
-                                            const curator = typeof dt === 'string' ? '' : (dt?.curator || '');
-                                            const tooltip = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
-                                            const reasonSnippet = reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${reason.length > 30 ? reason.substring(0, 30) + '...' : reason})</span>` : '';
-                                            return `
-                                                <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #fee; color: #999; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #fcc; cursor: help;" title="${tooltip}">
-                                                    ${tagValue}${reasonSnippet}
-                                                    <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagSet('length', '${tagValue}')" title="Restore length" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                                </span>
-                                            `;
-                                        })() : ''}
-                                    </div>
-                                    <div class="canonical-tag-add-input" style="display: none; margin-top: 8px;">
-                                        <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white; width: 100%;" onchange="if(this.value){handleCanonicalTagSet('length', this.value); this.value='';}">
-                                            <option value="">Set length...</option>
-                                            <option value="cropped">Cropped</option>
-                                            <option value="regular">Regular</option>
-                                            <option value="long">Long</option>
-                                        </select>
-                                    </div>
-                                </div>
-                                <!-- Pattern (single-value field) -->
-                                <div style="background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                    <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Pattern</div>
-                                    <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                        ${product.tags_final.pattern ? `
-                                            <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                                ${product.tags_final.pattern}
-                                                <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('pattern', null)" title="Remove pattern" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                            </span>
-                                        ` : `<span style="color: #ccc; font-size: 12px;">Not set</span>`}
-                                        ${product.tags_final.deleted_tags?.pattern ? (() => {
-                                            const dt = product.tags_final.deleted_tags.pattern;
-                                            const tagValue = typeof dt === 'string' ? dt : (dt?.value || '');
-                                            const reason = typeof dt === 'string' ? '' : (dt?.reason || '');
-                                            const curator = typeof dt === 'string' ? '' : (dt?.curator || '');
-                                            const tooltip = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
-                                            const reasonSnippet = reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${reason.length > 30 ? reason.substring(0, 30) + '...' : reason})</span>` : '';
-                                            return `
-                                                <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #fee; color: #999; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #fcc; cursor: help;" title="${tooltip}">
-                                                    ${tagValue}${reasonSnippet}
-                                                    <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagSet('pattern', '${tagValue}')" title="Restore pattern" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                                </span>
-                                            `;
-                                        })() : ''}
-                                    </div>
-                                    <div class="canonical-tag-add-input" style="display: none; margin-top: 8px;">
-                                        <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white; width: 100%;" onchange="if(this.value){handleCanonicalTagSet('pattern', this.value); this.value='';}">
-                                            <option value="">Set pattern...</option>
-                                            <option value="solid">Solid</option>
-                                            <option value="stripe">Stripe</option>
-                                            <option value="check">Check</option>
-                                            <option value="textured">Textured</option>
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <!-- Context (array field) -->
-                            <div style="margin-top: 16px; background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 10px;">Context</div>
-                                <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                    ${(product.tags_final.context || []).map(c => `
-                                        <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px;">
-                                            ${c}
-                                            <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagRemove('context', '${c.replace(/'/g, "\\'")}')" title="Remove ${c}" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                        </span>
-                                    `).join('')}
-                                    ${(product.tags_final.deleted_tags?.context || []).map(c => {
-                                        // Handle both old format (string) and new format (object)
-                                        const tagValue = typeof c === 'string' ? c : (c?.value || '');
-                                        const reason = typeof c === 'string' ? '' : (c?.reason || '');
-                                        const curator = typeof c === 'string' ? '' : (c?.curator || '');
-                                        const tooltip = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
-                                        const reasonSnippet = reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${reason.length > 30 ? reason.substring(0, 30) + '...' : reason})</span>` : '';
-                                        return `
-                                            <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #fee; color: #999; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #fcc; cursor: help;" title="${tooltip}">
-                                                ${tagValue}${reasonSnippet}
-                                                <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagAdd('context', '${tagValue.replace(/'/g, "\\\\'")}')" title="Restore ${tagValue}" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                            </span>
-                                        `;
-                                    }).join('')}
-                                    ${(product.tags_final.context || []).length === 0 && !(product.tags_final.deleted_tags?.context || []).length ? `<span style="color: #ccc; font-size: 12px;">None</span>` : ''}
-                                    <div class="canonical-tag-add-input" style="display: none;">
-                                        <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white;" onchange="if(this.value){handleCanonicalTagAdd('context', this.value); this.value='';}">
-                                            <option value="">Add context...</option>
-                                            <option value="everyday">Everyday</option>
-                                            <option value="work-appropriate">Work Appropriate</option>
-                                            <option value="travel">Travel</option>
-                                            <option value="evening">Evening</option>
-                                            <option value="weekend">Weekend</option>
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <!-- Construction Details (array field) -->
-                            <div style="margin-top: 12px; background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 10px;">Construction</div>
-                                <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                    ${(product.tags_final.construction_details || []).map(d => `
-                                        <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px;">
-                                            ${d}
-                                            <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagRemove('construction_details', '${d.replace(/'/g, "\\'")}')" title="Remove ${d}" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                        </span>
-                                    `).join('')}
-                                    ${(product.tags_final.deleted_tags?.construction_details || []).map(c => {
-                                        // Handle both old format (string) and new format (object)
-                                        const tagValue = typeof c === 'string' ? c : (c?.value || '');
-                                        const reason = typeof c === 'string' ? '' : (c?.reason || '');
-                                        const curator = typeof c === 'string' ? '' : (c?.curator || '');
-                                        const tooltip = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
-                                        const reasonSnippet = reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${reason.length > 30 ? reason.substring(0, 30) + '...' : reason})</span>` : '';
-                                        return `
-                                            <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #fee; color: #999; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #fcc; cursor: help;" title="${tooltip}">
-                                                ${tagValue}${reasonSnippet}
-                                                <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagAdd('construction_details', '${tagValue.replace(/'/g, "\\\\'")}')" title="Restore ${tagValue}" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                            </span>
-                                        `;
-                                    }).join('')}
-                                    ${(product.tags_final.construction_details || []).length === 0 && !(product.tags_final.deleted_tags?.construction_details || []).length ? `<span style="color: #ccc; font-size: 12px;">None</span>` : ''}
-                                    <div class="canonical-tag-add-input" style="display: none;">
-                                        <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white;" onchange="if(this.value){handleCanonicalTagAdd('construction_details', this.value); this.value='';}">
-                                            <option value="">Add detail...</option>
-                                            <optgroup label="Bottoms">
-                                                <option value="pleated">Pleated</option>
-                                                <option value="flat-front">Flat Front</option>
-                                                <option value="cargo">Cargo</option>
-                                                <option value="drawstring">Drawstring</option>
-                                                <option value="elastic-waist">Elastic Waist</option>
-                                            </optgroup>
-                                            <optgroup label="Tops & Outerwear">
-                                                <option value="structured-shoulder">Structured Shoulder</option>
-                                                <option value="dropped-shoulder">Dropped Shoulder</option>
-                                            </optgroup>
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <!-- Pairing Tags (array field) -->
-                            <div style="margin-top: 12px; background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 10px;">Pairing</div>
-                                <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                    ${(product.tags_final.pairing_tags || []).map(p => `
-                                        <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px;">
-                                            ${p}
-                                            <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagRemove('pairing_tags', '${p.replace(/'/g, "\\'")}')" title="Remove ${p}" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                        </span>
-                                    `).join('')}
-                                    ${(product.tags_final.deleted_tags?.pairing_tags || []).map(p => {
-                                        // Handle both old format (string) and new format (object)
-                                        const tagValue = typeof p === 'string' ? p : (p?.value || '');
-                                        const reason = typeof p === 'string' ? '' : (p?.reason || '');
-                                        const curator = typeof p === 'string' ? '' : (p?.curator || '');
-                                        const tooltip = reason && curator ? `Rejected by ${curator}: ${reason}` : (curator ? `Rejected by ${curator}` : (reason ? `Reason: ${reason}` : 'Rejected'));
-                                        const reasonSnippet = reason ? `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${reason.length > 30 ? reason.substring(0, 30) + '...' : reason})</span>` : '';
-                                        return `
-                                            <span class="deleted-tag-display" style="display: inline-flex; align-items: center; background: #fee; color: #999; padding: 6px 12px; border-radius: 4px; font-size: 13px; gap: 8px; text-decoration: line-through; border: 1px dashed #fcc; cursor: help;" title="${tooltip}">
-                                                ${tagValue}${reasonSnippet}
-                                                <button class="canonical-tag-restore-btn" onclick="handleCanonicalTagAdd('pairing_tags', '${tagValue.replace(/'/g, "\\\\'")}')" title="Restore ${tagValue}" style="display: none; background: none; border: none; color: #4caf50; cursor: pointer; padding: 0; font-size: 12px; line-height: 1;">↩</button>
-                                            </span>
-                                        `;
-                                    }).join('')}
-                                    ${(product.tags_final.pairing_tags || []).length === 0 && !(product.tags_final.deleted_tags?.pairing_tags || []).length ? `<span style="color: #ccc; font-size: 12px;">None</span>` : ''}
-                                    <div class="canonical-tag-add-input" style="display: none;">
-                                        <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px; background: white;" onchange="if(this.value){handleCanonicalTagAdd('pairing_tags', this.value); this.value='';}">
-                                            <option value="">Add pairing...</option>
-                                            <option value="neutral-base">Neutral Base</option>
-                                            <option value="statement-piece">Statement Piece</option>
-                                            <option value="easy-dress-up">Easy Dress Up</option>
-                                            <option value="easy-dress-down">Easy Dress Down</option>
-                                            <option value="high-versatility">High Versatility</option>
-                                        </select>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <!-- Shoe-specific fields -->
-                            ${product.tags_final.shoe_type || product.tags_final.profile || product.tags_final.closure ? `
-                                <div style="margin-top: 16px; padding-top: 16px; border-top: 1px solid #eee;">
-                                    <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 12px;">Shoe Details</div>
-                                    <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 12px;">
-                                        ${product.tags_final.shoe_type ? `
-                                            <div style="background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                                <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Type</div>
-                                                <span style="display: inline-flex; align-items: center; background: #1a1a1a; color: white; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                                    ${product.tags_final.shoe_type}
-                                                    <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('shoe_type', null)" title="Remove shoe type" style="display: none; background: none; border: none; color: rgba(255,255,255,0.7); cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                                </span>
-                                            </div>
-                                        ` : ''}
-                                        ${product.tags_final.profile ? `
-                                            <div style="background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                                <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Profile</div>
-                                                <span style="display: inline-flex; align-items: center; background: #1a1a1a; color: white; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                                    ${product.tags_final.profile}
-                                                    <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('profile', null)" title="Remove profile" style="display: none; background: none; border: none; color: rgba(255,255,255,0.7); cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                                </span>
-                                            </div>
-                                        ` : ''}
-                                        ${product.tags_final.closure ? `
-                                            <div style="background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                                <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Closure</div>
-                                                <span style="display: inline-flex; align-items: center; background: #1a1a1a; color: white; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                                    ${product.tags_final.closure}
-                                                    <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('closure', null)" title="Remove closure" style="display: none; background: none; border: none; color: rgba(255,255,255,0.7); cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                                </span>
-                                            </div>
-                                        ` : ''}
-                                    </div>
-                                </div>
-                            ` : ''}
-
-                            <!-- Top Layer Role (only for tops) -->
-                            ${product.tags_final.top_layer_role ? `
-                                <div style="margin-top: 12px; background: white; padding: 14px 16px; border-radius: 8px; border: 1px solid #eee;">
-                                    <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;">Top Layer Role</div>
-                                    <div style="display: flex; flex-wrap: wrap; gap: 8px; align-items: center;">
-                                        <span style="display: inline-flex; align-items: center; background: #f5f5f5; color: #333; padding: 6px 12px; border-radius: 4px; font-size: 13px; font-weight: 500; gap: 8px;">
-                                            ${product.tags_final.top_layer_role === 'base' ? 'Base Layer' : 'Mid Layer'}
-                                            <button class="canonical-tag-delete-btn" onclick="handleCanonicalTagSet('top_layer_role', null)" title="Remove layer role" style="display: none; background: none; border: none; color: #999; cursor: pointer; padding: 0; font-size: 14px; line-height: 1;">×</button>
-                                        </span>
-                                        <div class="canonical-tag-add-input" style="display: none;">
-                                            <select style="padding: 6px 10px; border: 1px dashed #ccc; border-radius: 4px; font-size: 12px;" onchange="if(this.value){handleCanonicalTagSet('top_layer_role', this.value); this.value='';}">
-                                                <option value="">Set layer...</option>
-                                                <option value="base">Base Layer</option>
-                                                <option value="mid">Mid Layer</option>
-                                            </select>
-                                        </div>
-                                    </div>
-                                </div>
-                            ` : ''}
-
-                            ${product.tag_policy_version ? `
-                                <div style="margin-top: 16px; padding-top: 12px; border-top: 1px solid #eee; font-size: 11px; color: #bbb;">
-                                    Policy: ${product.tag_policy_version}
-                                </div>
-                            ` : ''}
-                        </div>
-                    ` : ''}
+                    ${product.tags_final ? '<div data-canonical-panel></div>' : ''}
 
                     <!-- Product Details Section -->
                     <div class="product-details-grid" style="margin-top: 24px; display: grid; gap: 20px;">
@@ -3169,7 +2101,7 @@ HTML_TEMPLATE = """
                     ${product.description ? `
                             <div class="detail-card" style="background: #fafafa; border-radius: 12px; padding: 20px; border: 1px solid #eee;">
                                 <div style="font-size: 10px; font-weight: 600; color: #999; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 12px;">Description</div>
-                                <p style="color: #333; line-height: 1.7; font-size: 14px; margin: 0;">${product.description}</p>
+                                <p class="product-description" style="color: #333; line-height: 1.7; font-size: 14px; margin: 0;"></p>
                             </div>
                     ` : ''}
 
@@ -3248,6 +2180,96 @@ HTML_TEMPLATE = """
                     <p class="scraped-time">Scraped: ${new Date(product.scraped_at).toLocaleString()}</p>
                 </div>
             `;
+            const card = _productCardParser.content;
+            card.getElementById('thumbnailRow').replaceChildren(thumbnails);
+            if (product.tags_final) {
+                card.querySelector('[data-canonical-panel]').replaceWith(renderCanonicalPanel(product));
+            }
+            if (product.description) {
+                renderDescriptionPreview(card.querySelector('.product-description'), product.description);
+            }
+            document.getElementById('productCard').replaceChildren(card);
+        }
+
+        // Delegated clicks for the product card: thumbnails, color variant links and
+        // canonical tag delete/restore buttons carry their arguments as data-*; the
+        // description's "more" button expands it in place.
+        document.getElementById('productCard').addEventListener('click', (e) => {
+            const tagButton = e.target.closest('[data-tag-action]');
+            if (tagButton) {
+                const field = tagButton.dataset.tagField;
+                const value = tagButton.dataset.tagValue;
+                const action = tagButton.dataset.tagAction;
+                if (action === 'add') handleCanonicalTagAdd(field, value);
+                else if (action === 'remove') handleCanonicalTagRemove(field, value);
+                else handleCanonicalTagSet(field, value === undefined ? null : value);
+                return;
+            }
+            if (e.target.classList.contains('thumbnail')) {
+                const wrap = e.target.closest('[data-thumb-index]');
+                if (wrap) thumbnailClick(Number(wrap.dataset.thumbIndex));
+                return;
+            }
+            if (e.target.classList.contains('description-more-btn')) {
+                expandDescription(e.target.parentElement);
+                return;
+            }
+            const variantLink = e.target.closest('.color-variant-link');
+            if (variantLink) {
+                navigateToColorVariant(variantLink.dataset.variantId);
+            }
+        });
+
+        // Canonical tag <select>s (data-tag-select="add" or "set") apply the chosen
+        // value, then reset to their placeholder option.
+        document.getElementById('productCard').addEventListener('change', (e) => {
+            const select = e.target.closest('select[data-tag-select]');
+            if (!select || !select.value) return;
+            const field = select.dataset.tagField;
+            if (select.dataset.tagSelect === 'add') handleCanonicalTagAdd(field, select.value);
+            else handleCanonicalTagSet(field, select.value);
+            select.value = '';
+        });
+
+        // Long descriptions show their first DESCRIPTION_PREVIEW_CHARS characters and a
+        // "more" button. The full text is kept per <p>, not read from products[currentIndex]:
+        // displayProduct moves currentIndex before the new card replaces this one.
+        const DESCRIPTION_PREVIEW_CHARS = 200;
+        const _fullDescriptions = new WeakMap();
+
+        function renderDescriptionPreview(el, text) {
+            if (text.length <= DESCRIPTION_PREVIEW_CHARS) {
+                el.textContent = text;
+                return;
+            }
+            const more = document.createElement('button');
+            more.className = 'description-more-btn';
+            more.textContent = 'more';
+            el.replaceChildren(text.slice(0, DESCRIPTION_PREVIEW_CHARS).trimEnd() + '… ', more);
+            _fullDescriptions.set(el, text);
+        }
+
+        function expandDescription(el) {
+            const text = _fullDescriptions.get(el);
+            if (text !== undefined) el.textContent = text;
+        }
+
+        // Thumbnails are cloned from #thumbTemplate rather than parsed from HTML;
+        // clicks reach thumbnailClick through the #productCard listener.
+        function buildThumbnails(product, imageCount) {
+            const template = document.getElementById('thumbTemplate').content.firstElementChild;
+            const frag = document.createDocumentFragment();
+            for (let i = 0; i < imageCount; i++) {
+                const node = template.cloneNode(true);
+                node.dataset.thumbIndex = i;
+                const img = node.querySelector('.thumbnail');
+                img.src = getImageUrl(product, i);
+                img.alt = `Thumbnail ${i + 1}`;
+                if (i === 0) img.classList.add('active');
+                if (!isImageStored(product, i)) node.querySelector('.stored-badge').remove();
+                frag.appendChild(node);
+            }
+            return frag;
         }
 
         function thumbnailClick(index) {
@@ -3394,11 +2416,16 @@ HTML_TEMPLATE = """
                 const result = await response.json();
 
                 if (response.ok && result.success) {
-                    // Remove from local products array
-                    const deletedIndex = products.findIndex(p => p.product_id === productId);
-                    if (deletedIndex !== -1) {
-                        products.splice(deletedIndex, 1);
-                    }
+                    // Remove from the local lists; the current view may alias
+                    // allProducts, so rebuild rather than splice
+                    productIds.delete(productId);
+                    const keep = p => p.product_id !== productId;
+                    const viewingAll = products === allProducts;
+                    allProducts = allProducts.filter(keep);
+                    products = viewingAll ? allProducts : products.filter(keep);
+                    filteredProducts = products;
+                    buildCategoryIndex();
+                    buildCategorySidebar();
 
                     // Show success message
                     alert(`✓ Product deleted successfully!\n\nImages deleted: ${result.images_deleted || 0}`);
@@ -3478,9 +2505,7 @@ HTML_TEMPLATE = """
         // Helper to render rejection reason snippet (for inline display)
         function renderRejectionReason(deletedTag) {
             const reason = getDeletedTagReason(deletedTag);
-            if (!reason) return '';
-            const truncated = reason.length > 30 ? reason.substring(0, 30) + '...' : reason;
-            return `<span style="font-size: 10px; color: #e57373; font-style: italic; text-decoration: none; margin-left: 4px;">(${truncated})</span>`;
+            return reason ? rejectionReasonNode(reason).outerHTML : '';
         }
 
         // ============================================
@@ -4015,10 +3040,7 @@ HTML_TEMPLATE = """
                 const result = await response.json();
                 if (result.success) {
                     console.log(`✓ Added canonical tag: "${value}" to ${fieldName}`);
-                    if (product.tags_final) product.tags_final = result.tags_final;
-                    preserveCurationNotesUserContent();
-                    await displayProduct(currentIndex);
-                    showCurateInputs();
+                    await applyCanonicalTagEdit(product, fieldName, result.tags_final);
                 } else {
                     console.error('Failed to add:', result.error);
                     alert('Failed to add tag: ' + result.error);
@@ -4060,10 +3082,7 @@ HTML_TEMPLATE = """
                 const result = await response.json();
                 if (result.success) {
                     console.log(`✓ Removed canonical tag: "${value}" from ${fieldName} (reason: ${feedback.reason || 'none provided'})`);
-                    if (product.tags_final) product.tags_final = result.tags_final;
-                    preserveCurationNotesUserContent();
-                    await displayProduct(currentIndex);
-                    showCurateInputs();
+                    await applyCanonicalTagEdit(product, fieldName, result.tags_final);
                 } else {
                     console.error('Failed to remove:', result.error);
                     alert('Failed to remove tag: ' + result.error);
@@ -4113,10 +3132,7 @@ HTML_TEMPLATE = """
                 const result = await response.json();
                 if (result.success) {
                     console.log(`✓ Set canonical tag: ${fieldName} = "${value}"${feedback.reason ? ` (reason: ${feedback.reason})` : ''}`);
-                    if (product.tags_final) product.tags_final = result.tags_final;
-                    preserveCurationNotesUserContent();
-                    await displayProduct(currentIndex);
-                    showCurateInputs();
+                    await applyCanonicalTagEdit(product, fieldName, result.tags_final);
                 } else {
                     console.error('Failed to set:', result.error);
                     alert('Failed to set tag: ' + result.error);
@@ -4331,6 +3347,64 @@ HTML_TEMPLATE = """
 
         let chatHistory = [];
 
+        // Client-side LRU cache for AI search results; an identical query skips
+        // the network and embedding round trip.
+        const AI_CACHE_MAX = 100;
+        const _aiSearchCache = new Map();
+
+        function lruGet(cache, key) {
+            const value = cache.get(key);
+            if (value !== undefined) {
+                // Re-insert so Map order tracks recency
+                cache.delete(key);
+                cache.set(key, value);
+            }
+            return value;
+        }
+
+        function lruSet(cache, key, value, max = AI_CACHE_MAX) {
+            cache.delete(key);
+            cache.set(key, value);
+            if (cache.size > max) {
+                cache.delete(cache.keys().next().value);
+            }
+        }
+
+        function normalizeSearchQuery(query) {
+            return query.trim().toLowerCase().replace(/\s+/g, ' ');
+        }
+
+        // Only the most recent chat messages stay mounted; older ones are kept as
+        // HTML and re-mounted in batches when the sentinel at the top of the list
+        // scrolls into view.
+        const CHAT_MOUNTED_MESSAGES = 50;
+        const CHAT_RESTORE_BATCH = 20;
+        const _detachedChatMessages = [];  // oldest first
+
+        function trimChatMessages(container) {
+            const sentinel = document.getElementById('chatHistorySentinel');
+            while (container.children.length - 1 > CHAT_MOUNTED_MESSAGES) {
+                const oldest = sentinel.nextElementSibling;
+                _detachedChatMessages.push(oldest.outerHTML);
+                oldest.remove();
+            }
+        }
+
+        const _chatHistoryObserver = new IntersectionObserver((entries) => {
+            if (!entries[0].isIntersecting || !_detachedChatMessages.length) return;
+            const sentinel = entries[0].target;
+            const container = sentinel.parentElement;
+            const batch = _detachedChatMessages.splice(-CHAT_RESTORE_BATCH);
+            const previousHeight = container.scrollHeight;
+            sentinel.insertAdjacentHTML('afterend', batch.join(''));
+            // Keep the message the user was looking at in place
+            container.scrollTop += container.scrollHeight - previousHeight;
+            // Re-observe so a sentinel that is still visible reports again
+            _chatHistoryObserver.unobserve(sentinel);
+            _chatHistoryObserver.observe(sentinel);
+        }, { root: document.getElementById('chatMessages'), rootMargin: '200px 0px 0px 0px' });
+        _chatHistoryObserver.observe(document.getElementById('chatHistorySentinel'));
+
         async function checkAIStatus() {
             const statusEl = document.getElementById('aiStatus');
             const statusText = document.getElementById('aiStatusText');
@@ -4355,13 +3429,44 @@ HTML_TEMPLATE = """
             }
         }
 
+        const AI_SEARCH_LIMIT = 12;
+
+        // Read a newline-delimited JSON response, calling onEvent per line as
+        // chunks arrive
+        async function readNdjson(response, onEvent) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let newline;
+                while ((newline = buffer.indexOf('\\n')) >= 0) {
+                    const line = buffer.slice(0, newline).trim();
+                    buffer = buffer.slice(newline + 1);
+                    if (line) onEvent(JSON.parse(line));
+                }
+            }
+            buffer += decoder.decode();
+            if (buffer.trim()) onEvent(JSON.parse(buffer));
+        }
+
+        // Enter presses are debounced; a newer search aborts the one in flight so
+        // stale results never overwrite fresh ones.
+        const AI_SEARCH_DEBOUNCE_MS = 250;
+        let _searchDebounce = null;
+        let _searchAbort = null;
+
         function handleAISearchKeypress(event) {
             if (event.key === 'Enter') {
-                performAISearch();
+                clearTimeout(_searchDebounce);
+                _searchDebounce = setTimeout(performAISearch, AI_SEARCH_DEBOUNCE_MS);
             }
         }
 
         async function performAISearch() {
+            clearTimeout(_searchDebounce);
             const input = document.getElementById('aiSearchInput');
             const query = input.value.trim();
 
@@ -4374,6 +3479,23 @@ HTML_TEMPLATE = """
             const progress = document.getElementById('searchProgress');
             const results = document.getElementById('aiSearchResults');
 
+            // Supersede any search still in flight
+            if (_searchAbort) _searchAbort.abort();
+
+            const cacheKey = normalizeSearchQuery(query);
+
+            const cached = lruGet(_aiSearchCache, cacheKey);
+            if (cached) {
+                _searchAbort = null;
+                searchBtn.disabled = false;
+                progress.classList.remove('visible');
+                renderSearchResults(cached);
+                return;
+            }
+
+            const controller = new AbortController();
+            _searchAbort = controller;
+
             searchBtn.disabled = true;
             progress.classList.add('visible');
             results.innerHTML = '';
@@ -4382,34 +3504,77 @@ HTML_TEMPLATE = """
                 const response = await fetch('/api/ai/search', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ query: query, limit: 12 })
+                    body: JSON.stringify({ query: query, limit: AI_SEARCH_LIMIT, stream: true }),
+                    signal: controller.signal
                 });
 
-                const data = await response.json();
+                // Validation failures come back as a plain JSON error
+                if (!(response.headers.get('Content-Type') || '').includes('ndjson')) {
+                    const data = await response.json();
+                    if (controller.signal.aborted) return;
+                    results.innerHTML = `<div class="no-results"><p>❌ ${data.error || 'Search failed'}</p></div>`;
+                    return;
+                }
 
-                if (data.error) {
-                    results.innerHTML = `<div class="no-results"><p>❌ ${data.error}</p></div>`;
-                } else if (data.results && data.results.length > 0) {
-                    renderSearchResults(data.results);
+                // Matches arrive unsorted while the server scans the catalog; keep
+                // the best AI_SEARCH_LIMIT and repaint at most once per frame
+                let top = [];
+                let errorMessage = null;
+                let finished = false;
+                let paintQueued = false;
+                const paint = () => {
+                    paintQueued = false;
+                    if (!finished && !controller.signal.aborted) renderSearchResults(top, true);
+                };
+
+                await readNdjson(response, event => {
+                    if (event.result) {
+                        top.push(event.result);
+                        top.sort((a, b) => b.similarity - a.similarity);
+                        if (top.length > AI_SEARCH_LIMIT) top.length = AI_SEARCH_LIMIT;
+                        if (!paintQueued) {
+                            paintQueued = true;
+                            requestAnimationFrame(paint);
+                        }
+                    } else if (event.error) {
+                        errorMessage = event.error;
+                    }
+                });
+                finished = true;
+                if (controller.signal.aborted) return;
+
+                if (errorMessage) {
+                    results.innerHTML = `<div class="no-results"><p>❌ ${errorMessage}</p></div>`;
+                } else if (top.length > 0) {
+                    lruSet(_aiSearchCache, cacheKey, top);
+                    renderSearchResults(top);
                 } else {
                     results.innerHTML = `<div class="no-results"><p>No matching products found. Try a different description.</p></div>`;
                 }
             } catch (error) {
+                if (controller.signal.aborted) return;
                 results.innerHTML = `<div class="no-results"><p>❌ Error: ${error.message}</p></div>`;
             } finally {
-                searchBtn.disabled = false;
-                progress.classList.remove('visible');
+                // A superseding search owns the button and spinner now
+                if (_searchAbort === controller) {
+                    _searchAbort = null;
+                    searchBtn.disabled = false;
+                    progress.classList.remove('visible');
+                }
             }
         }
 
-        function renderSearchResults(results) {
+        // Result images past roughly the first grid row load at low priority
+        const AI_RESULTS_EAGER_IMAGES = 4;
+
+        function renderSearchResults(results, searching = false) {
             const container = document.getElementById('aiSearchResults');
             const supabaseUrl = '{{ supabase_url }}';
 
             const html = `
-                <p style="color: #666; margin-bottom: 15px;">Found ${results.length} matching products:</p>
+                <p style="color: #666; margin-bottom: 15px;">${searching ? `Searching... best ${results.length} matches so far:` : `Found ${results.length} matching products:`}</p>
                 <div class="ai-results">
-                    ${results.map(product => {
+                    ${results.map((product, index) => {
                         let imageUrl = 'data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" width="250" height="200" fill="%23ccc"><rect width="100%" height="100%"/><text x="50%" y="50%" text-anchor="middle" fill="%23999">No Image</text></svg>';
 
                         if (product.image_urls && product.image_urls[0]) {
@@ -4421,8 +3586,8 @@ HTML_TEMPLATE = """
                         const similarity = product.similarity ? Math.round(product.similarity * 100) : '';
 
                         return `
-                            <div class="ai-result-card" onclick="goToProduct('${product.product_id}')">
-                                <img src="${imageUrl}" alt="${product.name}" onerror="this.src='data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 width=%22250%22 height=%22200%22 fill=%22%23ccc%22><rect width=%22100%25%22 height=%22100%25%22/><text x=%2250%25%22 y=%2250%25%22 text-anchor=%22middle%22 fill=%22%23999%22>No Image</text></svg>'">
+                            <div class="ai-result-card" data-product-id="${escapeAttr(product.product_id)}">
+                                <img src="${imageUrl}" alt="${product.name}" loading="lazy" decoding="async" width="250" height="200"${index >= AI_RESULTS_EAGER_IMAGES ? ' fetchpriority="low"' : ''} onerror="this.src='data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 width=%22250%22 height=%22200%22 fill=%22%23ccc%22><rect width=%22100%25%22 height=%22100%25%22/><text x=%2250%25%22 y=%2250%25%22 text-anchor=%22middle%22 fill=%22%23999%22>No Image</text></svg>'">
                                 <div class="card-content">
                                     <div class="card-title">${product.name || 'Unknown'}</div>
                                     <div class="card-price">${product.price || ''}</div>
@@ -4437,6 +3602,11 @@ HTML_TEMPLATE = """
             container.innerHTML = html;
         }
 
+        document.getElementById('aiSearchResults').addEventListener('click', (e) => {
+            const card = e.target.closest('.ai-result-card');
+            if (card) goToProduct(card.dataset.productId);
+        });
+
         function goToProduct(productId) {
             const index = products.findIndex(p => p.product_id === productId);
             if (index !== -1) {
@@ -4500,26 +3670,24 @@ HTML_TEMPLATE = """
 
             const messagesContainer = document.getElementById('chatMessages');
 
-            // Add user message to UI
-            messagesContainer.innerHTML += `
+            // Add to history
+            chatHistory.push({ role: 'user', content: message });
+
+            // Add user message and loading indicator to UI in one write;
+            // insertAdjacentHTML leaves the existing messages untouched
+            messagesContainer.insertAdjacentHTML('beforeend', `
                 <div class="ai-chat-message user">
                     <div class="role">You</div>
                     <div>${escapeHtml(message)}</div>
                 </div>
-            `;
-
-            // Add to history
-            chatHistory.push({ role: 'user', content: message });
-
-            // Add loading indicator
-            messagesContainer.innerHTML += `
                 <div class="ai-chat-message assistant" id="chatLoading">
                     <div class="role">Assistant</div>
                     <div><em>Thinking...</em></div>
                 </div>
-            `;
+            `);
 
-            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            trimChatMessages(messagesContainer);
+            scrollToBottom(messagesContainer);
 
             try {
                 const response = await fetch('/api/ai/chat', {
@@ -4534,34 +3702,59 @@ HTML_TEMPLATE = """
                 document.getElementById('chatLoading')?.remove();
 
                 if (data.error) {
-                    messagesContainer.innerHTML += `
+                    messagesContainer.insertAdjacentHTML('beforeend', `
                         <div class="ai-chat-message assistant">
                             <div class="role">Assistant</div>
                             <div style="color: #c62828;">Error: ${data.error}</div>
                         </div>
-                    `;
+                    `);
                 } else {
                     const assistantMessage = data.response || 'No response';
                     chatHistory.push({ role: 'assistant', content: assistantMessage });
 
-                    messagesContainer.innerHTML += `
+                    messagesContainer.insertAdjacentHTML('beforeend', `
                         <div class="ai-chat-message assistant">
                             <div class="role">Assistant</div>
                             <div>${formatChatResponse(assistantMessage)}</div>
                         </div>
-                    `;
+                    `);
                 }
             } catch (error) {
                 document.getElementById('chatLoading')?.remove();
-                messagesContainer.innerHTML += `
+                messagesContainer.insertAdjacentHTML('beforeend', `
                     <div class="ai-chat-message assistant">
                         <div class="role">Assistant</div>
                         <div style="color: #c62828;">Error: ${error.message}</div>
                     </div>
-                `;
+                `);
             }
 
-            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            trimChatMessages(messagesContainer);
+            scrollToBottom(messagesContainer);
+        }
+
+        // Reading scrollHeight right after an innerHTML write forces a synchronous
+        // layout; defer the read/write pair to the next frame, once per element
+        // however many appends happen before it.
+        const _pendingScrollToBottom = new Set();
+
+        function scrollToBottom(el) {
+            if (_pendingScrollToBottom.has(el)) return;
+            _pendingScrollToBottom.add(el);
+            requestAnimationFrame(() => {
+                _pendingScrollToBottom.delete(el);
+                el.scrollTop = el.scrollHeight;
+            });
+        }
+
+        // Escape a value for use inside a double-quoted HTML attribute
+        function escapeAttr(value) {
+            return String(value)
+                .replace(/&/g, '&amp;')
+                .replace(/"/g, '&quot;')
+                .replace(/'/g, '&#39;')
+                .replace(/</g, '&lt;')
+                .replace(/>/g, '&gt;');
         }
 
         function escapeHtml(text) {
@@ -4923,7 +4116,7 @@ HTML_TEMPLATE = """
                         return `<div class="${lineClass}">${line}</div>`;
                     }).join('');
                     // Auto-scroll to bottom
-                    logViewer.scrollTop = logViewer.scrollHeight;
+                    scrollToBottom(logViewer);
                 }
 
                 if (status.running) {
@@ -5861,16 +5054,61 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Compile once at import; render_template_string would re-parse on every request
+INDEX_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+
+# Viewer stylesheet and classifier script live in static/ and are served under
+# content-hashed names
+STATIC_DIR = Path(__file__).parent / "static"
+
+
+def _static_digest(filename):
+    """Return a short content hash for a file in STATIC_DIR."""
+    return hashlib.sha256((STATIC_DIR / filename).read_bytes()).hexdigest()[:12]
+
+
+def _send_immutable(filename):
+    """Send a hashed static file with a far-future immutable cache policy."""
+    response = send_from_directory(STATIC_DIR, filename, max_age=31536000)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+VIEWER_CSS_DIGEST = _static_digest("viewer.css")
+CLASSIFIER_JS_DIGEST = _static_digest("classifier.js")
+
 
 @app.route("/")
 def index():
     """Serve the main viewer page."""
+    prefetch_products()
     supabase_url = os.getenv("SUPABASE_URL", "")
-    return render_template_string(
-        HTML_TEMPLATE, use_supabase=USE_SUPABASE, supabase_url=supabase_url
+    return render_template(
+        INDEX_TEMPLATE,
+        use_supabase=USE_SUPABASE,
+        supabase_url=supabase_url,
+        storage_prefix=get_storage_public_prefix(),
+        viewer_css_digest=VIEWER_CSS_DIGEST,
+        classifier_js_digest=CLASSIFIER_JS_DIGEST,
     )
 
 
+@app.route("/static/viewer.<digest>.css")
+def viewer_css(digest):
+    """Serve the viewer stylesheet; the hashed URL lets browsers cache it forever."""
+    if digest != VIEWER_CSS_DIGEST:
+        return Response(status=404)
+    return _send_immutable("viewer.css")
+
+
+@app.route("/static/classifier.<digest>.js")
+def classifier_js(digest):
+    """Serve the product classifier, used by the page and its worker."""
+    if digest != CLASSIFIER_JS_DIGEST:
+        return Response(status=404)
+    return _send_immutable("classifier.js")
+
+
 CURATION_STATS_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
@@ -6215,18 +5453,63 @@ CURATION_STATS_TEMPLATE = """
 </html>
 """
 
+STATS_TEMPLATE = app.jinja_env.from_string(CURATION_STATS_TEMPLATE)
+
 
 @app.route("/curation/stats")
 def curation_stats_page():
     """Serve curation statistics and training data dashboard."""
-    return render_template_string(CURATION_STATS_TEMPLATE)
+    return render_template(STATS_TEMPLATE)
+
+
+# Serialized product list and ETag per format ("json" or "ndjson"), rebuilt
+# when the list changes
+_products_payloads = {}
+
+
+def _get_products_payload(products, fmt="json"):
+    """Return (body, etag) for products, serializing only when the list changes.
+
+    ``fmt="ndjson"`` puts one product per line so the viewer can start
+    rendering before the whole list has downloaded.
+    """
+    cached_products, body, etag = _products_payloads.get(fmt, (None, b"", ""))
+    if cached_products is not products:
+        if fmt == "ndjson":
+            body = b"".join(
+                app.json.dumps(product).encode("utf-8") + b"\n" for product in products
+            )
+        else:
+            body = app.json.dumps(products).encode("utf-8")
+        etag = hashlib.sha256(body).hexdigest()[:16]
+        _products_payloads[fmt] = (products, body, etag)
+    return body, etag
 
 
 @app.route("/api/products")
 def api_products():
-    """API endpoint to get all products."""
-    products = get_all_products()
-    return jsonify(products)
+    """API endpoint to get all products.
+
+    ``?format=ndjson`` returns one product per line instead of a JSON array.
+    The serialized list is reused across requests and tagged with an ETag,
+    so a browser revalidating an unchanged list gets an empty 304.
+    """
+    try:
+        products = get_all_products()
+    except Exception as e:
+        # Not cached, so the next request retries the fetch
+        return jsonify({"error": f"Could not load products: {e}"}), 503
+
+    if request.args.get("format") == "ndjson":
+        body, etag = _get_products_payload(products, "ndjson")
+        response = Response(body, mimetype="application/x-ndjson")
+    else:
+        body, etag = _get_products_payload(products)
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    # Always revalidate: edits made in the viewer must show up on the next load
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
 
 def _get_image_extension(url: str, content_type: str = "image/jpeg") -> str:
@@ -6256,7 +5539,8 @@ def set_stored_images(product_id):
     Body: {"stored_indices": [i, j]} — 0-based indices into image_urls_all.
     Downloads those 2 images, uploads to storage (replacing existing), updates product row.
     """
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json() or {}
@@ -6331,6 +5615,7 @@ def set_stored_images(product_id):
         supabase_client.table("products").update(update).eq(
             "product_id", product_id
         ).execute()
+        invalidate_products_cache()
 
         return jsonify(
             {
@@ -6351,7 +5636,8 @@ def set_stored_images(product_id):
 @app.route("/api/products/<product_id>", methods=["DELETE"])
 def delete_product(product_id):
     """Delete a product from the database and storage."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return (
             jsonify(
                 {"error": "Supabase not configured. Deletion only works with Supabase."}
@@ -6419,6 +5705,7 @@ def delete_product(product_id):
         supabase_client.table("products").delete().eq(
             "product_id", product_id
         ).execute()
+        invalidate_products_cache()
 
         # Also remove from local tracking database
         try:
@@ -6453,7 +5740,8 @@ def reset_product_metadata(product_id):
 
     The original scraped product data (including inferred style_tags) remains unchanged.
     """
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     try:
@@ -6537,7 +5825,8 @@ def update_product_category():
     This allows curators to move products between subcategories.
     For example, moving a sweater to cardigans, or a t-shirt to polos.
     """
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     try:
@@ -6555,6 +5844,7 @@ def update_product_category():
             .eq("product_id", product_id)
             .execute()
         )
+        invalidate_products_cache()
 
         if result.data:
             return jsonify(
@@ -6582,7 +5872,8 @@ def get_canonical_tags(product_id):
     """Get the current canonical tags for a product.
     Returns tags_final (for editing), tags_ai_raw (original prediction for curation history).
     """
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     try:
@@ -6623,7 +5914,7 @@ def save_curation_history():
     """Save curation history and update product (curated_at, curated_by, training_eligible).
     Called when a curator completes editing and saves.
     """
-    if not USE_SUPABASE or not supabase_client:
+    if _get_supabase() is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json() or {}
@@ -6668,7 +5959,8 @@ def update_canonical_tags(product_id):
     """Update canonical tags for a product (full replacement of tags_final).
     When original_tags is provided, saves curation history before updating.
     """
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -6711,11 +6003,38 @@ def update_canonical_tags(product_id):
             .eq("product_id", product_id)
             .execute()
         )
+        invalidate_products_cache()
         return jsonify({"success": True, "data": result.data})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# Canonical tag fields editable through the PATCH endpoint below
+CANONICAL_ARRAY_FIELDS = frozenset(
+    ("style_identity", "context", "construction_details", "pairing_tags")
+)
+CANONICAL_SINGLE_FIELDS = frozenset(
+    (
+        "silhouette",
+        "pattern",
+        "formality",
+        "fit",
+        "length",
+        "shoe_type",
+        "profile",
+        "closure",
+        "top_layer_role",
+    )
+)
+
+
+def _deleted_tag_value(entry):
+    """Tag value of a deleted_tags entry (plain string or {"value": ...} dict)."""
+    if isinstance(entry, dict):
+        return entry.get("value")
+    return entry if isinstance(entry, str) else None
+
+
 @app.route("/api/canonical_tags/<product_id>/field", methods=["PATCH"])
 def patch_canonical_tag_field(product_id):
     """Add or remove a value from a specific canonical tag field.
@@ -6728,7 +6047,8 @@ def patch_canonical_tag_field(product_id):
     - feedback_reason: Free-text explanation of why the tag was incorrect
     - feedback_category: Category of the correction (incorrect_value, not_applicable, etc.)
     """
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -6755,20 +6075,6 @@ def patch_canonical_tag_field(product_id):
             400,
         )
 
-    # Array fields vs single-value fields
-    array_fields = ["style_identity", "context", "construction_details", "pairing_tags"]
-    single_fields = [
-        "silhouette",
-        "pattern",
-        "formality",
-        "fit",
-        "length",
-        "shoe_type",
-        "profile",
-        "closure",
-        "top_layer_role",
-    ]
-
     try:
         # First, get current tags_final
         result = (
@@ -6794,7 +6100,7 @@ def patch_canonical_tag_field(product_id):
                 tags_final[key] = {}
 
         # Apply the modification
-        if field_name in array_fields:
+        if field_name in CANONICAL_ARRAY_FIELDS:
             current_list = tags_final.get(field_name, []) or []
             if action == "add":
                 if value not in current_list:
@@ -6814,8 +6120,7 @@ def patch_canonical_tag_field(product_id):
                     tags_final["deleted_tags"][field_name] = [
                         v
                         for v in deleted_list
-                        if (isinstance(v, dict) and v.get("value") != value)
-                        or (isinstance(v, str) and v != value)
+                        if isinstance(v, (dict, str)) and _deleted_tag_value(v) != value
                     ]
             elif action == "remove":
                 removed_value = value
@@ -6830,19 +6135,16 @@ def patch_canonical_tag_field(product_id):
                     "category": feedback_category,
                     "curator": curator,
                 }
-                # Check if already exists (by value)
-                existing = [
-                    v
+                # Check if already exists (by value); stops at the first match
+                if not any(
+                    _deleted_tag_value(v) == value
                     for v in tags_final["deleted_tags"][field_name]
-                    if (isinstance(v, dict) and v.get("value") == value)
-                    or (isinstance(v, str) and v == value)
-                ]
-                if not existing:
+                ):
                     tags_final["deleted_tags"][field_name].append(deletion_entry)
             elif action == "set":
                 current_list = value if isinstance(value, list) else [value]
             tags_final[field_name] = current_list
-        elif field_name in single_fields:
+        elif field_name in CANONICAL_SINGLE_FIELDS:
             if action == "remove" or value == "" or value is None:
                 removed_value = tags_final.get(field_name)
                 if removed_value:
@@ -6883,6 +6185,7 @@ def patch_canonical_tag_field(product_id):
             .eq("product_id", product_id)
             .execute()
         )
+        invalidate_products_cache()
 
         # Store feedback for AI learning if provided during tag removal
         if removed_value and (feedback_reason or feedback_category):
@@ -6913,7 +6216,8 @@ def patch_canonical_tag_field(product_id):
 @app.route("/api/curated", methods=["POST"])
 def save_curated_metadata():
     """Save a curated metadata entry to the database."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     from flask import request
@@ -6951,7 +6255,8 @@ def save_curated_metadata():
 @app.route("/api/curated/<product_id>")
 def get_curated_metadata(product_id):
     """Get all curated metadata for a product."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify([])
 
     try:
@@ -6969,7 +6274,8 @@ def get_curated_metadata(product_id):
 @app.route("/api/curated", methods=["DELETE"])
 def delete_curated_metadata():
     """Delete a curated metadata entry from the database."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -6999,7 +6305,8 @@ def delete_curated_metadata():
 @app.route("/api/rejected_tags", methods=["POST"])
 def reject_inferred_tag():
     """Mark an inferred tag as rejected (incorrect). Saved for ML training."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -7039,7 +6346,8 @@ def reject_inferred_tag():
 @app.route("/api/rejected_tags/<product_id>")
 def get_rejected_tags(product_id):
     """Get all rejected inferred tags for a product."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify([])
 
     try:
@@ -7057,7 +6365,8 @@ def get_rejected_tags(product_id):
 @app.route("/api/rejected_tags", methods=["DELETE"])
 def unreject_inferred_tag():
     """Remove a tag from the rejected list (undo rejection)."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -7090,7 +6399,8 @@ def unreject_inferred_tag():
 @app.route("/api/ai_tags/<product_id>")
 def get_ai_generated_tags(product_id):
     """Get all AI-generated tags for a product."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify([])
 
     try:
@@ -7110,7 +6420,8 @@ def get_ai_generated_tags(product_id):
 @app.route("/api/ai_tags", methods=["POST"])
 def save_ai_generated_tag():
     """Save an AI-generated tag to the database."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -7149,7 +6460,8 @@ def save_ai_generated_tag():
 @app.route("/api/ai_tags", methods=["DELETE"])
 def delete_ai_generated_tag():
     """Delete an AI-generated tag from the database."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -7177,7 +6489,8 @@ def delete_ai_generated_tag():
 @app.route("/api/ai_tags/batch", methods=["POST"])
 def save_ai_generated_tags_batch():
     """Save multiple AI-generated tags for a product at once."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -7218,7 +6531,8 @@ def save_ai_generated_tags_batch():
 @app.route("/api/curation_status/<product_id>")
 def get_curation_status(product_id):
     """Get curation status for a product."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify(None)
 
     try:
@@ -7244,7 +6558,8 @@ def mark_product_curated():
     2. Updates products.curated_at and products.curated_by
     3. Creates a curation_history record for training data export
     """
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -7358,7 +6673,8 @@ def unmark_product_curated():
     2. Clears products.curated_at and products.curated_by
     3. Removes the most recent curation_history record for this product
     """
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json()
@@ -7413,7 +6729,8 @@ def unmark_product_curated():
 @app.route("/api/dashboard/stats")
 def get_dashboard_stats():
     """Get comprehensive dashboard statistics."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     try:
@@ -7559,7 +6876,8 @@ def _parse_change_summary_for_removed(summary: str) -> list[str]:
 @app.route("/api/curation_stats")
 def get_curation_stats():
     """Return stats for curation progress, training quality, common issues, and export."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     try:
@@ -7713,7 +7031,7 @@ def get_curation_stats():
 @app.route("/api/export_training_data")
 def export_training_data():
     """Generate JSONL training file and return as download. Updates last export metadata."""
-    if not USE_SUPABASE or not supabase_client:
+    if _get_supabase() is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     try:
@@ -7782,12 +7100,112 @@ def ai_status():
         return jsonify({"available": False, "error": str(e)})
 
 
+async def _ai_search_events(supabase_client, query):
+    """Scan products for semantic matches to ``query``.
+
+    Yields ``("result", match)`` for each product above the similarity
+    threshold, in scan order (unsorted). A ``("error", msg)`` or
+    ``("message", msg)`` event ends the search early.
+    """
+    from src.ai import EmbeddingsService
+
+    async with EmbeddingsService(
+        supabase_client=supabase_client,
+        use_openai=True,
+    ) as embeddings_service:
+        # Generate query embedding
+        query_embedding = await embeddings_service.embed_text(query)
+
+        if not query_embedding:
+            yield "error", "Failed to generate query embedding"
+            return
+
+        # Get all products and calculate similarity in memory
+        # (until pgvector is set up in Supabase)
+        products_result = supabase_client.table("products").select("*").execute()
+        products = products_result.data or []
+
+        if not products:
+            yield "message", "No products in database"
+            return
+
+        # Generate embeddings for products without them and calculate similarity
+        storage_prefix = get_storage_public_prefix()
+        for product in products:
+            # Build text for embedding
+            text_parts = [product.get("name", "")]
+            if product.get("description"):
+                text_parts.append(product["description"][:300])
+            if product.get("category"):
+                text_parts.append(product["category"])
+            if product.get("colors"):
+                colors = product["colors"]
+                if isinstance(colors, list):
+                    text_parts.append(" ".join(colors))
+
+            product_text = " ".join(text_parts)
+            product_embedding = await embeddings_service.embed_text(product_text)
+
+            if product_embedding:
+                similarity = embeddings_service._cosine_similarity(
+                    query_embedding, product_embedding
+                )
+
+                if similarity > 0.3:  # Minimum threshold
+                    # Build image URLs
+                    image_paths = product.get("image_paths") or []
+                    image_urls = [storage_prefix + path for path in image_paths]
+
+                    yield "result", {
+                        "product_id": product.get("product_id"),
+                        "name": product.get("name"),
+                        "price": f"${product.get('price_current', 'N/A')}",
+                        "category": product.get("category"),
+                        "image_urls": image_urls,
+                        "primary_image": image_urls[0] if image_urls else None,
+                        "similarity": similarity,
+                    }
+
+
+def _stream_ai_search(supabase_client, query):
+    """Run an AI search on a private event loop, emitting NDJSON lines.
+
+    Each line is ``{"result": match}``, ``{"error": msg}`` or
+    ``{"message": msg}``; a final ``{"done": true}`` marks completion.
+    """
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    events = _ai_search_events(supabase_client, query)
+    try:
+        while True:
+            try:
+                kind, payload = loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+            yield json.dumps({kind: payload}) + "\n"
+        yield json.dumps({"done": True}) + "\n"
+    except ImportError as e:
+        yield json.dumps({"error": f"AI modules not available: {e}"}) + "\n"
+    except Exception as e:
+        yield json.dumps({"error": str(e)}) + "\n"
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.close()
+
+
 @app.route("/api/ai/search", methods=["POST"])
 def ai_search():
-    """Semantic search for products using AI embeddings."""
+    """Semantic search for products using AI embeddings.
+
+    With ``"stream": true`` in the body, matches are streamed as NDJSON while
+    the catalog is scanned (see ``_stream_ai_search``); otherwise the top
+    ``limit`` results are returned as one JSON object.
+    """
     import asyncio
 
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"error": "Supabase not configured"}), 400
 
     data = request.get_json() or {}
@@ -7797,86 +7215,27 @@ def ai_search():
     if not query:
         return jsonify({"error": "Query is required"}), 400
 
+    if data.get("stream"):
+        return Response(
+            _stream_ai_search(supabase_client, query),
+            mimetype="application/x-ndjson",
+            headers={"Cache-Control": "no-cache"},
+        )
+
     try:
-        from src.ai import EmbeddingsService
 
         async def search():
-            async with EmbeddingsService(
-                supabase_client=supabase_client,
-                use_openai=True,
-            ) as embeddings_service:
-                # Generate query embedding
-                query_embedding = await embeddings_service.embed_text(query)
-
-                if not query_embedding:
-                    return {"error": "Failed to generate query embedding"}
-
-                # Get all products and calculate similarity in memory
-                # (until pgvector is set up in Supabase)
-                products_result = (
-                    supabase_client.table("products").select("*").execute()
-                )
-                products = products_result.data or []
-
-                if not products:
-                    return {"results": [], "message": "No products in database"}
-
-                # Generate embeddings for products without them and calculate similarity
-                results = []
-                for product in products:
-                    # Build text for embedding
-                    text_parts = [product.get("name", "")]
-                    if product.get("description"):
-                        text_parts.append(product["description"][:300])
-                    if product.get("category"):
-                        text_parts.append(product["category"])
-                    if product.get("colors"):
-                        colors = product["colors"]
-                        if isinstance(colors, list):
-                            text_parts.append(" ".join(colors))
-
-                    product_text = " ".join(text_parts)
-                    product_embedding = await embeddings_service.embed_text(
-                        product_text
-                    )
-
-                    if product_embedding:
-                        similarity = embeddings_service._cosine_similarity(
-                            query_embedding, product_embedding
-                        )
-
-                        if similarity > 0.3:  # Minimum threshold
-                            # Build image URLs
-                            image_paths = product.get("image_paths", [])
-                            supabase_url = (
-                                os.getenv("SUPABASE_URL") or DEFAULT_SUPABASE_URL
-                            )
-                            image_urls = (
-                                [
-                                    f"{supabase_url}/storage/v1/object/public/{BUCKET_NAME}/{path}"
-                                    for path in image_paths
-                                ]
-                                if image_paths
-                                else []
-                            )
-
-                            results.append(
-                                {
-                                    "product_id": product.get("product_id"),
-                                    "name": product.get("name"),
-                                    "price": f"${product.get('price_current', 'N/A')}",
-                                    "category": product.get("category"),
-                                    "image_urls": image_urls,
-                                    "primary_image": (
-                                        image_urls[0] if image_urls else None
-                                    ),
-                                    "similarity": similarity,
-                                }
-                            )
-
-                # Sort by similarity and limit
-                results.sort(key=lambda x: x["similarity"], reverse=True)
-                return {"results": results[:limit]}
+            results = []
+            async for kind, payload in _ai_search_events(supabase_client, query):
+                if kind == "error":
+                    return {"error": payload}
+                if kind == "message":
+                    return {"results": [], "message": payload}
+                results.append(payload)
+
+            # Sort by similarity and limit
+            results.sort(key=lambda x: x["similarity"], reverse=True)
+            return {"results": results[:limit]}
 
         result = asyncio.run(search())
         return jsonify(result)
@@ -7903,7 +7262,7 @@ def ai_chat():
 
         async def chat():
             async with ChatAssistant(
-                supabase_client=supabase_client if USE_SUPABASE else None,
+                supabase_client=_get_supabase(),
                 use_openai=True,
             ) as assistant:
                 response = await assistant.chat(
@@ -7929,7 +7288,8 @@ def ai_chat():
 @app.route("/api/vocabulary", methods=["GET"])
 def get_vocabulary():
     """Get all custom vocabulary from the database."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"success": False, "error": "Supabase not configured"}), 400
 
     try:
@@ -7957,7 +7317,8 @@ def get_vocabulary():
 @app.route("/api/vocabulary/tag", methods=["POST"])
 def add_vocabulary_tag():
     """Add a new tag to an existing or new category."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"success": False, "error": "Supabase not configured"}), 400
 
     data = request.get_json() or {}
@@ -7987,7 +7348,8 @@ def add_vocabulary_tag():
 @app.route("/api/vocabulary/tag", methods=["DELETE"])
 def delete_vocabulary_tag():
     """Delete a tag from a category."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"success": False, "error": "Supabase not configured"}), 400
 
     data = request.get_json() or {}
@@ -8016,7 +7378,8 @@ def delete_vocabulary_tag():
 @app.route("/api/vocabulary/category", methods=["POST"])
 def create_vocabulary_category():
     """Create a new category with initial tags."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"success": False, "error": "Supabase not configured"}), 400
 
     data = request.get_json() or {}
@@ -8056,7 +7419,8 @@ def create_vocabulary_category():
 @app.route("/api/vocabulary/category/<category>", methods=["DELETE"])
 def delete_vocabulary_category(category):
     """Delete an entire custom category."""
-    if not USE_SUPABASE or not supabase_client:
+    supabase_client = _get_supabase()
+    if supabase_client is None:
         return jsonify({"success": False, "error": "Supabase not configured"}), 400
 
     try:
@@ -8085,17 +7449,17 @@ def serve_image(category, product_id, filename):
 def run_scraper_process(categories, products_per_category):
     """Run the scraper in a background thread."""
     global scraper_status
-    import time
-
-    scraper_status["running"] = True
-    scraper_status["completed"] = False
-    scraper_status["error"] = None
-    scraper_status["progress"] = 0
-    scraper_status["products_scraped"] = 0
-    scraper_status["products_skipped"] = 0
-    scraper_status["start_time"] = time.time()
-    scraper_status["total"] = len(categories) * products_per_category
-    scraper_status["logs"] = []  # Clear previous logs
+
+    with _status_lock:
+        scraper_status.running = True
+        scraper_status.completed = False
+        scraper_status.error = None
+        scraper_status.progress = 0
+        scraper_status.products_scraped = 0
+        scraper_status.products_skipped = 0
+        scraper_status.start_time = time.time()
+        scraper_status.total = len(categories) * products_per_category
+        scraper_status.logs.clear()  # Clear previous logs
 
     try:
         # Build the command
@@ -8112,8 +7476,9 @@ def run_scraper_process(categories, products_per_category):
             cmd.append("--no-supabase")
 
         # Run the scraper process
-        scraper_status["current_category"] = "Starting..."
-        scraper_status["logs"].append(f"$ {' '.join(cmd)}")
+        with _status_lock:
+            scraper_status.current_category = "Starting..."
+            scraper_status.logs.append(f"$ {' '.join(cmd)}")
 
         process = subprocess.Popen(
             cmd,
@@ -8129,58 +7494,61 @@ def run_scraper_process(categories, products_per_category):
             if not line:
                 continue
 
-            # Add to logs (keep last 100 lines)
-            scraper_status["logs"].append(line)
-            if len(scraper_status["logs"]) > 100:
-                scraper_status["logs"] = scraper_status["logs"][-100:]
-
-            # Parse progress from output
-            if "Processing category:" in line:
-                cat = line.split("Processing category:")[-1].strip()
-                scraper_status["current_category"] = cat
-            elif "Extracting product:" in line or "Scraping:" in line:
-                scraper_status["current_product"] = line.split(":")[-1].strip()[:50]
-            elif "Skipping already scraped" in line:
-                scraper_status["products_skipped"] += 1
-                scraper_status["progress"] = (
-                    scraper_status["products_scraped"]
-                    + scraper_status["products_skipped"]
-                )
-            elif "Saved to Supabase" in line or "Saved product" in line:
-                scraper_status["products_scraped"] += 1
-                scraper_status["progress"] = (
-                    scraper_status["products_scraped"]
-                    + scraper_status["products_skipped"]
-                )
-            elif "Extracted" in line and "new products" in line:
-                # Extract count from "Extracted X new products"
-                try:
-                    count = int(line.split("Extracted")[1].split("new")[0].strip())
-                    scraper_status["products_scraped"] = count
-                except (ValueError, IndexError):
-                    pass
+            with _status_lock:
+                # Add to logs (the deque drops lines beyond SCRAPER_LOG_LINES)
+                scraper_status.logs.append(line)
+
+                # Parse progress from output
+                if "Processing category:" in line:
+                    cat = line.split("Processing category:")[-1].strip()
+                    scraper_status.current_category = cat
+                elif "Extracting product:" in line or "Scraping:" in line:
+                    scraper_status.current_product = line.split(":")[-1].strip()[:50]
+                elif "Skipping already scraped" in line:
+                    scraper_status.products_skipped += 1
+                    scraper_status.progress = (
+                        scraper_status.products_scraped
+                        + scraper_status.products_skipped
+                    )
+                elif "Saved to Supabase" in line or "Saved product" in line:
+                    scraper_status.products_scraped += 1
+                    scraper_status.progress = (
+                        scraper_status.products_scraped
+                        + scraper_status.products_skipped
+                    )
+                elif "Extracted" in line and "new products" in line:
+                    # Extract count from "Extracted X new products"
+                    try:
+                        count = int(line.split("Extracted")[1].split("new")[0].strip())
+                        scraper_status.products_scraped = count
+                    except (ValueError, IndexError):
+                        pass
 
         process.wait()
 
-        if process.returncode == 0:
-            scraper_status["completed"] = True
-            scraper_status["current_category"] = "Complete!"
-            scraper_status["current_product"] = ""
-            scraper_status["logs"].append("✅ Scraping completed successfully!")
-        else:
-            scraper_status["error"] = (
-                f"Process exited with code {process.returncode}. Check logs for details."
-            )
-            scraper_status["logs"].append(
-                f"❌ Process exited with code {process.returncode}"
-            )
+        with _status_lock:
+            if process.returncode == 0:
+                scraper_status.completed = True
+                scraper_status.current_category = "Complete!"
+                scraper_status.current_product = ""
+                scraper_status.logs.append("✅ Scraping completed successfully!")
+            else:
+                scraper_status.error = (
+                    f"Process exited with code {process.returncode}. Check logs for details."
+                )
+                scraper_status.logs.append(
+                    f"❌ Process exited with code {process.returncode}"
+                )
 
     except Exception as e:
-        scraper_status["error"] = str(e)
-        scraper_status["logs"].append(f"❌ Error: {str(e)}")
+        with _status_lock:
+            scraper_status.error = str(e)
+            scraper_status.logs.append(f"❌ Error: {str(e)}")
     finally:
-        scraper_status["running"] = False
-        scraper_status["end_time"] = time.time()
+        with _status_lock:
+            scraper_status.running = False
+            scraper_status.end_time = time.time()
+        invalidate_products_cache()
 
 
 @app.route("/api/scraper/start", methods=["POST"])
@@ -8188,15 +7556,13 @@ def start_scraper():
     """Start the web scraper process."""
     global scraper_status
 
-    if scraper_status["running"]:
-        return jsonify({"error": "Scraper is already running"}), 400
-
-    # Reset status for new scrape
-    scraper_status["refresh_handled"] = False
-    scraper_status["completed"] = False
-    scraper_status["error"] = None
-
-    data = request.get_json() or {}
+    # Parse and validate before claiming, so a bad request never leaves
+    # scraper_status.running stuck at True
+    data = request.get_json()
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
     categories = data.get(
         "categories",
         [
@@ -8217,6 +7583,30 @@ def start_scraper():
         ],
     )
     products_per_category = data.get("products_per_category", 2)
+    if not isinstance(categories, list) or not all(
+        isinstance(c, str) for c in categories
+    ):
+        return jsonify({"error": "'categories' must be a list of strings"}), 400
+    if (
+        not isinstance(products_per_category, int)
+        or isinstance(products_per_category, bool)
+        or products_per_category < 1
+    ):
+        return (
+            jsonify({"error": "'products_per_category' must be a positive integer"}),
+            400,
+        )
+
+    # Check and claim under the lock so two requests cannot both start a scrape
+    with _status_lock:
+        if scraper_status.running:
+            return jsonify({"error": "Scraper is already running"}), 400
+
+        # Reset status for new scrape
+        scraper_status.running = True
+        scraper_status.refresh_handled = False
+        scraper_status.completed = False
+        scraper_status.error = None
 
     # Start scraper in background thread
     thread = threading.Thread(
@@ -8224,7 +7614,12 @@ def start_scraper():
         args=(categories, products_per_category),
         daemon=True,
     )
-    thread.start()
+    try:
+        thread.start()
+    except RuntimeError as e:
+        with _status_lock:
+            scraper_status.running = False
+        return jsonify({"error": f"Could not start scraper: {e}"}), 500
 
     return jsonify({"success": True, "message": "Scraper started"})
 
@@ -8232,7 +7627,7 @@ def start_scraper():
 @app.route("/api/scraper/status")
 def get_scraper_status():
     """Get the current scraper status."""
-    return jsonify(scraper_status)
+    return jsonify(scraper_status.to_json())
 
 
 @app.route("/api/scraper/stop", methods=["POST"])
@@ -8240,8 +7635,9 @@ def stop_scraper():
     """Stop the scraper (not fully implemented - would need process tracking)."""
     global scraper_status
     # Note: This is a soft stop - sets a flag but doesn't kill the process
-    scraper_status["running"] = False
-    scraper_status["error"] = "Stopped by user"
+    with _status_lock:
+        scraper_status.running = False
+        scraper_status.error = "Stopped by user"
     return jsonify({"success": True, "message": "Stop requested"})
 
 
@@ -8249,7 +7645,8 @@ def stop_scraper():
 def reset_scraper_status():
     """Reset scraper status after refresh has been handled."""
     global scraper_status
-    scraper_status["refresh_handled"] = True
+    with _status_lock:
+        scraper_status.refresh_handled = True
     return jsonify({"success": True})
 
 
@@ -8306,7 +7703,11 @@ if __name__ == "__main__":
         print(f"\n{DIM}Data Source:{RESET} Local Files")
         print(f"{DIM}Directory:{RESET}   {DATA_DIR}")
 
-    products = get_all_products()
+    try:
+        products = get_all_products()
+    except Exception as e:
+        print(f"{RED}✗ Could not load products: {e}{RESET}")
+        products = []
     print(f"\n{DIM}Products:{RESET}    {BOLD}{len(products)}{RESET} items loaded")
 
     if products and len(products) > 0:
@@ -0,0 +1,208 @@
+// Product garment-type classifier shared by the viewer page and its
+// classification worker. Pure functions only: no DOM access.
+
+/**
+ * GARMENT TYPE DETECTION
+ *
+ * This function classifies products based on the PRODUCT NAME only.
+ * The category field in the database is UNRELIABLE and should not be trusted.
+ *
+ * Classification priority (checked in order - first match wins):
+ * 1. Bottoms (pants, shorts, jeans, trousers) - very distinctive names
+ * 2. Shoes/Boots (footwear, sneakers, boots) - very distinctive names
+ * 3. Outerwear (jackets, coats, blazers, leather) - check before tops
+ * 4. Mid layer (sweaters, hoodies, sweatshirts, quarter-zip) - check before base
+ * 5. Base layer (t-shirts, shirts, polos) - most generic, check last
+ */
+
+const WORD_CHAR = /\w/;
+
+function isWordBoundary(text, pos) {
+    return pos <= 0 || pos >= text.length || !WORD_CHAR.test(text[pos - 1]) || !WORD_CHAR.test(text[pos]);
+}
+
+// A keyword hit counts only as a complete word, optionally pluralised with
+// s/es, so "pants" does not match inside "participants".
+function isWholeWordMatch(text, start, end) {
+    if (start > 0 && WORD_CHAR.test(text[start - 1])) return false;
+    if (isWordBoundary(text, end)) return true;
+    if (text[end] === 's' && isWordBoundary(text, end + 1)) return true;
+    return text[end] === 'e' && text[end + 1] === 's' && isWordBoundary(text, end + 2);
+}
+
+// Aho-Corasick automaton over every keyword group: one pass over a
+// lowercase name reports which groups have a whole-word hit.
+function buildKeywordMatcher(groups) {
+    const transitions = [new Map()];
+    const fail = [0];
+    const outputs = [[]];
+
+    groups.forEach((keywords, group) => {
+        for (const keyword of keywords) {
+            let state = 0;
+            for (const ch of keyword) {
+                let next = transitions[state].get(ch);
+                if (next === undefined) {
+                    next = transitions.length;
+                    transitions.push(new Map());
+                    fail.push(0);
+                    outputs.push([]);
+                    transitions[state].set(ch, next);
+                }
+                state = next;
+            }
+            outputs[state].push({ group, length: keyword.length });
+        }
+    });
+
+    // Breadth-first pass to fill failure links and merge their outputs
+    const queue = [...transitions[0].values()];
+    for (let head = 0; head < queue.length; head++) {
+        const state = queue[head];
+        for (const [ch, next] of transitions[state]) {
+            let f = fail[state];
+            while (f && !transitions[f].has(ch)) f = fail[f];
+            const target = transitions[f].get(ch);
+            fail[next] = target !== undefined && target !== next ? target : 0;
+            outputs[next] = outputs[next].concat(outputs[fail[next]]);
+            queue.push(next);
+        }
+    }
+
+    return function scan(text) {
+        const matched = new Uint8Array(groups.length);
+        let state = 0;
+        for (let i = 0; i < text.length; i++) {
+            const ch = text[i];
+            while (state && !transitions[state].has(ch)) state = fail[state];
+            state = transitions[state].get(ch) || 0;
+            for (const { group, length } of outputs[state]) {
+                if (!matched[group] && isWholeWordMatch(text, i + 1 - length, i + 1)) {
+                    matched[group] = 1;
+                }
+            }
+        }
+        return matched;
+    };
+}
+
+function classification(main, sub, displayCategory) {
+    return Object.freeze({ main, sub, displayCategory });
+}
+
+// Name-based rules in priority order - first match wins. `unless` keywords
+// veto a match so later rules can still claim the product.
+const CLASSIFIER_RULES = Object.freeze([
+    // STEP 1: BOTTOMS - very distinctive names that won't conflict with other categories
+    // Swimwear by name (swim trunks, beach shorts, etc.) BEFORE shorts
+    { keywords: ['swim trunk', 'swim short', 'swimwear', 'bathing short', 'beach short', 'board short'], result: classification('bottoms', 'swimwear', 'Swimwear') },
+    // Shorts before pants, but not "short sleeve" which is a top
+    { keywords: ['short', 'bermuda'], unless: ['sleeve', 'shirt', 'top', 'tee', 't-shirt'], result: classification('bottoms', 'shorts', 'Shorts') },
+    { keywords: ['jean', 'denim pant', 'denim trouser'], result: classification('bottoms', 'jeans', 'Jeans') },
+    { keywords: ['sweatsuit', 'tracksuit', 'track pant', 'jogger set', 'matching set'], result: classification('bottoms', 'sweatsuits', 'Sweatsuits') },
+    { keywords: ['pant', 'trouser', 'chino', 'jogger', 'cargo pant', 'dress pant', 'suit pant', 'slack'], result: classification('bottoms', 'pants', 'Pants') },
+
+    // STEP 2: FOOTWEAR - boots first (more specific than shoes)
+    { keywords: ['boot', 'chelsea', 'combat boot', 'ankle boot', 'hiking boot'], result: classification('shoes', 'boots', 'Boots') },
+    { keywords: ['shoe', 'sneaker', 'loafer', 'derby', 'sandal', 'slipper', 'moccasin', 'espadrille', 'trainer'], result: classification('shoes', 'shoes', 'Shoes') },
+
+    // STEP 3: OUTERWEAR - before tops because "jacket" might contain other words
+    { keywords: ['blazer', 'sport coat', 'sportcoat'], result: classification('outerwear', 'blazers', 'Blazers') },
+    // Suits before generic jacket - "suit jacket" should be suits
+    { keywords: ['suit'], unless: ['sweatsuit', 'tracksuit'], result: classification('outerwear', 'suits', 'Suits') },
+    { keywords: ['coat', 'parka', 'puffer', 'trench', 'overcoat', 'topcoat'], result: classification('outerwear', 'coats', 'Coats') },
+    { keywords: ['vest', 'gilet', 'waistcoat', 'bodywarmer'], result: classification('outerwear', 'vests', 'Vests') },
+    { keywords: ['overshirt', 'shacket', 'shirt jacket'], result: classification('outerwear', 'overshirts', 'Overshirts') },
+    { keywords: ['jacket', 'bomber', 'windbreaker', 'anorak', 'trucker', 'down jacket', 'quilted', 'padded'], result: classification('outerwear', 'jackets', 'Jackets') },
+
+    // STEP 4: MID LAYER - before base layer because "sweatshirt" contains "shirt"
+    { keywords: ['quarter zip', 'quarter-zip', 'half zip', 'half-zip', '1/4 zip'], result: classification('tops_mid', 'quarterzip', 'Quarter Zip') },
+    { keywords: ['sweatshirt', 'crewneck sweat', 'crew neck sweat', 'fleece'], result: classification('tops_mid', 'sweatshirts', 'Sweatshirts') },
+    { keywords: ['hoodie', 'hooded'], result: classification('tops_mid', 'hoodies', 'Hoodies') },
+    { keywords: ['cardigan'], result: classification('tops_mid', 'cardigans', 'Cardigans') },
+    { keywords: ['sweater', 'knit', 'pullover', 'jumper', 'knitwear'], result: classification('tops_mid', 'sweaters', 'Sweaters') },
+
+    // STEP 5: BASE LAYER - most generic, check last
+    { keywords: ['t-shirt', 'tshirt', 'tee'], result: classification('tops_base', 'tshirts', 'T-Shirts') },
+    { keywords: ['tank', 'sleeveless top', 'muscle tee'], result: classification('tops_base', 'tanks', 'Tank Tops') },
+    { keywords: ['polo'], result: classification('tops_base', 'polos', 'Polo Shirts') },
+    { keywords: ['shirt'], result: classification('tops_base', 'shirts', 'Shirts') }
+]);
+
+// Keyword group 2i is rule i's keywords, 2i+1 its veto keywords
+const scanClassifierKeywords = buildKeywordMatcher(
+    CLASSIFIER_RULES.flatMap(rule => [rule.keywords, rule.unless || []])
+);
+
+// Lowercased name, category and tags_final.category used by the classifier,
+// computed once per product at load; call again after editing any of them.
+function indexProductText(product) {
+    product._nameLc = (product.name || '').toLowerCase();
+    product._catLc = (product.category || '').toLowerCase();
+    const tagsFinal = product.tags_final;
+    product._tagsCatLc = tagsFinal && tagsFinal.category ? tagsFinal.category.toLowerCase() : '';
+}
+
+// Results for the DB-category shortcuts and the tags_final fallback
+const DB_SWIMWEAR = classification('bottoms', 'swimwear', 'Swimwear');
+const DB_FOOTWEAR = classification('shoes', 'shoes', 'Footwear');
+const TOP_MID_FALLBACK = classification('tops_mid', 'sweaters', 'Sweaters');
+const TOP_BASE_FALLBACK = classification('tops_base', 'tshirts', 'T-Shirts');
+const UNCATEGORIZED = classification('other', null, 'Other');
+// tags_final.category values that map straight to a classification
+const TAGS_CATEGORY_FALLBACK = new Map([
+    ['bottom', classification('bottoms', 'pants', 'Pants')],
+    ['outerwear', classification('outerwear', 'jackets', 'Jackets')],
+    ['shoes', classification('shoes', 'shoes', 'Shoes')],
+    ['top_mid', TOP_MID_FALLBACK]
+]);
+const TOP_BASE_CATEGORIES = new Set(['top_base', 'top']);
+
+function classifyProductUncached(product) {
+    if (product._nameLc === undefined) indexProductText(product);
+    // ONLY use the product name for classification - it's the most reliable
+    const name = product._nameLc;
+    const category = product._catLc;
+
+    // Use DB category if it's swimwear (scraped from Zara beachwear)
+    if (category === 'swimwear') {
+        return DB_SWIMWEAR;
+    }
+    // DB stores "footwear" for shoe products (generator query); display as Footwear
+    if (category === 'footwear') {
+        return DB_FOOTWEAR;
+    }
+
+    const matched = scanClassifierKeywords(name);
+    for (let i = 0; i < CLASSIFIER_RULES.length; i++) {
+        if (matched[2 * i] && !matched[2 * i + 1]) {
+            return CLASSIFIER_RULES[i].result;
+        }
+    }
+
+    // ============================================================
+    // STEP 6: Fallback - use tags_final if available
+    // ============================================================
+    const cat = product._tagsCatLc;
+    if (cat) {
+        const direct = TAGS_CATEGORY_FALLBACK.get(cat);
+        if (direct) return direct;
+        // A mid layer role outranks a base-layer category
+        const role = product.tags_final.top_layer_role;
+        if (role === 'mid') return TOP_MID_FALLBACK;
+        if (role === 'base' || TOP_BASE_CATEGORIES.has(cat)) return TOP_BASE_FALLBACK;
+    }
+
+    // ============================================================
+    // STEP 7: Last resort - uncategorized
+    // ============================================================
+    return UNCATEGORIZED;
+}
+
+// Loaded as a Web Worker: classify a batch of {name, category, tags_final}
+// objects and reply with the results in the same order.
+if (typeof WorkerGlobalScope !== 'undefined' && self instanceof WorkerGlobalScope) {
+    self.onmessage = event => {
+        self.postMessage(event.data.map(classifyProductUncached));
+    };
+}